@@ -26,7 +26,6 @@ import python3wifi.flags
 from python3wifi.iwlibs import (
     Wireless,
     WirelessInfo,
-    Iwrange,
     getNICnames,
     getWNICnames,
 )
@@ -71,7 +70,7 @@ def getSensitivity(wifi):
             fixed = "="
         else:
             fixed = ":"
-        iwrange = Iwrange(wifi.ifname)
+        iwrange = wifi.getRange()
         return "Sensitivity{}{}/{}  ".format(
             fixed, wifi.getSensitivity(), iwrange.sensitivity
         )
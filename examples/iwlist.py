@@ -23,14 +23,14 @@ import sys
 import types
 
 import python3wifi.flags
-from python3wifi.iwlibs import Wireless, Iwrange, getNICnames
+from python3wifi.iwlibs import Wireless, getNICnames
 
 
 def print_scanning_results(wifi, args=None):
     """Print the access points detected nearby."""
     # "Check if the interface could support scanning"
     try:
-        iwrange = Iwrange(wifi.ifname)
+        iwrange = wifi.getRange()
     except OSError:
         sys.stderr.write(
             "{:8.16}  Interface doesn't support " "scanning.\n\n".format(wifi.ifname)
@@ -52,21 +52,14 @@ def print_scanning_results(wifi, args=None):
                 print(f"{wifi.ifname:8.16}  No scan results")
             else:
                 print("{} results".format(len(results)))
-                (num_channels, frequencies) = wifi.getChannelInfo()
                 print(f"{wifi.ifname:8.16}  Scan completed :")
                 index = 1
                 for ap in results:
                     print(f"          Cell {index:02d} - Address: {ap.bssid}")
                     print(f'                    ESSID:"{ap.essid}"')
                     print(f"                    Mode:{ap.mode}")
-                    try:
-                        channel = "{}".format(
-                            frequencies.index(
-                                wifi._formatFrequency(ap.frequency.getFrequency())
-                            )
-                            + 1
-                        )
-                    except ValueError:
+                    channel = wifi.getChannel(ap.frequency.getFrequency())
+                    if channel is None:
                         channel = "?"
                     print(
                         "                    "
@@ -193,12 +186,8 @@ def print_channels(wifi, args=None):
             "{:8.16}  {:02d} channels in total; "
             "available frequencies :".format(wifi.ifname, num_frequencies)
         )
-        for channel in channels:
-            print(
-                "          Channel {:02d} : {}".format(
-                    channels.index(channel) + 1, channel
-                )
-            )
+        for index, channel in enumerate(channels, 1):
+            print("          Channel {:02d} : {}".format(index, channel))
         # Do some low-level comparisons on frequency info
         iwfreq = wifi.wireless_info.getFrequency()
         # XXX - this is not the same flags value as iwlist.c
@@ -214,7 +203,7 @@ def print_channels(wifi, args=None):
         current_freq = wifi.getFrequency()
         print(
             "          Current {}{}{} (Channel {})\n".format(
-                return_type, fixed, current_freq, channels.index(current_freq) + 1
+                return_type, fixed, current_freq, wifi.getChannel(iwfreq.getFrequency())
             )
         )
 
@@ -280,7 +269,7 @@ def print_encryption(wifi, args=None):
                 "{:8.16}  no encryption keys " "information.\n\n".format(wifi.ifname)
             )
     else:
-        range_info = Iwrange(wifi.ifname)
+        range_info = wifi.getRange()
         key_sizes = ""
         for index in range(range_info.num_encoding_sizes - 1):
             key_sizes = key_sizes + repr(range_info.encoding_size[index] * 8) + ", "
@@ -433,7 +422,7 @@ def print_txpower(wifi, args=None):
 
 def print_retry(wifi, args=None):
     try:
-        range_info = Iwrange(wifi.ifname)
+        range_info = wifi.getRange()
     except OSError as io_error:
         if (
             (io_error.errno == errno.EOPNOTSUPP)
@@ -506,7 +495,7 @@ def print_aps(wifi, args=None):
     """
     # "Check if the interface could support scanning"
     try:
-        iwrange = Iwrange(wifi.ifname)
+        iwrange = wifi.getRange()
     except OSError:
         sys.stderr.write(
             "{:8.16}  Interface doesn't support " "scanning.\n\n".format(wifi.ifname)
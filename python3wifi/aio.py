@@ -0,0 +1,243 @@
+# Python WiFi -- a library to access wireless card properties via Python
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public License
+#    as published by the Free Software Foundation; either version 2.1 of
+#    the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307
+#    USA
+
+"""asyncio front end to iwlibs.
+
+The get-ioctls are short, non-blocking system calls, so they are issued
+directly from the event loop.  The only long wait, for a scan to
+complete, is driven by the loop: by readiness of the rtnetlink socket
+which receives the scan completion event, or by loop timers when
+netlink is not available.  One event loop can so drive many radios
+concurrently without threads:
+
+>>> async def main():
+...     async with AsyncWireless('wlan0') as wlan0, AsyncWireless('wlan1') as wlan1:
+...         return await asyncio.gather(wlan0.scan(), wlan1.scan())
+
+"""
+
+import asyncio
+
+from . import iwlibs
+from . import rtnetlink
+
+
+# Wireless methods exposed as coroutines by AsyncWireless
+GETTERS = (
+    "getAPaddr",
+    "getBitrate",
+    "getBitrates",
+    "getChannelInfo",
+    "getEncryption",
+    "getEssid",
+    "getFragmentation",
+    "getFrequency",
+    "getKeys",
+    "getMode",
+    "getPowermanagement",
+    "getQualityAvg",
+    "getQualityMax",
+    "getRange",
+    "getRetrylimit",
+    "getRTS",
+    "getSensitivity",
+    "getStatistics",
+    "getTXPower",
+    "getWirelessName",
+    "snapshot",
+)
+
+
+def _asyncGetter(name):
+    """ Returns a coroutine method calling Wireless.name. """
+
+    async def getter(self, *args, **kwargs):
+        return getattr(self.wireless, name)(*args, **kwargs)
+
+    getter.__name__ = name
+    getter.__qualname__ = "AsyncWireless." + name
+    getter.__doc__ = "Coroutine version of Wireless.%s()." % name
+    return getter
+
+
+async def _waitReadable(loop, fileno, timeout):
+    """Waits up to timeout seconds for fileno to become readable.
+
+    Returns False on timeout.
+
+    """
+    readable = loop.create_future()
+
+    def ready():
+        if not readable.done():
+            readable.set_result(True)
+
+    loop.add_reader(fileno, ready)
+    try:
+        return await asyncio.wait_for(readable, timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fileno)
+
+
+async def waitScan(listener, ifindex, timeout):
+    """Waits up to timeout seconds for the scan completion event of
+    ifindex on an rtnetlink.Rtnetlink listener.
+
+    Returns True if the event arrived (or messages were lost, so it
+    may have been missed), False on timeout.
+
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        if not await _waitReadable(loop, listener.fileno(), remaining):
+            return False
+        if rtnetlink.isScanComplete(listener.read(), ifindex):
+            return True
+        if listener.overrun:
+            listener.overrun = False
+            return True
+
+
+async def readScan(scan):
+    """Reads the results of a triggered Iwscan without blocking the loop.
+
+    Returns a memoryview of the scan event stream.
+
+    """
+    delay = iwlibs.SCAN_WAIT_MIN
+    ifindex = None
+    while True:
+        data = scan.tryReadScan()
+        if data is not None:
+            return data
+        if scan.listener is not None:
+            if ifindex is None:
+                ifindex = iwlibs.getIfindex(scan.ifname)
+            if await waitScan(scan.listener, ifindex, delay):
+                delay = iwlibs.SCAN_WAIT_MIN
+            else:
+                delay = min(delay * 2, iwlibs.SCAN_WAIT_MAX_EVENT)
+        else:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, iwlibs.SCAN_WAIT_MAX)
+
+
+class AsyncWireless:
+    """Coroutine access to a wireless interface.
+
+    Every getter in GETTERS is available as a coroutine with the same
+    arguments as on Wireless.
+
+    """
+
+    def __init__(self, ifname):
+        self.ifname = ifname
+        self.wireless = iwlibs.Wireless(ifname)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Releases the underlying Wireless object. """
+        self.wireless.close()
+
+    async def scan(self, timeout=None, **targets):
+        """Triggers a scan and returns the completed Iwscan.
+
+        'timeout' -- float -- seconds to wait for the scan to complete,
+            forever if None; asyncio.TimeoutError is raised when it
+            expires.
+
+        Other keyword arguments restrict the scan, see iwlibs.Iwscanreq.
+
+        """
+        scan = iwlibs.Iwscan(
+            self.ifname, request=iwlibs.Iwscanreq(**targets), read=False
+        )
+        scan.trigger()
+        try:
+            data = await asyncio.wait_for(readScan(scan), timeout)
+            scan.aplist = scan._parse(data)
+        finally:
+            scan.closeListener()
+            scan.releaseBuffer()
+        return scan
+
+    async def pollStatistics(self, interval, count=None):
+        """Yields getStatistics() every interval seconds.
+
+        'count' -- int -- number of samples, unlimited if None.
+
+        Samples are scheduled on a fixed grid, so the period does not
+        drift with the time spent by the consumer.
+
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        sample = 0
+        while count is None or sample < count:
+            yield self.wireless.getStatistics()
+            sample = sample + 1
+            deadline = deadline + interval
+            await asyncio.sleep(max(0, deadline - loop.time()))
+
+
+for _name in GETTERS:
+    setattr(AsyncWireless, _name, _asyncGetter(_name))
+del _name
+
+
+async def scan(ifname, timeout=None, **targets):
+    """ Scans on ifname and returns the completed Iwscan. """
+    async with AsyncWireless(ifname) as wifi:
+        return await wifi.scan(timeout, **targets)
+
+
+async def scanAll(ifnames, timeout=None, **targets):
+    """Scans on several interfaces concurrently and returns an
+    iwlibs.Iwmultiscan.
+
+    An interface which fails, or whose scan does not complete within
+    timeout, is reported in the errors of the result.
+
+    """
+    ifnames = list(ifnames)
+    scans = await asyncio.gather(
+        *[scan(ifname, timeout, **targets) for ifname in ifnames],
+        return_exceptions=True
+    )
+    errors = {}
+    completed = {}
+    for ifname, result in zip(ifnames, scans):
+        if isinstance(result, Exception):
+            # e.g. OSError, asyncio.TimeoutError or RuntimeError for a
+            # malformed event stream
+            errors[ifname] = result
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            completed[ifname] = result
+    return iwlibs.Iwmultiscan(completed, errors)
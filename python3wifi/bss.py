@@ -0,0 +1,367 @@
+# Python WiFi -- a library to access wireless card properties via Python
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public License
+#    as published by the Free Software Foundation; either version 2.1 of
+#    the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307
+#    USA
+
+"""A table of the BSSs seen over successive scans.
+
+BssTable merges Iwscanresult objects into one entry per BSSID, keeps
+the first and last time each BSS was seen and drops the ones which were
+not seen for a while, so a monitor running for days keeps a bounded
+table:
+
+>>> from iwlibs import Wireless
+>>> wifi = Wireless('eth1')
+>>> table = BssTable(max_age=60)
+>>> changes = table.update(wifi.scan())
+>>> [entry.bssid for entry in table.getByEssid(b'romanofski')]
+['00:11:22:33:44:55']
+
+BssDiff compares each scan with the previous one and reports only what
+happened in between, as BssEvent records:
+
+>>> diff = BssDiff(level_threshold=10)
+>>> events = diff.update(wifi.scan())
+>>> events = diff.update(wifi.scan())
+>>> [(event.kind, event.bssid) for event in events]
+[('removed', '00:11:22:33:44:55')]
+
+"""
+
+import collections
+import time
+
+from . import flags as wififlags
+from . import iwlibs
+
+
+# BssEntry attributes taken from the scan results
+FIELDS = (
+    "essid",
+    "mode",
+    "frequency",
+    "channel",
+    "quality",
+    "level",
+    "noise",
+    "encrypted",
+    "wpa",
+    "max_rate",
+)
+
+# FIELDS whose change is reported by BssDiff; the level is reported when
+# it moved by at least the threshold, quality and noise are ignored
+DIFF_FIELDS = ("essid", "mode", "frequency", "channel", "encrypted", "wpa")
+DIFF_LEVEL_THRESHOLD = 5
+
+BSS_ADDED = "added"
+BSS_REMOVED = "removed"
+BSS_CHANGED = "changed"
+
+# kind is one of BSS_*, old and new map field names to values: all of
+# FIELDS for added and removed BSSs, the changed ones otherwise
+BssEvent = collections.namedtuple("BssEvent", ("kind", "bssid", "old", "new"))
+
+# position of each of FIELDS in the values of scanValues()
+_field_index = dict((field, index) for index, field in enumerate(FIELDS))
+
+
+def scanValues(scanresult):
+    """ Returns the values of FIELDS for an Iwscanresult, in that order. """
+    frequency = channel = None
+    if scanresult.frequency is not None:
+        raw_frequency = scanresult.frequency.getFrequency()
+        if raw_frequency < iwlibs.KILO:
+            # some drivers report the channel instead
+            channel = int(raw_frequency)
+        else:
+            frequency = raw_frequency
+            channel = iwlibs.getChannelIndex(scanresult.range).getChannel(frequency)
+    encrypted = None
+    if scanresult.encode is not None:
+        encrypted = not scanresult.encode.flags & wififlags.IW_ENCODE_DISABLED
+    max_rate = None
+    rates = [rate for rate_list in scanresult.rate for rate in rate_list]
+    if rates:
+        max_rate = max(rates)
+    quality = scanresult.quality
+    return (
+        scanresult.essid,
+        scanresult.mode,
+        frequency,
+        channel,
+        quality.quality,
+        quality.siglevel,
+        quality.nlevel,
+        encrypted,
+        scanresult.wpa,
+        max_rate,
+    )
+
+
+class BssEntry:
+    """ The merged state of one BSS. """
+
+    __slots__ = ("bssid", "first_seen", "last_seen", "seen") + FIELDS
+
+    def __init__(self, bssid, now):
+        self.bssid = bssid
+        self.first_seen = now
+        self.last_seen = now
+        # number of scans the BSS was seen in
+        self.seen = 0
+        for field in FIELDS:
+            setattr(self, field, None)
+
+    def __repr__(self):
+        return "<BssEntry %s %r channel %s>" % (self.bssid, self.essid, self.channel)
+
+    def update(self, values, now):
+        """Sets the values of FIELDS, as returned by scanValues().
+
+        Returns the names of the fields which changed.
+
+        """
+        self.last_seen = now
+        self.seen = self.seen + 1
+        changed = []
+        for field, value in zip(FIELDS, values):
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed.append(field)
+        return tuple(changed)
+
+    def getAge(self, now=None):
+        """ Returns the seconds since the BSS was last seen. """
+        if now is None:
+            now = time.monotonic()
+        return now - self.last_seen
+
+
+class BssTable:
+    """BssEntry objects by BSSID, with indexes by ESSID and channel.
+
+    Entries are kept in the order they were last seen, so expiring them
+    only looks at the ones which are actually stale, and merging a scan
+    costs one dictionary lookup per result plus work for what changed.
+
+    Times are time.monotonic() values unless given explicitly.
+
+    """
+
+    def __init__(self, max_age=300.0, max_entries=None):
+        """'max_age' -- float -- seconds after which an entry which was
+            not seen again is dropped, never if None.
+        'max_entries' -- int -- maximum table size, the entries seen
+            least recently are dropped first; unlimited if None.
+
+        """
+        self.max_age = max_age
+        self.max_entries = max_entries
+        # bssid -> BssEntry, least recently seen first
+        self._entries = collections.OrderedDict()
+        # essid -> set of bssids, channel -> set of bssids
+        self.by_essid = {}
+        self.by_channel = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    def __contains__(self, bssid):
+        return bssid in self._entries
+
+    def get(self, bssid, default=None):
+        """ Returns the BssEntry of bssid. """
+        return self._entries.get(bssid, default)
+
+    def getByEssid(self, essid):
+        """ Returns the entries advertising essid. """
+        return [self._entries[bssid] for bssid in self.by_essid.get(essid, ())]
+
+    def getByChannel(self, channel):
+        """ Returns the entries on channel. """
+        return [self._entries[bssid] for bssid in self.by_channel.get(channel, ())]
+
+    def update(self, scanresults, now=None):
+        """Merges scan results into the table and expires stale entries.
+
+        'scanresults' -- iterable of Iwscanresult, e.g. an Iwscan or
+            Wireless.iterScan().
+
+        Returns a list of (BssEntry, changed field names) for the
+        entries which are new or changed.
+
+        """
+        if now is None:
+            now = time.monotonic()
+        changes = []
+        for scanresult in scanresults:
+            bssid = scanresult.bssid
+            entry = self._entries.get(bssid)
+            if entry is None:
+                entry = self._entries[bssid] = BssEntry(bssid, now)
+            else:
+                self._entries.move_to_end(bssid)
+            essid, channel = entry.essid, entry.channel
+            changed = entry.update(scanValues(scanresult), now)
+            if changed:
+                if entry.essid != essid:
+                    self._reindex(self.by_essid, bssid, essid, entry.essid)
+                if entry.channel != channel:
+                    self._reindex(self.by_channel, bssid, channel, entry.channel)
+                changes.append((entry, changed))
+        self.expire(now)
+        return changes
+
+    def expire(self, now=None):
+        """ Drops stale entries and returns them. """
+        if now is None:
+            now = time.monotonic()
+        max_age, max_entries = self.max_age, self.max_entries
+        expired = []
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            full = max_entries is not None and len(self._entries) > max_entries
+            stale = max_age is not None and now - entry.last_seen > max_age
+            if not (full or stale):
+                break
+            expired.append(self._remove(entry))
+        return expired
+
+    def remove(self, bssid):
+        """ Drops the entry of bssid and returns it, or None. """
+        entry = self._entries.get(bssid)
+        if entry is not None:
+            self._remove(entry)
+        return entry
+
+    def clear(self):
+        """ Drops all entries. """
+        self._entries.clear()
+        self.by_essid.clear()
+        self.by_channel.clear()
+
+    def _remove(self, entry):
+        del self._entries[entry.bssid]
+        self._reindex(self.by_essid, entry.bssid, entry.essid, None)
+        self._reindex(self.by_channel, entry.bssid, entry.channel, None)
+        return entry
+
+    @staticmethod
+    def _reindex(index, bssid, old_key, new_key):
+        """ Moves bssid from old_key to new_key in index. """
+        if old_key is not None:
+            bssids = index.get(old_key)
+            if bssids is not None:
+                bssids.discard(bssid)
+                if not bssids:
+                    del index[old_key]
+        if new_key is not None:
+            index.setdefault(new_key, set()).add(bssid)
+
+
+class BssDiff:
+    """Turns successive scans into BssEvent records.
+
+    Only the values of the previous scan are kept, one tuple per BSSID,
+    so each update() is a single pass over the new results.  Events are
+    returned and also passed to every listener.
+
+    """
+
+    def __init__(self, level_threshold=DIFF_LEVEL_THRESHOLD):
+        """'level_threshold' -- int -- smallest signal level change in
+            dB reported as a change, None to ignore the level.
+
+        """
+        self.level_threshold = level_threshold
+        # bssid -> values of the previous scan, as returned by scanValues()
+        self.values = {}
+        self.listeners = []
+
+    def addListener(self, callback):
+        """ Calls callback(event) for every event of later updates. """
+        self.listeners.append(callback)
+
+    def removeListener(self, callback):
+        """ Stops calling callback. """
+        self.listeners.remove(callback)
+
+    def update(self, scanresults):
+        """Compares scanresults with the previous scan.
+
+        Returns the list of BssEvent, BSSs which appeared and changed in
+        scan order, followed by those which disappeared.
+
+        """
+        previous = self.values
+        current = {}
+        events = []
+        # the previous scan is kept until this one was read completely,
+        # so an update failing halfway (e.g. a RuntimeError from
+        # iterScan() on a bad cell) leaves it in place
+        for scanresult in scanresults:
+            bssid = scanresult.bssid
+            if bssid in current:
+                # reported twice, e.g. with a stale entry on the old
+                # channel; the first report is the one compared
+                continue
+            values = current[bssid] = scanValues(scanresult)
+            old_values = previous.get(bssid)
+            if old_values is None:
+                events.append(BssEvent(BSS_ADDED, bssid, None, self._asdict(values)))
+                continue
+            fields = self.getChanges(old_values, values)
+            if fields:
+                old = dict((field, old_values[_field_index[field]]) for field in fields)
+                new = dict((field, values[_field_index[field]]) for field in fields)
+                events.append(BssEvent(BSS_CHANGED, bssid, old, new))
+        for bssid, old_values in previous.items():
+            if bssid in current:
+                continue
+            events.append(BssEvent(BSS_REMOVED, bssid, self._asdict(old_values), None))
+        self.values = current
+        for event in events:
+            for callback in list(self.listeners):
+                callback(event)
+        return events
+
+    def getChanges(self, old_values, values):
+        """ Returns the names of the fields which changed significantly. """
+        fields = [
+            field
+            for field in DIFF_FIELDS
+            if old_values[_field_index[field]] != values[_field_index[field]]
+        ]
+        if self.level_threshold is not None:
+            old_level = old_values[_field_index["level"]]
+            level = values[_field_index["level"]]
+            if abs(level - old_level) >= self.level_threshold:
+                fields.append("level")
+        return tuple(fields)
+
+    @staticmethod
+    def _asdict(values):
+        return dict(zip(FIELDS, values))
+
+
+def diffScans(old, new, level_threshold=DIFF_LEVEL_THRESHOLD):
+    """ Returns the BssEvent list between two scans. """
+    diff = BssDiff(level_threshold)
+    diff.update(old)
+    return diff.update(new)
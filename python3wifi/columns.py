@@ -0,0 +1,252 @@
+# Python WiFi -- a library to access wireless card properties via Python
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public License
+#    as published by the Free Software Foundation; either version 2.1 of
+#    the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307
+#    USA
+
+"""Columnar export of scan results, for vectorized statistics.
+
+scanColumns() decodes a SIOCGIWSCAN event stream straight into one
+typed array.array per column, without making an object per cell.  The
+columns support the buffer protocol, so NumPy (which is optional, and
+only imported by the functions returning NumPy arrays) wraps them
+without copying in toNumpyColumns(), or interleaves them into a
+structured array in toArray():
+
+>>> from iwlibs import Iwscan
+>>> scan = Iwscan('eth1', read=False)
+>>> scan.trigger()
+>>> records = scanArray(scan.readScan(), scan.range)
+>>> scan.releaseBuffer()
+>>> records[records['channel'] == 6]['level'].mean()
+-71.5
+
+Missing values are 0, or -1 for channel and mode.
+
+"""
+
+import array
+import time
+
+from . import flags as wififlags
+from . import iwlibs
+
+
+# column name, array.array typecode, NumPy dtype
+COLUMNS = (
+    ("bssid", "Q", "u8"),  # MAC address as a number
+    ("frequency", "Q", "u8"),  # Hz
+    ("channel", "h", "i2"),
+    ("quality", "B", "u1"),
+    ("level", "h", "i2"),  # signal level
+    ("noise", "h", "i2"),
+    ("mode", "b", "i1"),  # index into flags.modes
+    ("encryption", "H", "u2"),  # SIOCGIWENCODE flags
+    ("wpa", "b", "i1"),  # 0: none, 1: WPA, 2: RSN
+    ("timestamp", "d", "f8"),
+)
+
+def _importNumpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is needed to export scan results as arrays")
+    return numpy
+
+
+def makeColumns():
+    """ Returns empty columns, a dict of array.array by column name. """
+    return dict((name, array.array(typecode)) for name, typecode, dtype in COLUMNS)
+
+
+def scanColumns(data, iwrange=None, timestamp=None, columns=None):
+    """Appends the cells of a SIOCGIWSCAN event stream to columns.
+
+    'data' -- bytes, array or memoryview -- the event stream.
+    'timestamp' -- float -- time of the scan, time.time() if None.
+    'columns' -- dict -- columns to append to, from makeColumns() or an
+        earlier call; new columns if None.
+
+    Returns the columns.
+
+    """
+    if columns is None:
+        columns = makeColumns()
+    if timestamp is None:
+        timestamp = time.time()
+    channels = iwlibs.getChannelIndex(iwrange)
+    view = memoryview(data)
+    end = len(view)
+    lcp_len = wififlags.IW_EV_LCP_PK_LEN
+    unpack_header = iwlibs.STRUCT_IW_EVENT_HEADER.unpack_from
+    # the BSSID of the current cell, and where its other events start
+    bssid = None
+    cell_start = 0
+    offset = 0
+    while end - offset >= lcp_len:
+        length, cmd = unpack_header(view, offset)
+        if length < lcp_len:
+            break
+        if cmd == wififlags.SIOCGIWAP:
+            if bssid is not None:
+                events = view[cell_start:offset]
+                _appendCell(columns, bssid, events, channels, timestamp)
+            # sa_family, then the address
+            address = offset + lcp_len + 2
+            bssid = int.from_bytes(view[address : address + 6], "big")
+            cell_start = offset + length
+        elif bssid is None:
+            raise RuntimeError("Attempting to add an event without AP data.")
+        offset = offset + length
+    if bssid is not None:
+        _appendCell(columns, bssid, view[cell_start:offset], channels, timestamp)
+    return columns
+
+
+def resultColumns(scanresults, timestamp=None, columns=None):
+    """Appends Iwscanresult objects (e.g. an Iwscan) to columns.
+
+    The values are decoded from the results' events like scanColumns()
+    does, so none of their attributes have to be decoded.
+
+    """
+    if columns is None:
+        columns = makeColumns()
+    if timestamp is None:
+        timestamp = time.time()
+    for scanresult in scanresults:
+        bssid = int(scanresult.bssid.replace(":", ""), 16)
+        channels = iwlibs.getChannelIndex(scanresult.range)
+        _appendCell(columns, bssid, scanresult._events, channels, timestamp)
+    return columns
+
+
+def _appendCell(columns, bssid, events, channels, timestamp):
+    """ Decodes the events of one cell and appends them as a row. """
+    frequency = quality = level = noise = encryption = wpa = 0
+    channel = mode = -1
+    view = memoryview(events)
+    end = len(view)
+    lcp_len = wififlags.IW_EV_LCP_PK_LEN
+    unpack_header = iwlibs.STRUCT_IW_EVENT_HEADER.unpack_from
+    offset = 0
+    while end - offset >= lcp_len:
+        length, cmd = unpack_header(view, offset)
+        if length < lcp_len:
+            break
+        start = offset + lcp_len
+        offset = offset + length
+        if cmd == wififlags.SIOCGIWFREQ:
+            m, e, index, flags = iwlibs.STRUCT_IW_FREQ.unpack_from(view, start)
+            if e == 0 and m < iwlibs.KILO:
+                # some drivers report the channel instead
+                channel = m
+            else:
+                frequency = m * 10 ** e
+                channel = channels.getChannel(frequency) or -1
+        elif cmd == wififlags.IWEVQUAL:
+            quality, level, noise, updated = iwlibs.STRUCT_IW_QUALITY.unpack_from(
+                view, start
+            )
+        elif cmd == wififlags.SIOCGIWMODE:
+            mode = iwlibs.STRUCT_UINT.unpack_from(view, start)[0]
+        elif cmd == wififlags.SIOCGIWENCODE:
+            encryption = iwlibs.STRUCT_IW_POINT_PK.unpack_from(view, start)[1]
+        elif cmd == wififlags.IWEVGENIE:
+            wpa = iwlibs.getWpaVersion(view[start:offset], wpa)
+    row = (bssid, frequency, channel, quality, level, noise, mode, encryption, wpa)
+    _appendRow(columns, row + (timestamp,))
+
+
+def _appendRow(columns, row):
+    for (name, typecode, dtype), value in zip(COLUMNS, row):
+        columns[name].append(value)
+
+
+def bssColumns(table, columns=None, clock_offset=None):
+    """Appends the entries of a bss.BssTable to columns.
+
+    The timestamp column holds each entry's last_seen time, converted
+    to a time.time() value like the other exports write.
+
+    'clock_offset' -- float -- seconds added to the table's times; the
+        current difference between time.time() and time.monotonic()
+        if None, which suits tables updated with their default times,
+        0 for a table updated with time.time() values.
+
+    Encryption is written as a scan reports it: IW_ENCODE_DISABLED or
+    IW_ENCODE_NOKEY for encrypted entries, and 0 when it is unknown.
+
+    """
+    if columns is None:
+        columns = makeColumns()
+    if clock_offset is None:
+        clock_offset = time.time() - time.monotonic()
+    for entry in table:
+        if entry.encrypted is None:
+            encryption = 0
+        elif entry.encrypted:
+            # the table only keeps whether the BSS is encrypted
+            encryption = wififlags.IW_ENCODE_ENABLED | wififlags.IW_ENCODE_NOKEY
+        else:
+            encryption = wififlags.IW_ENCODE_DISABLED
+        row = (
+            int(entry.bssid.replace(":", ""), 16),
+            entry.frequency or 0,
+            -1 if entry.channel is None else entry.channel,
+            entry.quality or 0,
+            entry.level or 0,
+            entry.noise or 0,
+            -1 if entry.mode is None else wififlags.modes.index(entry.mode),
+            encryption,
+            entry.wpa or 0,
+            entry.last_seen + clock_offset,
+        )
+        _appendRow(columns, row)
+    return columns
+
+
+def toNumpyColumns(columns):
+    """ Returns columns as a dict of NumPy arrays sharing their memory. """
+    numpy = _importNumpy()
+    arrays = {}
+    for name, typecode, dtype in COLUMNS:
+        if columns[name]:
+            arrays[name] = numpy.frombuffer(columns[name], dtype=dtype)
+        else:
+            arrays[name] = numpy.empty(0, dtype=dtype)
+    return arrays
+
+
+def toArray(columns):
+    """ Returns columns as a NumPy structured array. """
+    numpy = _importNumpy()
+    records = numpy.empty(
+        len(columns["bssid"]),
+        dtype=[(name, dtype) for name, typecode, dtype in COLUMNS],
+    )
+    if len(records):
+        for name, typecode, dtype in COLUMNS:
+            records[name] = numpy.frombuffer(columns[name], dtype=dtype)
+    return records
+
+
+def scanArray(data, iwrange=None, timestamp=None):
+    """ Returns the cells of an event stream as a NumPy structured array. """
+    return toArray(scanColumns(data, iwrange, timestamp))
+
+
+def bssArray(table, clock_offset=None):
+    """ Returns the entries of a bss.BssTable as a NumPy structured array. """
+    return toArray(bssColumns(table, clock_offset=clock_offset))
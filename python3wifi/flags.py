@@ -29,12 +29,15 @@ modes = [
 ]
 
 IFNAMSIZE = 16
+IWREQ_SIZE = 32  # sizeof(struct iwreq): name + 16 byte union
+IW_PAYLOAD_MAX = 1024  # payload buffer for iw_point requests (range, stats)
 IW_ESSID_MAX_SIZE = 32
 IW_MAX_FREQUENCIES = 32
 IW_MAX_BITRATES = 32
 IW_MAX_TXPOWER = 8
 
 SIOCGIFCONF = 0x8912  # ifconf struct
+SIOCGIFINDEX = 0x8933  # name -> if_index mapping
 
 # ioctl calls for the Linux/i386 kernel
 SIOCSIWCOMMIT = 0x8B00  # Commit pending changes to driver
@@ -186,6 +189,21 @@ ETH_ALEN = 6
 # constants responsible for scanning
 IW_SCAN_MAX_DATA = 4096
 
+# scanning request flags (iw_point flags of SIOCSIWSCAN)
+IW_SCAN_DEFAULT = 0x0000  # Default scan of the driver
+IW_SCAN_ALL_ESSID = 0x0001  # Scan all ESSIDs
+IW_SCAN_THIS_ESSID = 0x0002  # Scan only this ESSID
+IW_SCAN_ALL_FREQ = 0x0004  # Scan all Frequencies
+IW_SCAN_THIS_FREQ = 0x0008  # Scan only this Frequency
+IW_SCAN_ALL_MODE = 0x0010  # Scan all Modes
+IW_SCAN_THIS_MODE = 0x0020  # Scan only this Mode
+IW_SCAN_ALL_RATE = 0x0040  # Scan all Bit-Rates
+IW_SCAN_THIS_RATE = 0x0080  # Scan only this Bit-Rate
+
+# scan types (struct iw_scan_req)
+IW_SCAN_TYPE_ACTIVE = 0
+IW_SCAN_TYPE_PASSIVE = 1
+
 # event sizes
 IW_EV_LCP_LEN = 4
 IW_EV_CHAR_LEN = IW_EV_LCP_LEN + IFNAMSIZE
@@ -206,3 +224,13 @@ IWHT_ADDR = 6
 IWHT_POINT = 8
 IWHT_PARAM = 9
 IWHT_QUAL = 10
+
+# rtnetlink, which carries wireless events to user space
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1  # multicast group of link messages
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+IFLA_IFNAME = 3
+IFLA_WIRELESS = 11  # wireless extension events
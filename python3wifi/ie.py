@@ -0,0 +1,558 @@
+# Python WiFi -- a library to access wireless card properties via Python
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public License
+#    as published by the Free Software Foundation; either version 2.1 of
+#    the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307
+#    USA
+
+"""802.11 information elements, as carried by IWEVGENIE scan events.
+
+IeList walks the (id, length, body) elements of a buffer and makes an
+Ie object for each element which is looked at, picking its class from
+ie_classes (or from vendor_ie_classes and extension_ie_classes).
+Walking only reads the two header bytes of each element; the body of a
+typed IE is decoded when one of its attributes is first read:
+
+>>> from iwlibs import Wireless
+>>> for ap in Wireless('eth1').scan():
+...     if ap.ies.rsn is not None and AKM_SAE in ap.ies.rsn.akm_suites:
+...         print(ap.bssid, ap.ies.bss_load.channel_utilization)
+
+The bodies of the Ie objects from parseIes() are memoryviews into the
+data it was given, which must therefore not be changed while they are
+used; IeList keeps its own copy.
+
+"""
+
+import struct
+
+
+# element IDs
+IE_SSID = 0
+IE_SUPPORTED_RATES = 1
+IE_DS_PARAMETER_SET = 3
+IE_COUNTRY = 7
+IE_BSS_LOAD = 11
+IE_HT_CAPABILITIES = 45
+IE_RSN = 48
+IE_EXTENDED_RATES = 50
+IE_MOBILITY_DOMAIN = 54
+IE_HT_OPERATION = 61
+IE_VHT_CAPABILITIES = 191
+IE_VHT_OPERATION = 192
+IE_VENDOR = 221
+IE_EXTENSION = 255
+
+# element ID extensions (IE_EXTENSION)
+IE_EXT_HE_CAPABILITIES = 35
+IE_EXT_HE_OPERATION = 36
+
+# vendor IEs, by OUI and type
+VENDOR_WPA = 0x0050F201
+VENDOR_WMM = 0x0050F202
+
+# cipher suite selectors (OUI and type), 00-0F-AC for RSN, 00-50-F2 for WPA
+CIPHER_WEP40 = 0x000FAC01
+CIPHER_TKIP = 0x000FAC02
+CIPHER_CCMP = 0x000FAC04
+CIPHER_WEP104 = 0x000FAC05
+CIPHER_BIP_CMAC = 0x000FAC06
+CIPHER_GCMP = 0x000FAC08
+CIPHER_GCMP_256 = 0x000FAC09
+CIPHER_CCMP_256 = 0x000FAC0A
+
+cipher_suites = {
+    CIPHER_WEP40: "WEP-40",
+    CIPHER_TKIP: "TKIP",
+    CIPHER_CCMP: "CCMP",
+    CIPHER_WEP104: "WEP-104",
+    CIPHER_BIP_CMAC: "BIP-CMAC-128",
+    CIPHER_GCMP: "GCMP",
+    CIPHER_GCMP_256: "GCMP-256",
+    CIPHER_CCMP_256: "CCMP-256",
+    0x0050F201: "WEP-40",
+    0x0050F202: "TKIP",
+    0x0050F204: "CCMP",
+    0x0050F205: "WEP-104",
+}
+
+# AKM suite selectors
+AKM_8021X = 0x000FAC01
+AKM_PSK = 0x000FAC02
+AKM_FT_8021X = 0x000FAC03
+AKM_FT_PSK = 0x000FAC04
+AKM_8021X_SHA256 = 0x000FAC05
+AKM_PSK_SHA256 = 0x000FAC06
+AKM_SAE = 0x000FAC08
+AKM_FT_SAE = 0x000FAC09
+AKM_8021X_SUITE_B_192 = 0x000FAC0C
+AKM_OWE = 0x000FAC12
+
+akm_suites = {
+    AKM_8021X: "802.1X",
+    AKM_PSK: "PSK",
+    AKM_FT_8021X: "FT/802.1X",
+    AKM_FT_PSK: "FT/PSK",
+    AKM_8021X_SHA256: "802.1X-SHA256",
+    AKM_PSK_SHA256: "PSK-SHA256",
+    AKM_SAE: "SAE",
+    AKM_FT_SAE: "FT/SAE",
+    AKM_8021X_SUITE_B_192: "802.1X-Suite-B-192",
+    AKM_OWE: "OWE",
+    0x0050F201: "802.1X",
+    0x0050F202: "PSK",
+}
+
+STRUCT_UINT16 = struct.Struct("<H")
+STRUCT_SUITE = struct.Struct(">I")  # OUI and type, read as one number
+STRUCT_BSS_LOAD = struct.Struct("<HBH")  # stations, utilization, capacity
+STRUCT_MOBILITY_DOMAIN = struct.Struct("<HB")  # MDID, FT capability
+STRUCT_HT_CAPABILITIES = struct.Struct("<HB16s")  # info, A-MPDU, MCS set
+STRUCT_HT_OPERATION = struct.Struct("BB")  # primary channel, info
+STRUCT_VHT_CAPABILITIES = struct.Struct("<IHHHH")  # info, rx/tx MCS maps
+STRUCT_VHT_OPERATION = struct.Struct("<BBBH")  # width, centers, MCS map
+# extension ID, MAC and PHY capabilities, <= 80 MHz rx/tx MCS maps
+STRUCT_HE_CAPABILITIES = struct.Struct("<B6s11sHH")
+STRUCT_HE_OPERATION = struct.Struct("<B3sBH")  # extension ID, params, color
+
+
+def _spatialStreams(mcs_map):
+    """ Returns the streams supported by a VHT/HE MCS map (2 bits each). """
+    streams = 0
+    for stream in range(8):
+        if (mcs_map >> (2 * stream)) & 3 != 3:
+            streams = stream + 1
+    return streams
+
+
+class Ie:
+    """An information element.
+
+    Typed subclasses list the attributes they decode in 'fields'; these
+    are set by _decode() when one of them is first read.  Data which is
+    too short leaves the remaining fields None.
+
+    """
+
+    __slots__ = ("id", "data")
+    fields = ()
+
+    def __init__(self, element_id, data):
+        self.id = element_id
+        # the element's body, without id and length
+        self.data = data
+
+    def __getattr__(self, name):
+        # only reached for attributes which are not set yet
+        fields = type(self).fields
+        if name not in fields:
+            raise AttributeError(name)
+        try:
+            self._decode()
+        except (struct.error, IndexError):
+            # truncated element, keep what was decoded
+            for field in fields:
+                try:
+                    object.__getattribute__(self, field)
+                except AttributeError:
+                    object.__setattr__(self, field, None)
+        return object.__getattribute__(self, name)
+
+    def __repr__(self):
+        return "<%s %d, %d bytes>" % (type(self).__name__, self.id, len(self.data))
+
+    def _decode(self):
+        pass
+
+    def _readSuites(self, offset):
+        """Reads a suite count and list at offset.
+
+        Returns the list of suite selectors and the offset after it.
+
+        """
+        (count,) = STRUCT_UINT16.unpack_from(self.data, offset)
+        offset = offset + 2
+        suites = [
+            STRUCT_SUITE.unpack_from(self.data, offset + 4 * index)[0]
+            for index in range(count)
+        ]
+        return suites, offset + 4 * count
+
+
+class SsidIe(Ie):
+    __slots__ = fields = ("ssid",)
+
+    def _decode(self):
+        self.ssid = bytes(self.data)
+
+
+class RatesIe(Ie):
+    """ Supported and extended supported rates, in b/s. """
+
+    __slots__ = fields = ("rates", "basic_rates")
+
+    def _decode(self):
+        # units of 500 kb/s, the high bit marks basic rates
+        self.rates = [(rate & 0x7F) * 500000 for rate in self.data]
+        self.basic_rates = [(rate & 0x7F) * 500000 for rate in self.data if rate & 0x80]
+
+
+class DsParameterIe(Ie):
+    __slots__ = fields = ("channel",)
+
+    def _decode(self):
+        self.channel = self.data[0]
+
+
+class CountryIe(Ie):
+    """ The country code and its (first channel, channels, max dBm) list. """
+
+    __slots__ = fields = ("country", "environment", "channels")
+
+    def _decode(self):
+        self.country = bytes(self.data[:2]).decode("ascii", "replace")
+        self.environment = self.data[2]
+        self.channels = []
+        for offset in range(3, len(self.data) - 2, 3):
+            first_channel, count, max_power = self.data[offset : offset + 3]
+            # operating extension identifiers (>= 201) are not channels
+            if first_channel < 201:
+                self.channels.append((first_channel, count, max_power))
+
+
+class BssLoadIe(Ie):
+    __slots__ = fields = ("station_count", "channel_utilization", "admission_capacity")
+
+    def _decode(self):
+        (
+            self.station_count,
+            self.channel_utilization,
+            self.admission_capacity,
+        ) = STRUCT_BSS_LOAD.unpack_from(self.data)
+
+
+class RsnIe(Ie):
+    """ RSN (WPA2/WPA3) element; suites are selectors, see cipher_suites. """
+
+    __slots__ = fields = (
+        "version",
+        "group_cipher",
+        "pairwise_ciphers",
+        "akm_suites",
+        "capabilities",
+    )
+    # where version starts in the body
+    offset = 0
+
+    def _decode(self):
+        data = self.data
+        offset = self.offset
+        (self.version,) = STRUCT_UINT16.unpack_from(data, offset)
+        (self.group_cipher,) = STRUCT_SUITE.unpack_from(data, offset + 2)
+        self.pairwise_ciphers, offset = self._readSuites(offset + 6)
+        self.akm_suites, offset = self._readSuites(offset)
+        (self.capabilities,) = STRUCT_UINT16.unpack_from(data, offset)
+
+
+class WpaIe(RsnIe):
+    """ The WPA1 vendor element, laid out like RSN after OUI and type. """
+
+    __slots__ = ()
+    offset = 4
+
+
+class MobilityDomainIe(Ie):
+    __slots__ = fields = ("mdid", "ft_capability")
+
+    def _decode(self):
+        self.mdid, self.ft_capability = STRUCT_MOBILITY_DOMAIN.unpack_from(self.data)
+
+
+class HtCapabilitiesIe(Ie):
+    __slots__ = fields = (
+        "capabilities",
+        "ampdu_parameters",
+        "mcs_set",
+        "spatial_streams",
+        "channel_width_40",
+    )
+
+    def _decode(self):
+        (
+            self.capabilities,
+            self.ampdu_parameters,
+            self.mcs_set,
+        ) = STRUCT_HT_CAPABILITIES.unpack_from(self.data)
+        # one byte of the rx MCS bitmask per spatial stream
+        self.spatial_streams = sum(1 for mcs in self.mcs_set[:4] if mcs)
+        self.channel_width_40 = bool(self.capabilities & 0x0002)
+
+
+class HtOperationIe(Ie):
+    __slots__ = fields = ("primary_channel", "secondary_offset", "channel_width_40")
+
+    def _decode(self):
+        self.primary_channel, info = STRUCT_HT_OPERATION.unpack_from(self.data)
+        # 1: secondary channel above, 3: below, 0: none
+        self.secondary_offset = info & 0x03
+        self.channel_width_40 = bool(info & 0x04)
+
+
+class VhtCapabilitiesIe(Ie):
+    __slots__ = fields = (
+        "capabilities",
+        "rx_mcs_map",
+        "rx_highest",
+        "tx_mcs_map",
+        "tx_highest",
+        "spatial_streams",
+    )
+
+    def _decode(self):
+        (
+            self.capabilities,
+            self.rx_mcs_map,
+            self.rx_highest,
+            self.tx_mcs_map,
+            self.tx_highest,
+        ) = STRUCT_VHT_CAPABILITIES.unpack_from(self.data)
+        self.spatial_streams = _spatialStreams(self.rx_mcs_map)
+
+
+class VhtOperationIe(Ie):
+    """ channel_width: 0 for 20/40 MHz, 1 for 80, 160 or 80+80 MHz. """
+
+    __slots__ = fields = (
+        "channel_width",
+        "center_segment0",
+        "center_segment1",
+        "basic_mcs_map",
+    )
+
+    def _decode(self):
+        (
+            self.channel_width,
+            self.center_segment0,
+            self.center_segment1,
+            self.basic_mcs_map,
+        ) = STRUCT_VHT_OPERATION.unpack_from(self.data)
+
+
+class HeCapabilitiesIe(Ie):
+    __slots__ = fields = (
+        "mac_capabilities",
+        "phy_capabilities",
+        "rx_mcs_map",
+        "tx_mcs_map",
+        "spatial_streams",
+    )
+
+    def _decode(self):
+        (
+            ext_id,
+            self.mac_capabilities,
+            self.phy_capabilities,
+            self.rx_mcs_map,
+            self.tx_mcs_map,
+        ) = STRUCT_HE_CAPABILITIES.unpack_from(self.data)
+        self.spatial_streams = _spatialStreams(self.rx_mcs_map)
+
+
+class HeOperationIe(Ie):
+    __slots__ = fields = ("parameters", "bss_color", "basic_mcs_map")
+
+    def _decode(self):
+        (
+            ext_id,
+            parameters,
+            self.bss_color,
+            self.basic_mcs_map,
+        ) = STRUCT_HE_OPERATION.unpack_from(self.data)
+        self.parameters = int.from_bytes(parameters, "little")
+        self.bss_color = self.bss_color & 0x3F
+
+
+class VendorIe(Ie):
+    """ A vendor specific element: OUI and type, then vendor data. """
+
+    __slots__ = fields = ("oui", "vendor_type")
+
+    def _decode(self):
+        self.oui = bytes(self.data[:3])
+        self.vendor_type = self.data[3]
+
+
+# Ie class by element ID; IDs not listed are left as Ie
+ie_classes = {
+    IE_SSID: SsidIe,
+    IE_SUPPORTED_RATES: RatesIe,
+    IE_DS_PARAMETER_SET: DsParameterIe,
+    IE_COUNTRY: CountryIe,
+    IE_BSS_LOAD: BssLoadIe,
+    IE_HT_CAPABILITIES: HtCapabilitiesIe,
+    IE_RSN: RsnIe,
+    IE_EXTENDED_RATES: RatesIe,
+    IE_MOBILITY_DOMAIN: MobilityDomainIe,
+    IE_HT_OPERATION: HtOperationIe,
+    IE_VHT_CAPABILITIES: VhtCapabilitiesIe,
+    IE_VHT_OPERATION: VhtOperationIe,
+}
+# Ie class of vendor elements by OUI and type, VendorIe otherwise
+vendor_ie_classes = {
+    VENDOR_WPA: WpaIe,
+}
+# Ie class of extension elements by element ID extension
+extension_ie_classes = {
+    IE_EXT_HE_CAPABILITIES: HeCapabilitiesIe,
+    IE_EXT_HE_OPERATION: HeOperationIe,
+}
+
+# element IDs which may hold each Ie class
+_class_ids = {VendorIe: {IE_VENDOR}}
+for _element_id, _ie_class in ie_classes.items():
+    _class_ids.setdefault(_ie_class, set()).add(_element_id)
+for _ie_class in vendor_ie_classes.values():
+    _class_ids[_ie_class] = {IE_VENDOR}
+for _ie_class in extension_ie_classes.values():
+    _class_ids[_ie_class] = {IE_EXTENSION}
+del _element_id, _ie_class
+
+
+def walkIes(data):
+    """Returns the (element ID, body start, body end) of each element of
+    a buffer of information elements.
+
+    A truncated last element is dropped.
+
+    """
+    end = len(data)
+    offset = 0
+    spans = []
+    while end - offset >= 2:
+        element_id = data[offset]
+        start = offset + 2
+        offset = start + data[offset + 1]
+        if offset > end:
+            break
+        spans.append((element_id, start, offset))
+    return spans
+
+
+def getIeClass(data, element_id, start, end):
+    """ Returns the Ie class of the element with its body at start:end. """
+    if element_id == IE_VENDOR and end - start >= 4:
+        key = int.from_bytes(data[start : start + 4], "big")
+        return vendor_ie_classes.get(key, VendorIe)
+    if element_id == IE_EXTENSION and end > start:
+        return extension_ie_classes.get(data[start], Ie)
+    return ie_classes.get(element_id, Ie)
+
+
+def parseIes(data):
+    """ Returns the list of Ie objects of a buffer of information elements. """
+    view = memoryview(data)
+    return [
+        getIeClass(data, element_id, start, end)(element_id, view[start:end])
+        for element_id, start, end in walkIes(data)
+    ]
+
+
+def _firstIe(ie_class):
+    def find(self):
+        return self.find(ie_class)
+
+    find.__doc__ = "The first %s, or None." % ie_class.__name__
+    return property(find)
+
+
+class IeList:
+    """The information elements of one BSS, in the order received.
+
+    The buffer is only walked when the list is first used, and an Ie
+    object is only made for the elements which are looked at.
+
+    """
+
+    __slots__ = ("data", "_spans", "_ies")
+
+    def __init__(self, data=b""):
+        self.data = bytes(data)
+        # walkIes() of data and the Ie made of each span so far
+        self._spans = None
+        self._ies = None
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._getIe(index)
+
+    def __len__(self):
+        return len(self._getSpans())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return self._getIe(range(len(self))[index])
+
+    def __repr__(self):
+        return "<IeList %r>" % (list(self),)
+
+    def add(self, data):
+        """ Appends the elements of data. """
+        self.data = self.data + data
+        self._spans = self._ies = None
+
+    def get(self, element_id):
+        """ Returns the first element with element_id, or None. """
+        for index, span in enumerate(self._getSpans()):
+            if span[0] == element_id:
+                return self._getIe(index)
+        return None
+
+    def find(self, ie_class):
+        """ Returns the first element of ie_class, or None. """
+        data = self.data
+        element_ids = _class_ids.get(ie_class)
+        for index, span in enumerate(self._getSpans()):
+            if element_ids is not None and span[0] not in element_ids:
+                continue
+            if getIeClass(data, *span) is ie_class:
+                return self._getIe(index)
+        return None
+
+    def _getSpans(self):
+        if self._spans is None:
+            self._spans = walkIes(self.data)
+            self._ies = [None] * len(self._spans)
+        return self._spans
+
+    def _getIe(self, index):
+        element = self._ies[index]
+        if element is None:
+            element_id, start, end = self._spans[index]
+            ie_class = getIeClass(self.data, element_id, start, end)
+            element = ie_class(element_id, memoryview(self.data)[start:end])
+            self._ies[index] = element
+        return element
+
+    ssid = _firstIe(SsidIe)
+    rsn = _firstIe(RsnIe)
+    wpa = _firstIe(WpaIe)
+    country = _firstIe(CountryIe)
+    bss_load = _firstIe(BssLoadIe)
+    mobility_domain = _firstIe(MobilityDomainIe)
+    ht_capabilities = _firstIe(HtCapabilitiesIe)
+    ht_operation = _firstIe(HtOperationIe)
+    vht_capabilities = _firstIe(VhtCapabilitiesIe)
+    vht_operation = _firstIe(VhtOperationIe)
+    he_capabilities = _firstIe(HeCapabilitiesIe)
+    he_operation = _firstIe(HeOperationIe)
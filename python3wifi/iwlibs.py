@@ -22,22 +22,223 @@
 
 import struct
 import array
+import collections
+import concurrent.futures
 import math
 import errno
 import fcntl
+import functools
+import json
 import os
 import socket
 import time
 import re
 import sys
+import threading
+import weakref
 
 from . import flags as wififlags
+from . import ie
+from . import rtnetlink
 
 
 KILO = 10 ** 3
 MEGA = 10 ** 6
 GIGA = 10 ** 9
 
+# bounds, in seconds, of the adaptive wait between SIOCGIWSCAN retries
+# while a scan is in progress; with an rtnetlink listener the wait ends
+# as soon as the scan completion event arrives
+SCAN_WAIT_MIN = 0.01
+SCAN_WAIT_MAX = 0.1
+SCAN_WAIT_MAX_EVENT = 1.0
+
+# scan buffers are sized to the largest result seen times this headroom,
+# up to the largest length an iw_point can describe
+SCAN_BUFFER_HEADROOM = 1.25
+SCAN_BUFFER_MAX = 0xFFFF
+
+# default number of interfaces probeMany() reads at once
+PROBE_WORKERS = 8
+
+# read by Iwstatsfile, with a buffer of this initial size
+PROC_NET_WIRELESS = "/proc/net/wireless"
+PROC_BUFFER_SIZE = 4096
+
+# where discoverWNICs() looks for network interfaces
+SYSFS_NET = "/sys/class/net"
+
+
+# Precompiled layouts of the wireless extension structures.  Decoding
+# uses unpack_from() with an explicit offset, so it works directly on
+# bytes, arrays and memoryviews without slicing copies and without any
+# shared cursor state.
+STRUCT_IW_PARAM = struct.Struct("ibbH")  # value, fixed, disabled, flags
+STRUCT_IW_FREQ = struct.Struct("ihbb")  # mantissa, exponent, index, flags
+STRUCT_IW_QUALITY = struct.Struct("BbbB")  # qual, level, noise, updated
+# status, iw_quality, iw_discarded, iw_missed
+STRUCT_IW_STATISTICS = struct.Struct("2BBbbB6i")
+STRUCT_IW_RANGE = struct.Struct(
+    "IIIHB6Ii4B4BB"
+    + wififlags.IW_MAX_BITRATES * "i"
+    + "2i2i2i2i3H"
+    + wififlags.IW_MAX_ENCODING_SIZES * "H"
+    + "2BBHB"
+    + wififlags.IW_MAX_TXPOWER * "i"
+    + "2B3H2i2iHB"
+    + wififlags.IW_MAX_FREQUENCIES * "ihBB"
+    + "IiiHiI"
+)
+STRUCT_IW_POINT = struct.Struct("PHH")  # pointer, length, flags
+# scan_type, essid_len, num_channels, flags, bssid, essid,
+# min_channel_time, max_channel_time, channel_list
+STRUCT_IW_SCAN_REQ = struct.Struct(
+    "BBBB16s32sII" + wififlags.IW_MAX_FREQUENCIES * "ihBB"
+)
+STRUCT_IW_WRQ = struct.Struct("Pi")  # pointer, length (as packed by pack_wrq)
+STRUCT_IW_EVENT_HEADER = struct.Struct("HH")  # length, cmd
+STRUCT_IW_POINT_PK = struct.Struct("HH")  # length, flags of an event's iw_point
+STRUCT_SOCKADDR_HWADDR = struct.Struct("xx6B")  # sa_family, MAC address
+STRUCT_UINT = struct.Struct("I")
+# struct ifreq holding ifr_ifindex, padded to the 64 bit size
+STRUCT_IFREQ_IFINDEX = struct.Struct("16si20x")
+# struct ifconf: buffer length, buffer address
+STRUCT_IFCONF = struct.Struct("iP")
+# struct ifreq holding an ifr_addr: name, sa_family, IPv4 address; its
+# size depends on whether we're on 32 or 64 bit Linux
+IFREQ_SIZE = 40 if sys.maxsize > 2 ** 32 else 32
+STRUCT_IFREQ_ADDR = struct.Struct("16sH2x4s%dx" % (IFREQ_SIZE - 24))
+# initial SIOCGIFCONF buffer size, doubled until all interfaces fit
+IFCONF_BUFFER_SIZE = 32 * IFREQ_SIZE
+# the union part of struct iwreq, packing it with no values zeroes it
+STRUCT_IWREQ_DATA = struct.Struct("16x")
+
+# a wireless interface as found by discoverWNICs(); phy is the cfg80211
+# wiphy name and driver the kernel driver name, both None if unknown
+Wnic = collections.namedtuple("Wnic", ("ifname", "ifindex", "phy", "driver"))
+
+# a configured interface as listed by getConfiguredNICs(); ifindex is
+# None if the interface went away, address None if it is not IPv4
+Nic = collections.namedtuple("Nic", ("ifname", "ifindex", "address"))
+
+# one interface of /proc/net/wireless, as read by Iwstatsfile: status,
+# quality, level and noise as listed (level and noise are signed dBm
+# values for drivers reporting dBm), updated holds the IW_QUAL_*_UPDATED
+# flags, then the discarded packet counters and the missed beacons
+Wstats = collections.namedtuple(
+    "Wstats",
+    (
+        "ifname",
+        "status",
+        "quality",
+        "level",
+        "noise",
+        "updated",
+        "nwid",
+        "crypt",
+        "frag",
+        "retry",
+        "misc",
+        "beacon",
+    ),
+)
+
+# registry of the above layouts by their C structure name
+structs = {
+    "iw_param": STRUCT_IW_PARAM,
+    "iw_freq": STRUCT_IW_FREQ,
+    "iw_quality": STRUCT_IW_QUALITY,
+    "iw_statistics": STRUCT_IW_STATISTICS,
+    "iw_range": STRUCT_IW_RANGE,
+    "iw_point": STRUCT_IW_POINT,
+    "iw_scan_req": STRUCT_IW_SCAN_REQ,
+    "iw_event": STRUCT_IW_EVENT_HEADER,
+}
+
+# formats seen by Iwstruct.parse_data/unpack, compiled on first use
+_struct_cache = {}
+
+
+def getStruct(fmt):
+    """Returns a precompiled struct.Struct for fmt.
+
+    fmt may be a format string or a name from the structs registry.
+
+    """
+    try:
+        return structs[fmt]
+    except KeyError:
+        pass
+    try:
+        return _struct_cache[fmt]
+    except KeyError:
+        compiled = _struct_cache[fmt] = struct.Struct(fmt)
+        return compiled
+
+
+# IEEE 802.11 channel plans: band -> {channel: frequency in Hz}
+ieee80211_bands = {
+    "2.4GHz": dict(
+        [(channel, (2407 + 5 * channel) * MEGA) for channel in range(1, 14)]
+        + [(14, 2484 * MEGA)]
+    ),
+    "5GHz": dict(
+        [(channel, (5000 + 5 * channel) * MEGA) for channel in range(32, 178)]
+    ),
+    "6GHz": dict(
+        [(channel, (5950 + 5 * channel) * MEGA) for channel in range(1, 234, 4)]
+        + [(2, 5935 * MEGA)]
+    ),
+}
+
+# frequency in Hz -> (band, channel)
+ieee80211_frequencies = dict(
+    (frequency, (band, channel))
+    for band, channels in ieee80211_bands.items()
+    for channel, frequency in channels.items()
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def formatFrequency(frequency):
+    """Returns frequency (in Hz) formatted as iwconfig does.
+
+    Returns None for values below 1 kHz, which are channel numbers.
+    The results are memoized, since only a few dozen distinct
+    frequencies are ever seen.
+
+    >>> formatFrequency(2417000000)
+    '2.417 GHz'
+
+    """
+    frequency = float(frequency)
+    if frequency >= GIGA:
+        return "%0.3f GHz" % (frequency / GIGA)
+    if frequency >= MEGA:
+        return "%0.3f MHZ" % (frequency / MEGA)
+    if frequency >= KILO:
+        return "%0.3f kHz" % (frequency / KILO)
+    return None
+
+
+def getIfindex(ifname):
+    """Returns the kernel's interface index for ifname.
+
+    Raises OSError (ENODEV) if there is no such interface.
+
+    >>> getIfindex('lo')
+    1
+
+    """
+    encoded = ifname.encode("utf-8")
+    if len(encoded) >= wififlags.IFNAMSIZE:
+        raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+    iwstruct = Iwstruct()
+    result = iwstruct._fcntl(
+        wififlags.SIOCGIFINDEX, STRUCT_IFREQ_IFINDEX.pack(encoded, 0)
+    )
+    return STRUCT_IFREQ_IFINDEX.unpack(result)[1]
+
 
 def getNICnames():
     """Extract network device names from /proc/net/dev.
@@ -63,37 +264,143 @@ def getNICnames():
 
 
 def getWNICnames():
-    """Determine which interfaces in /proc/net/dev are wireless
+    """Determine which network interfaces are wireless.
     /proc/net/wireless is no longer usable for this purpose
     Returns empty list if no devices are present.
 
+    The interfaces are kept in wniccache, so after the first call this
+    is a dictionary read unless interfaces were added or removed.
+
     >>> getWNICnames()
     ['eth1', 'wifi0']
 
     """
-    device = re.compile("[a-z]{2,}[a-z0-9]*:")
-    ifnames = []
+    return [wnic.ifname for wnic in wniccache.get()]
 
-    fp = open("/proc/net/dev")
-    for line in fp:
-        try:
-            # append matching pattern, without the trailing colon
-            ifname = device.search(line).group()[:-1]
+
+def discoverWNICs(sysfs=SYSFS_NET):
+    """Returns a Wnic record for each wireless interface.
+
+    The interfaces are found in one pass over the sysfs network class
+    directory: wireless extension drivers have a 'wireless' directory
+    there, cfg80211 drivers a 'phy80211' link.  Without sysfs each
+    interface in /proc/net/dev is probed with SIOCGIWNAME instead, over
+    the shared ioctl socket, and phy and driver are None.
+
+    The records are sorted by interface index.
+
+    >>> discoverWNICs()
+    [Wnic(ifname='wlan0', ifindex=3, phy='phy0', driver='iwlwifi')]
+
+    """
+    try:
+        entries = os.scandir(sysfs)
+    except OSError:
+        return _probeWNICs()
+    wnics = []
+    with entries:
+        for entry in entries:
+            wnic = _readWNIC(entry.path, entry.name)
+            if wnic is not None:
+                wnics.append(wnic)
+    wnics.sort(key=lambda wnic: wnic.ifindex)
+    return wnics
+
+
+def _readWNIC(path, ifname):
+    """Returns the Wnic of the interface at path in sysfs, or None if it
+    is not wireless or does not exist (any more).
+
+    """
+    try:
+        phy = os.path.basename(os.readlink(path + "/phy80211"))
+    except OSError:
+        if not os.path.isdir(path + "/wireless"):
+            return None
+        phy = None
+    try:
+        with open(path + "/ifindex", "rb") as fp:
+            ifindex = int(fp.read())
+    except OSError:
+        # removed since the directory was listed
+        return None
+    try:
+        driver = os.path.basename(os.readlink(path + "/device/driver"))
+    except OSError:
+        # virtual interfaces have no device
+        driver = None
+    return Wnic(ifname, ifindex, phy, driver)
+
+
+def _probeWNIC(ifname, iwstruct=None):
+    """ Returns a Wnic if ifname answers SIOCGIWNAME, None otherwise. """
+    if iwstruct is None:
+        iwstruct = Iwstruct()
+    try:
+        iwstruct.iw_get_ext(ifname, wififlags.SIOCGIWNAME)
+        return Wnic(ifname, getIfindex(ifname), None, None)
+    except OSError:
+        return None
+
+
+def _probeWNICs():
+    """ Returns a Wnic per interface answering SIOCGIWNAME. """
+    iwstruct = Iwstruct()
+    wnics = []
+    for ifname in getNICnames():
+        wnic = _probeWNIC(ifname, iwstruct)
+        if wnic is not None:
+            wnics.append(wnic)
+    # if we couldn't lookup the devices, try to ask the kernel
+    if not wnics:
+        for ifname in getConfiguredWNICnames():
             try:
-                # Check to see if there are wireless extensions
-                wifi = Wireless(ifname)
-                name = wifi.getWirelessName()
+                wnics.append(Wnic(ifname, getIfindex(ifname), None, None))
             except OSError:
                 pass
-            else:
-                ifnames.append(ifname)
-        except AttributeError:
-            pass
-    # if we couldn't lookup the devices, try to ask the kernel
-    if not ifnames:
-        ifnames = getConfiguredWNICnames()
+    wnics.sort(key=lambda wnic: wnic.ifindex)
+    return wnics
 
-    return ifnames
+
+def getConfiguredNICs():
+    """Returns a Nic record for each configured (IPv4) interface, as
+    listed by the SIOCGIFCONF ioctl.
+
+    An interface with several addresses is listed once per address,
+    under its alias names (e.g. 'eth0:1').
+
+    >>> getConfiguredNICs()
+    [Nic(ifname='lo', ifindex=1, address='127.0.0.1')]
+
+    """
+    iwstruct = Iwstruct()
+    size = IFCONF_BUFFER_SIZE
+    while True:
+        buff = array.array("B", bytes(size))
+        result = iwstruct._fcntl(
+            wififlags.SIOCGIFCONF, STRUCT_IFCONF.pack(size, buff.buffer_info()[0])
+        )
+        length = STRUCT_IFCONF.unpack(result)[0]
+        # a full buffer may have been truncated, ask again with more room
+        if length + IFREQ_SIZE <= size:
+            break
+        size = size * 2
+    nics = []
+    for name, family, address in STRUCT_IFREQ_ADDR.iter_unpack(
+        memoryview(buff)[:length]
+    ):
+        ifname = name.split(b"\0", 1)[0].decode("utf8")
+        if family == socket.AF_INET:
+            address = socket.inet_ntoa(address)
+        else:
+            address = None
+        try:
+            ifindex = getIfindex(ifname)
+        except OSError:
+            # removed since it was listed
+            ifindex = None
+        nics.append(Nic(ifname, ifindex, address))
+    return nics
 
 
 def getConfiguredWNICnames():
@@ -103,32 +410,18 @@ def getConfiguredWNICnames():
     []
 
     """
-    # Determine number of bytes in an ifreq structure
-    # This depends on whether we're on 32 or 64 bit
-    # Linux.
-    ifreq_bytes = 40 if sys.maxsize > 2 ** 32 else 32
     iwstruct = Iwstruct()
     ifnames = []
-    buff = array.array("B", b"\0" * 1000)
-    caddr_t, length = buff.buffer_info()
-    datastr = iwstruct.pack("iP", length, caddr_t)
-    result = iwstruct._fcntl(wififlags.SIOCGIFCONF, datastr)
-    # get the interface names out of the buffer
-    for i in range(0, 1000 - ifreq_bytes, ifreq_bytes):
-        ifname = buff.tobytes()[i : i + ifreq_bytes]
-        ifname = struct.unpack(f"{ifreq_bytes}s", ifname)[0]
-        ifname = ifname.split(b"\0", 1)[0].decode("utf8")
-        if ifname:
-            # verify if ifnames are really wifi devices
-            wifi = Wireless(ifname)
-            try:
-                result = wifi.getAPaddr()
-            except OSError:
-                # don't stop on an individual error
-                pass
-            # print("{}: {}".format(ifname, result))
-            if result[0] != 0:
-                ifnames.append(ifname)
+    for nic in getConfiguredNICs():
+        if nic.ifname in ifnames:
+            continue
+        # verify if ifnames are really wifi devices
+        try:
+            iwstruct.iw_get_ext(nic.ifname, wififlags.SIOCGIWAP)
+        except OSError:
+            # don't stop on an individual error
+            continue
+        ifnames.append(nic.ifname)
     return ifnames
 
 
@@ -141,6 +434,70 @@ def hex2int(hexstring):
     return int(hexstring, 16)
 
 
+def _resetAtFork(obj):
+    """Calls obj._afterFork() in the child process after each fork(),
+    for as long as obj exists.
+
+    """
+    ref = weakref.ref(obj)
+
+    def afterFork():
+        obj = ref()
+        if obj is not None:
+            obj._afterFork()
+
+    os.register_at_fork(after_in_child=afterFork)
+
+
+class Iwsocketpool:
+    """Process-wide pool of the ioctl control socket.
+
+    All Iwstruct objects draw the AF_INET/SOCK_DGRAM socket used for
+    ioctl calls from here, instead of each opening their own.  The
+    socket is created lazily under a lock, so it is safe to share
+    between threads, and it is reopened in a child process after
+    fork().
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sockfd = None
+        _resetAtFork(self)
+
+    def get(self):
+        """Returns the control socket, opening it if needed."""
+        sockfd = self._sockfd
+        if sockfd is not None:
+            return sockfd
+        with self._lock:
+            if self._sockfd is None:
+                self._sockfd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            return self._sockfd
+
+    def close(self):
+        """Closes the control socket.
+
+        A new socket is opened the next time one is needed.
+
+        """
+        with self._lock:
+            if self._sockfd is not None:
+                self._sockfd.close()
+            self._sockfd = None
+
+    def _afterFork(self):
+        """ Drops the socket inherited from the parent, in the child. """
+        # another thread of the parent may have held the lock
+        self._lock = threading.Lock()
+        if self._sockfd is not None:
+            self._sockfd.close()
+        self._sockfd = None
+
+
+socketpool = Iwsocketpool()
+
+
 class Wireless:
     """Provides high-level access to wireless interfaces.
 
@@ -149,11 +506,36 @@ class Wireless:
     """
 
     def __init__(self, ifname):
-        self.sockfd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.ifname = ifname
         self.iwstruct = Iwstruct()
         self.wireless_info = WirelessInfo(self.ifname)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def sockfd(self):
+        """ The control socket used for ioctl calls. """
+        return self.iwstruct.sockfd
+
+    @property
+    def iwrequest(self):
+        """ The reusable ioctl buffers for this interface. """
+        return self.wireless_info.iwrequest
+
+    def close(self):
+        """Releases this object's hold on the control socket.
+
+        The shared socket itself stays open for other users; call
+        socketpool.close() to close it.
+
+        """
+        self.iwstruct.close()
+        self.wireless_info.close()
+
     def getAPaddr(self):
         """Returns the access point MAC address.
 
@@ -250,22 +632,32 @@ class Wireless:
             integer.
 
         """
-        raw_frequency = float(raw_frequency)
-        if raw_frequency >= GIGA:
-            return "%0.3f GHz" % (raw_frequency / GIGA)
-        if raw_frequency >= MEGA:
-            return "%0.3f MHZ" % (raw_frequency / MEGA)
         if raw_frequency >= KILO:
-            return "%0.3f kHz" % (raw_frequency / KILO)
+            return formatFrequency(raw_frequency)
         # This is probably a channel number
         raw_frequency = int(raw_frequency)
-        try:
-            return self.getChannelInfo()[1][raw_frequency - 1]
-        except IndexError:
-            # probably auto (i.e. -1 (a.k.a. 255))
-            pass
+        frequency = self.getRange().channel_index.getFrequency(raw_frequency)
+        if frequency is not None:
+            return formatFrequency(frequency)
+        # probably auto (i.e. -1 (a.k.a. 255))
         return raw_frequency
 
+    def getChannel(self, raw_frequency):
+        """Returns the channel number for a frequency, or None.
+
+        'raw_frequency' -- long -- frequency in Hz, or a channel number
+            as some drivers report.
+
+        >>> from iwlibs import Wireless
+        >>> wifi = Wireless('eth1')
+        >>> wifi.getChannel(2417000000)
+        2
+
+        """
+        if raw_frequency < KILO:
+            return int(raw_frequency)
+        return self.getRange().channel_index.getChannel(raw_frequency)
+
     def getChannelInfo(self):
         """Returns the number of channels and available frequencies for
         the device.
@@ -277,11 +669,22 @@ class Wireless:
          True
 
         """
-        iwrange = Iwrange(self.ifname)
-        frequencies = []
-        for freq in iwrange.frequencies:
-            frequencies.append(self._formatFrequency(freq))
-        return (iwrange.num_channels, frequencies)
+        iwrange = self.getRange()
+        return (iwrange.num_channels, list(iwrange.channel_index.formatted))
+
+    def getRange(self):
+        """Returns the Iwrange for the interface.
+
+        The Iwrange is shared through rangecache, so it must be treated
+        as read-only.
+
+        >>> from iwlibs import Wireless
+        >>> wifi = Wireless('eth1')
+        >>> wifi.getRange() is wifi.getRange()
+        True
+
+        """
+        return rangecache.get(self.ifname, self.iwrequest)
 
     def getEssid(self):
         """Returns the current ESSID information.
@@ -450,7 +853,7 @@ class Wireless:
         [(1, '1234-5678-91'), (2, None), (3, 'ABCD-EFAB-CD'), (4, None)]
 
         """
-        iwrange = Iwrange(self.ifname)
+        iwrange = self.getRange()
         keys = []
         if iwrange.max_encoding_tokens > 0:
             for i in range(1, iwrange.max_encoding_tokens + 1):
@@ -570,7 +973,7 @@ class Wireless:
         #'off'
 
         """
-        iwrange = Iwrange(self.ifname)
+        iwrange = self.getRange()
         iwparam = self.wireless_info.getPower()
         return (
             iwrange.pm_capa,
@@ -590,7 +993,7 @@ class Wireless:
         quality: 38 signal: 13 noise: 0
 
         """
-        iwrange = Iwrange(self.ifname)
+        iwrange = self.getRange()
         if iwrange.errorflag:
             return (iwrange.errorflag, iwrange.error)
         return iwrange.max_qual
@@ -605,7 +1008,7 @@ class Wireless:
         quality: 38 signal: 13 noise: 0
 
         """
-        iwrange = Iwrange(self.ifname)
+        iwrange = self.getRange()
         if iwrange.errorflag:
             return (iwrange.errorflag, iwrange.error)
         return iwrange.avg_qual
@@ -694,14 +1097,95 @@ class Wireless:
         /proc/net/wireless.
 
         """
-        iwstats = Iwstats(self.ifname)
+        iwstats = Iwstats(self.ifname, self.iwrequest)
         if iwstats.errorflag > 0:
             return (iwstats.errorflag, iwstats.error)
         return [iwstats.status, iwstats.qual, iwstats.discard, iwstats.missed_beacon]
 
-    def scan(self):
-        """ Returns Iwscanresult objects, after a successful scan. """
-        return Iwscan(self.ifname)
+    def scan(self, **targets):
+        """Returns Iwscanresult objects, after a successful scan.
+
+        Keyword arguments restrict the scan to an ESSID, channels, scan
+        type or dwell times (see Iwscanreq), which makes it much faster
+        than a full sweep:
+
+        >>> from iwlibs import Wireless
+        >>> wifi = Wireless('eth1')
+        >>> aps = wifi.scan(essid='romanofski', channels=[1, 6, 11])
+
+        """
+        return Iwscan(self.ifname, request=Iwscanreq(**targets))
+
+    def iterScan(self, **targets):
+        """Triggers a scan and yields Iwscanresult objects one at a time.
+
+        Unlike scan(), results are parsed as they are consumed and not
+        kept, so memory use is bounded to one cell and the caller can
+        stop as soon as it has found what it needs:
+
+        >>> from iwlibs import Wireless
+        >>> wifi = Wireless('eth1')
+        >>> for ap in wifi.iterScan():
+        ...     if ap.essid == b'romanofski':
+        ...         break
+
+        """
+        scan = Iwscan(self.ifname, request=Iwscanreq(**targets), read=False)
+        scan.trigger()
+        return scan.iterScan()
+
+    def cachedScan(self, timeout=0):
+        """Returns the results the kernel kept from the last scan.
+
+        No scan is triggered, which makes this cheap enough to call
+        every few hundred milliseconds to watch the surroundings while
+        another process (e.g. wpa_supplicant) does the scanning.  The
+        interface's request and scan buffers are reused between calls.
+
+        'timeout' -- float -- seconds to wait while a scan is in
+            progress, forever if None.  By default there is a single
+            non-blocking read, which raises OSError (EAGAIN) while a
+            scan is running; OSError (ETIMEDOUT) is raised when a
+            longer timeout expires.
+
+        """
+        scan = Iwscan(self.ifname, read=False, iwrequest=self.iwrequest)
+        scan.getScan(timeout)
+        return scan
+
+    def snapshot(self, fields=None):
+        """Returns an Iwsnapshot of raw values read back to back.
+
+        'fields' -- iterable -- names from snapshot_fields to read, all
+            of them if None.
+
+        All requests go over the shared control socket and this
+        interface's Iwrequest buffers.  A field whose ioctl fails is
+        None in the snapshot and its OSError is kept in the snapshot's
+        errors dict, so one unsupported request does not lose the rest.
+
+        >>> from iwlibs import Wireless
+        >>> wifi = Wireless('eth1')
+        >>> snap = wifi.snapshot(('essid', 'mode'))
+        >>> snap.essid, wififlags.modes[snap.mode]
+        (b'romanofski', 'Managed')
+
+        """
+        if fields is None:
+            fields = snapshot_fields
+        iwrequest = self.iwrequest
+        values = {}
+        errors = {}
+        for field in fields:
+            try:
+                request, decoder = snapshot_fields[field]
+            except KeyError:
+                raise ValueError("Unknown snapshot field: %s" % field)
+            try:
+                values[field] = decoder(iwrequest, request)
+            except OSError as error:
+                errors[field] = error
+        return Iwsnapshot(self.ifname, time.time(), values, errors)
 
     def commit(self):
         """ Commit pending changes. """
@@ -720,12 +1204,41 @@ class WirelessConfig:
     """
 
     def __init__(self, ifname):
-        self.sockfd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.ifname = ifname
         self.iwstruct = Iwstruct()
+        self._iwrequest = None
         # self.nwid = Iwparam
         self.freq_flags = 0
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def sockfd(self):
+        """ The control socket used for ioctl calls. """
+        return self.iwstruct.sockfd
+
+    @property
+    def iwrequest(self):
+        """ The reusable ioctl buffers for the current ifname. """
+        iwrequest = self._iwrequest
+        if iwrequest is None or iwrequest.ifname != self.ifname:
+            iwrequest = self._iwrequest = Iwrequest(self.ifname, self.iwstruct)
+        return iwrequest
+
+    def close(self):
+        """Releases this object's hold on the control socket and its
+        ioctl buffers.
+
+        """
+        if self._iwrequest is not None:
+            self._iwrequest.close()
+            self._iwrequest = None
+        self.iwstruct.close()
+
     def getWirelessName(self):
         """Returns the wireless name.
 
@@ -735,7 +1248,7 @@ class WirelessConfig:
         'IEEE 802.11-DS'
 
         """
-        status, result = self.iwstruct.iw_get_ext(self.ifname, wififlags.SIOCGIWNAME)
+        result = self.iwrequest.get(wififlags.SIOCGIWNAME)
         return result.tobytes().strip(b"\x00").decode("utf8")
 
     def getEncryption(self):
@@ -766,8 +1279,7 @@ class WirelessConfig:
         '2.417 GHz'
 
         """
-        status, result = self.iwstruct.iw_get_ext(self.ifname, wififlags.SIOCGIWFREQ)
-        return Iwfreq(result)
+        return Iwfreq(self.iwrequest.get(wififlags.SIOCGIWFREQ))
 
     def getKey(self, key=0):
         """Get an encryption key.
@@ -801,13 +1313,12 @@ class WirelessConfig:
         'romanofski'
 
         """
-        # use an IW_ESSID_MAX_SIZE-cell array of NULLs
+        # offer IW_ESSID_MAX_SIZE bytes of the payload buffer
         #   as space for ioctl to write ESSID
-        iwpoint = Iwpoint(b"\x00" * wififlags.IW_ESSID_MAX_SIZE)
-        status, result = self.iwstruct.iw_get_ext(
-            self.ifname, wififlags.SIOCGIWESSID, data=iwpoint.packed_data
+        payload = self.iwrequest.getPoint(
+            wififlags.SIOCGIWESSID, wififlags.IW_ESSID_MAX_SIZE
         )
-        raw_essid = iwpoint.buff.tobytes()
+        raw_essid = payload[: wififlags.IW_ESSID_MAX_SIZE].tobytes()
         return raw_essid.strip(b"\x00").decode("utf8")
 
     def getMode(self):
@@ -819,8 +1330,8 @@ class WirelessConfig:
         'Managed'
 
         """
-        status, result = self.iwstruct.iw_get_ext(self.ifname, wififlags.SIOCGIWMODE)
-        return self.iwstruct.unpack("I", result[:4])[0]
+        result = self.iwrequest.get(wififlags.SIOCGIWMODE)
+        return STRUCT_UINT.unpack_from(result)[0]
 
 
 class WirelessInfo(WirelessConfig):
@@ -834,7 +1345,6 @@ class WirelessInfo(WirelessConfig):
     """
 
     def __init__(self, ifname):
-        self.sockfd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.ifname = ifname
         self.iwstruct = Iwstruct()
 
@@ -869,7 +1379,7 @@ class WirelessInfo(WirelessConfig):
         'off'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWSENS)
+        return Iwparam(self.ifname, wififlags.SIOCGIWSENS, self.iwrequest)
 
     def getAPaddr(self):
         """Returns the access point MAC address.
@@ -893,12 +1403,9 @@ class WirelessInfo(WirelessConfig):
         (19, 'No such device')
 
         """
-        buff, datastr = self.iwstruct.pack_wrq(32)
-        status, result = self.iwstruct.iw_get_ext(
-            self.ifname, wififlags.SIOCGIWAP, data=datastr
-        )
+        result = self.iwrequest.get(wififlags.SIOCGIWAP)
         # Extracts MAC address from packed data and returns it as a str.
-        mac_addr = struct.unpack("xxBBBBBB", result[:8])
+        mac_addr = STRUCT_SOCKADDR_HWADDR.unpack_from(result)
         return "%02X:%02X:%02X:%02X:%02X:%02X" % mac_addr
 
     def getBitrate(self):
@@ -910,7 +1417,7 @@ class WirelessInfo(WirelessConfig):
         '11 Mb/s'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWRATE)
+        return Iwparam(self.ifname, wififlags.SIOCGIWRATE, self.iwrequest)
 
     def getBitrates(self):
         """Returns the device's number and list of available bit rates.
@@ -918,7 +1425,7 @@ class WirelessInfo(WirelessConfig):
         The bit rates in the list are long integer type.
 
         """
-        iwrange = Iwrange(self.ifname)
+        iwrange = rangecache.get(self.ifname)
         return (iwrange.num_bitrates, iwrange.bitrates)
 
     def getRTS(self):
@@ -930,7 +1437,7 @@ class WirelessInfo(WirelessConfig):
         'off'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWRTS)
+        return Iwparam(self.ifname, wififlags.SIOCGIWRTS, self.iwrequest)
 
     def getFragmentation(self):
         """Returns the fragmentation threshold.
@@ -941,7 +1448,7 @@ class WirelessInfo(WirelessConfig):
         'off'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWFRAG)
+        return Iwparam(self.ifname, wififlags.SIOCGIWFRAG, self.iwrequest)
 
     def getPower(self):
         """Returns the power management settings.
@@ -952,7 +1459,7 @@ class WirelessInfo(WirelessConfig):
         #'off'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWPOWER)
+        return Iwparam(self.ifname, wififlags.SIOCGIWPOWER, self.iwrequest)
 
     def getTXPower(self):
         """Returns the transmit power in dBm.
@@ -963,7 +1470,7 @@ class WirelessInfo(WirelessConfig):
         '17 dBm'
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWTXPOW)
+        return Iwparam(self.ifname, wififlags.SIOCGIWTXPOW, self.iwrequest)
 
     def getRetry(self):
         """Returns the retry/lifetime limit.
@@ -978,24 +1485,54 @@ class WirelessInfo(WirelessConfig):
         16
 
         """
-        return Iwparam(self.ifname, wififlags.SIOCGIWRETRY)
+        return Iwparam(self.ifname, wififlags.SIOCGIWRETRY, self.iwrequest)
 
 
 class Iwstruct:
-    """ The basic class to handle iwstruct data. """
+    """The basic class to handle iwstruct data.
 
-    def __init__(self):
+    The ioctl socket is taken from the shared socketpool, so creating
+    an Iwstruct is cheap and does not open a file descriptor.
+
+    """
+
+    def __init__(self, pool=None):
         self.idx = 0
-        self.sockfd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if pool is None:
+            pool = socketpool
+        self.pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def sockfd(self):
+        """ The control socket used for ioctl calls. """
+        if self.pool is None:
+            raise OSError(errno.EBADF, os.strerror(errno.EBADF))
+        return self.pool.get()
+
+    def close(self):
+        """Detaches this object from the socket pool.
+
+        Further ioctl calls through this object raise OSError (EBADF).
+
+        """
+        self.pool = None
 
     def parse_data(self, fmt, data):
-        """ Unpacks raw C data. """
-        size = struct.calcsize(fmt)
-        idx = self.idx
+        """Unpacks raw C data at the object's cursor and advances it.
+
+        Kept for compatibility; the cursor makes this unsafe to share
+        between threads.  Prefer the stateless decode().
 
-        datastr = data[idx : idx + size]
-        self.idx = idx + size
-        value = struct.unpack(fmt, datastr)
+        """
+        compiled = getStruct(fmt)
+        value = compiled.unpack_from(data, self.idx)
+        self.idx = self.idx + compiled.size
 
         # take care of a tuple like (int, )
         if len(value) == 1:
@@ -1003,6 +1540,15 @@ class Iwstruct:
         else:
             return value
 
+    @staticmethod
+    def decode(fmt, data, offset=0):
+        """Unpacks raw C data at offset without copying.
+
+        fmt is a format string or a name from the structs registry.
+
+        """
+        return getStruct(fmt).unpack_from(data, offset)
+
     def pack(self, fmt, *args):
         """ Calls struct.pack and returns the result. """
         return struct.pack(fmt, *args)
@@ -1016,7 +1562,7 @@ class Iwstruct:
         # Don't change the order how the structure is packed!!!
         buff = array.array("B", b"\0" * buffsize)
         caddr_t, length = buff.buffer_info()
-        datastr = struct.pack("Pi", caddr_t, length)
+        datastr = STRUCT_IW_WRQ.pack(caddr_t, length)
         return buff, datastr
 
     def pack_test(self, string, buffsize):
@@ -1024,12 +1570,12 @@ class Iwstruct:
         buffsize = buffsize - len(string)
         buff = array.array("B", string.encode("utf-8") + b"\0" * buffsize)
         caddr_t, length = buff.buffer_info()
-        s = struct.pack("PHH", caddr_t, length, 1)
+        s = STRUCT_IW_POINT.pack(caddr_t, length, 1)
         return buff, s
 
     def unpack(self, fmt, packed_data):
         """ Unpacks data with given format. """
-        return struct.unpack(fmt, packed_data)
+        return getStruct(fmt).unpack(packed_data)
 
     def _fcntl(self, request, args):
         return fcntl.ioctl(self.sockfd.fileno(), request, args)
@@ -1046,7 +1592,7 @@ class Iwstruct:
             ifreq.extend(b"\0" * 16)
 
         result = self._fcntl(request, ifreq)
-        return (result, ifreq[wififlags.IFNAMSIZE :])
+        return (result, memoryview(ifreq)[wififlags.IFNAMSIZE :])
 
     def iw_set_ext(self, ifname, operation, data=None):
         """ Set options on ifname. """
@@ -1058,14 +1604,288 @@ class Iwstruct:
     # return "%02X:%02X:%02X:%02X:%02X:%02X" % mac_addr
 
 
+class Iwrequest:
+    """Preallocated ioctl buffers for one interface.
+
+    The struct iwreq buffer, with the interface name already encoded
+    into it, and a payload buffer for requests which pass an iw_point
+    are allocated once and reused for every call.  Results are returned
+    as memoryviews into these buffers, so they are only valid until the
+    next request through the same object; copy them (e.g. tobytes()) to
+    keep them longer.
+
+    """
+
+    def __init__(self, ifname, iwstruct=None, payload_size=None):
+        encoded = ifname.encode("utf-8")
+        if len(encoded) >= wififlags.IFNAMSIZE:
+            raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+        if iwstruct is None:
+            iwstruct = Iwstruct()
+        if payload_size is None:
+            payload_size = wififlags.IW_PAYLOAD_MAX
+        self.ifname = ifname
+        self.iwstruct = iwstruct
+        self.ifreq = array.array(
+            "B", encoded + b"\0" * (wififlags.IWREQ_SIZE - len(encoded))
+        )
+        self.payload = array.array("B", b"\0" * payload_size)
+        # holding views on the arrays pins them, so their addresses
+        # stay valid for the kernel
+        self.data = memoryview(self.ifreq)[wififlags.IFNAMSIZE :]
+        self.payload_view = memoryview(self.payload)
+        self._zeros = memoryview(bytes(payload_size))
+        self.payload_addr, self.payload_size = self.payload.buffer_info()
+
+    def get(self, request):
+        """Issues request with an empty union.
+
+        Returns a memoryview of the union as filled in by the kernel.
+
+        """
+        STRUCT_IWREQ_DATA.pack_into(self.ifreq, wififlags.IFNAMSIZE)
+        self.iwstruct._fcntl(request, self.ifreq)
+        return self.data
+
+    def getPoint(self, request, length=None, flags=0):
+        """Issues request with an iw_point pointing at the payload buffer.
+
+        'length' -- int -- bytes of the payload offered to the kernel,
+            the whole buffer if None.
+
+        Returns a memoryview of the payload buffer.  The iw_point as
+        updated by the kernel can be read from the data attribute.
+
+        """
+        if length is None:
+            length = self.payload_size
+        elif length > self.payload_size:
+            raise ValueError("payload buffer is only %d bytes" % self.payload_size)
+        self.payload_view[:length] = self._zeros[:length]
+        STRUCT_IW_POINT.pack_into(
+            self.ifreq, wififlags.IFNAMSIZE, self.payload_addr, length, flags
+        )
+        self.iwstruct._fcntl(request, self.ifreq)
+        return self.payload_view
+
+    def getPointInto(self, request, buff, flags=0):
+        """Issues request with an iw_point pointing at buff.
+
+        'buff' -- array -- caller-owned buffer the kernel writes into.
+
+        The iw_point as updated by the kernel can be read from the data
+        attribute, also after the request failed.
+
+        """
+        caddr_t, length = buff.buffer_info()
+        STRUCT_IW_POINT.pack_into(
+            self.ifreq, wififlags.IFNAMSIZE, caddr_t, length, flags
+        )
+        self.iwstruct._fcntl(request, self.ifreq)
+
+    def close(self):
+        """ Releases the buffers. """
+        self.data.release()
+        self.payload_view.release()
+
+
+def _snapshotString(iwrequest, request):
+    """ Returns the bytes of a string returned in the request union. """
+    return iwrequest.get(request).tobytes().strip(b"\x00")
+
+
+def _snapshotEssid(iwrequest, request):
+    """Returns the ESSID bytes returned through the payload buffer.
+
+    ESSIDs are arbitrary bytes, so they are not decoded.
+
+    """
+    payload = iwrequest.getPoint(request, wififlags.IW_ESSID_MAX_SIZE)
+    return payload[: wififlags.IW_ESSID_MAX_SIZE].tobytes().strip(b"\x00")
+
+
+def _snapshotUint(iwrequest, request):
+    """ Decodes an unsigned int, e.g. the operation mode. """
+    return STRUCT_UINT.unpack_from(iwrequest.get(request))[0]
+
+
+def _snapshotHwaddr(iwrequest, request):
+    """ Decodes a sockaddr into a formatted MAC address. """
+    mac_addr = STRUCT_SOCKADDR_HWADDR.unpack_from(iwrequest.get(request))
+    return "%02X:%02X:%02X:%02X:%02X:%02X" % mac_addr
+
+
+def _snapshotStruct(layout):
+    """ Returns a decoder for a layout returned in the request union. """
+
+    def decoder(iwrequest, request):
+        return layout.unpack_from(iwrequest.get(request))
+
+    return decoder
+
+
+def _snapshotEncode(iwrequest, request):
+    """ Decodes encoding info as (flags, key bytes). """
+    payload = iwrequest.getPoint(request, wififlags.IW_ENCODING_TOKEN_MAX)
+    pointer, length, iwflags = STRUCT_IW_POINT.unpack_from(iwrequest.data)
+    return (iwflags, payload[:length].tobytes())
+
+
+def _snapshotStats(iwrequest, request):
+    """ Decodes the iw_statistics tuple. """
+    payload = iwrequest.getPoint(request, STRUCT_IW_STATISTICS.size)
+    return STRUCT_IW_STATISTICS.unpack_from(payload)
+
+
+def _snapshotRange(iwrequest, request):
+    """ Decodes the range struct into an Iwrange. """
+    return rangecache.get(iwrequest.ifname, iwrequest)
+
+
+# snapshot field name -> (get request, decoder(iwrequest, request))
+snapshot_fields = {
+    "name": (wififlags.SIOCGIWNAME, _snapshotString),
+    "essid": (wififlags.SIOCGIWESSID, _snapshotEssid),
+    "mode": (wififlags.SIOCGIWMODE, _snapshotUint),
+    "frequency": (wififlags.SIOCGIWFREQ, _snapshotStruct(STRUCT_IW_FREQ)),
+    "apaddr": (wififlags.SIOCGIWAP, _snapshotHwaddr),
+    "bitrate": (wififlags.SIOCGIWRATE, _snapshotStruct(STRUCT_IW_PARAM)),
+    "txpower": (wififlags.SIOCGIWTXPOW, _snapshotStruct(STRUCT_IW_PARAM)),
+    "sensitivity": (wififlags.SIOCGIWSENS, _snapshotStruct(STRUCT_IW_PARAM)),
+    "retry": (wififlags.SIOCGIWRETRY, _snapshotStruct(STRUCT_IW_PARAM)),
+    "rts": (wififlags.SIOCGIWRTS, _snapshotStruct(STRUCT_IW_PARAM)),
+    "fragmentation": (wififlags.SIOCGIWFRAG, _snapshotStruct(STRUCT_IW_PARAM)),
+    "encode": (wififlags.SIOCGIWENCODE, _snapshotEncode),
+    "power": (wififlags.SIOCGIWPOWER, _snapshotStruct(STRUCT_IW_PARAM)),
+    "stats": (wififlags.SIOCGIWSTATS, _snapshotStats),
+    "range": (wififlags.SIOCGIWRANGE, _snapshotRange),
+}
+
+
+class Iwsnapshot:
+    """Immutable record of the raw values read by Wireless.snapshot().
+
+    Every name in snapshot_fields is an attribute.  The values are
+    undecorated: iw_param fields are (value, fixed, disabled, flags)
+    tuples, frequency is (mantissa, exponent, index, flags), stats is
+    the iw_statistics tuple, encode is (flags, key), mode is the
+    numeric mode, name and essid are bytes and range is an Iwrange.
+    Fields which were not
+    requested or whose ioctl failed are None; the OSError of failed
+    fields is in errors.
+
+    """
+
+    __slots__ = ("ifname", "timestamp", "errors") + tuple(snapshot_fields)
+
+    def __init__(self, ifname, timestamp, values, errors):
+        setattr_ = object.__setattr__
+        setattr_(self, "ifname", ifname)
+        setattr_(self, "timestamp", timestamp)
+        setattr_(self, "errors", errors)
+        for field in snapshot_fields:
+            setattr_(self, field, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Iwsnapshot is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Iwsnapshot is read-only")
+
+    def __repr__(self):
+        return "<Iwsnapshot %s at %f>" % (self.ifname, self.timestamp)
+
+
+def probeMany(ifnames, fields=None, max_workers=PROBE_WORKERS, timeout=None):
+    """Takes an Iwsnapshot of several interfaces at once.
+
+    'fields' -- iterable -- names from snapshot_fields to read, all of
+        them if None.
+    'max_workers' -- int -- number of interfaces probed concurrently.
+    'timeout' -- float -- seconds a probe may take once it started,
+        forever if None.
+
+    Yields (ifname, snapshot, error) tuples in the order the probes
+    complete, so the whole takes about as long as the slowest
+    interface; the ioctls release the GIL while they wait.  error is
+    the exception of an interface which could not be probed at all, or
+    OSError (ETIMEDOUT) for one which took longer than timeout, and
+    snapshot is None then.  A timed out ioctl can not be interrupted,
+    so it keeps its worker busy until it returns.
+
+    >>> for ifname, snap, error in probeMany(['wlan0', 'wlan1'], ['essid']):
+    ...     print(ifname, snap.essid)
+    wlan1 b'romanofski'
+    wlan0 b'romanofski'
+
+    """
+    if fields is not None:
+        fields = tuple(fields)
+        for field in fields:
+            if field not in snapshot_fields:
+                raise ValueError("Unknown snapshot field: %s" % field)
+    ifnames = list(dict.fromkeys(ifnames))
+    if not ifnames:
+        return
+    # ifname -> time its probe started
+    started = {}
+
+    def probe(ifname):
+        started[ifname] = time.monotonic()
+        with Wireless(ifname) as wifi:
+            return wifi.snapshot(fields)
+
+    executor = concurrent.futures.ThreadPoolExecutor(min(max_workers, len(ifnames)))
+    futures = {}
+    try:
+        for ifname in ifnames:
+            futures[executor.submit(probe, ifname)] = ifname
+        pending = set(futures)
+        while pending:
+            wait_timeout = None
+            if timeout is not None:
+                now = time.monotonic()
+                deadlines = {}
+                for future in pending:
+                    start = started.get(futures[future])
+                    if start is not None and not future.done():
+                        deadlines[future] = start + timeout
+                for future, deadline in deadlines.items():
+                    if deadline <= now:
+                        pending.discard(future)
+                        error = OSError(errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT))
+                        yield (futures[future], None, error)
+                if not pending:
+                    break
+                # wake up when the next running probe times out
+                waits = [deadline - now for deadline in deadlines.values()]
+                wait_timeout = min([wait for wait in waits if wait > 0] or [timeout])
+            done, pending = concurrent.futures.wait(
+                pending, wait_timeout, concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    snapshot = future.result()
+                except Exception as error:
+                    # reported per interface, the others go on
+                    yield (futures[future], None, error)
+                else:
+                    yield (futures[future], snapshot, None)
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
 class Iwparam:
     """ Class to hold iwparam data. """
 
-    def __init__(self, ifname, ioctl):
+    def __init__(self, ifname, ioctl, iwrequest=None):
         # (i) value, (b) fixed, (b) disabled, (H) flags
-        self.fmt = "ibbH"
+        self.fmt = STRUCT_IW_PARAM.format
         self.ifname = ifname
         self.ioctl = ioctl
+        self.iwrequest = iwrequest
         self.value = 0
         self.fixed = 0
         self.disabled = 0
@@ -1077,16 +1897,21 @@ class Iwparam:
         and updates internal attributes.
 
         """
+        if self.iwrequest is not None:
+            self._parse(self.iwrequest.get(self.ioctl))
+            return
         iwstruct = Iwstruct()
         status, result = iwstruct.iw_get_ext(self.ifname, self.ioctl)
         self._parse(result)
 
     def _parse(self, data):
         """ Unpacks iwparam data. """
-        iwstruct = Iwstruct()
-        self.value, self.fixed, self.disabled, self.flags = iwstruct.parse_data(
-            self.fmt, data
-        )
+        (
+            self.value,
+            self.fixed,
+            self.disabled,
+            self.flags,
+        ) = STRUCT_IW_PARAM.unpack_from(data)
 
 
 class Iwfreq:
@@ -1094,7 +1919,7 @@ class Iwfreq:
 
     def __init__(self, data=None):
         # (i) mantissa, (h) exponent, (b) list index, (b) flags
-        self.fmt = "ihbb"
+        self.fmt = STRUCT_IW_FREQ.format
         self.m = 0
         self.e = 0
         self.index = 0
@@ -1105,10 +1930,11 @@ class Iwfreq:
             else:
                 self.parse(data)
 
-    def parse(self, data):
+    def parse(self, data, offset=0):
         """ Unpacks iw_freq. """
-        size = struct.calcsize(self.fmt)
-        self.m, self.e, self.index, self.flags = struct.unpack(self.fmt, data[:size])
+        self.m, self.e, self.index, self.flags = STRUCT_IW_FREQ.unpack_from(
+            data, offset
+        )
 
     def getFrequency(self):
         """ Returns frequency or channel, depending on the driver. """
@@ -1133,14 +1959,15 @@ class Iwfreq:
 class Iwstats:
     """ Class to hold iwstat data. """
 
-    def __init__(self, ifname):
+    def __init__(self, ifname, iwrequest=None):
         # (2B) status, 4B iw_quality, 6i iw_discarded
-        self.fmt = "2BBbbB6i"
+        self.fmt = STRUCT_IW_STATISTICS.format
         self.status = 0
         self.qual = Iwquality()
         self.discard = {}
         self.missed_beacon = 0
         self.ifname = ifname
+        self.iwrequest = iwrequest
         self.errorflag = 0
         self.error = ""
         self.update()
@@ -1150,19 +1977,24 @@ class Iwstats:
         and updates internal attributes.
 
         """
+        if self.iwrequest is not None:
+            self._parse(
+                self.iwrequest.getPoint(
+                    wififlags.SIOCGIWSTATS, STRUCT_IW_STATISTICS.size
+                )
+            )
+            return
         iwstruct = Iwstruct()
         buff, s = iwstruct.pack_wrq(32)
         i, result = iwstruct.iw_get_ext(self.ifname, wififlags.SIOCGIWSTATS, data=s)
         if i > 0:
             self.error = result
             self.errorflag = i
-        self._parse(buff.tobytes())
+        self._parse(buff)
 
     def _parse(self, data):
         """ Unpacks iwstruct data. """
-        iwstruct = Iwstruct()
-        iwqual = Iwquality()
-        iwstats_data = iwstruct.parse_data(self.fmt, data)
+        iwstats_data = STRUCT_IW_STATISTICS.unpack_from(data)
 
         self.status = iwstats_data[0:2]
         (
@@ -1178,36 +2010,131 @@ class Iwstats:
         )
 
 
-class Iwquality:
-    """ Class to hold iwquality data. """
+def _procQuality(field, updated_flag):
+    """Returns (value, flag) of a /proc/net/wireless quality field; the
+    flag is set if the value ends with the updated mark.
 
-    def __init__(self):
-        self.quality = 0
-        self.siglevel = 0
-        self.nlevel = 0
-        self.updated = 0
-        self.fmt = "BbbB"
+    """
+    if field.endswith(b"."):
+        return int(field[:-1]), updated_flag
+    return int(field), 0
 
-    def parse(self, data):
-        """ Unpacks iwquality data. """
-        iwstruct = Iwstruct()
-        qual, siglevel, nlevel, iwflags = iwstruct.parse_data(self.fmt, data)
 
-        # compute signal and noise level
-        self.siglevel = siglevel
-        self.nlevel = nlevel
+class Iwstatsfile:
+    """The statistics of all interfaces from /proc/net/wireless.
 
-        # asign the other values
-        self.quality = qual
-        self.updated = iwflags
+    The kernel lists the same values SIOCGIWSTATS returns for every
+    interface in that file.  It is opened once, and each read()
+    re-reads it with os.preadv() into the same buffer and parses all
+    interfaces in one pass, so sampling many interfaces
+    costs one system call instead of one Iwstats per interface.
 
-    def setValues(self, vallist):
-        """ Assigns values given by a list to our attributes. """
-        attributes = ["quality", "siglevel", "nlevel", "updated"]
-        assert len(vallist) == 4
+    >>> with Iwstatsfile() as statsfile:
+    ...     statsfile.read()['wlan0'].level
+    -56
 
-        for i in range(len(vallist)):
-            setattr(self, attributes[i], vallist[i])
+    """
+
+    def __init__(self, path=PROC_NET_WIRELESS, size=PROC_BUFFER_SIZE):
+        """'size' -- int -- initial buffer size, doubled while the file
+            does not fit.
+
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self._buffer = bytearray(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def read(self):
+        """ Returns {ifname: Wstats} for the interfaces in the file. """
+        length = self._read()
+        stats = {}
+        # skip the two header lines
+        for line in self._buffer[:length].split(b"\n")[2:]:
+            name, sep, rest = line.partition(b":")
+            fields = rest.split()
+            if not sep or len(fields) < 10:
+                continue
+            quality, quality_flag = _procQuality(
+                fields[1], wififlags.IW_QUAL_QUAL_UPDATED
+            )
+            level, level_flag = _procQuality(fields[2], wififlags.IW_QUAL_LEVEL_UPDATED)
+            noise, noise_flag = _procQuality(fields[3], wififlags.IW_QUAL_NOISE_UPDATED)
+            ifname = name.strip().decode("utf8")
+            stats[ifname] = Wstats(
+                ifname,
+                int(fields[0], 16),
+                quality,
+                level,
+                noise,
+                quality_flag | level_flag | noise_flag,
+                *map(int, fields[4:10])
+            )
+        return stats
+
+    def _read(self):
+        """Reads the whole file into the buffer and returns its length.
+
+        /proc files return about a page per read whatever the buffer
+        size, so reading goes on until the end of the file.
+
+        """
+        length = 0
+        while True:
+            if length == len(self._buffer):
+                self._buffer.extend(bytes(len(self._buffer)))
+            view = memoryview(self._buffer)[length:]
+            try:
+                count = os.preadv(self.fd, [view], length)
+            finally:
+                view.release()
+            if count == 0:
+                return length
+            length = length + count
+
+
+class Iwquality:
+    """ Class to hold iwquality data. """
+
+    def __init__(self):
+        self.quality = 0
+        self.siglevel = 0
+        self.nlevel = 0
+        self.updated = 0
+        self.fmt = STRUCT_IW_QUALITY.format
+
+    def parse(self, data, offset=0):
+        """ Unpacks iwquality data. """
+        qual, siglevel, nlevel, iwflags = STRUCT_IW_QUALITY.unpack_from(data, offset)
+
+        # compute signal and noise level
+        self.siglevel = siglevel
+        self.nlevel = nlevel
+
+        # asign the other values
+        self.quality = qual
+        self.updated = iwflags
+
+    def setValues(self, vallist):
+        """ Assigns values given by a list to our attributes. """
+        attributes = ["quality", "siglevel", "nlevel", "updated"]
+        assert len(vallist) == 4
+
+        for i in range(len(vallist)):
+            setattr(self, attributes[i], vallist[i])
 
     def getSignallevel(self):
         """ Returns signal level. """
@@ -1238,35 +2165,25 @@ class Iwpoint:
         if data is None:
             raise ValueError("data must be passed to Iwpoint")
         # P pointer to data, H length, H flags
-        self.fmt = "PHH"
+        self.fmt = STRUCT_IW_POINT.format
         self.flags = flags
         self.buff = array.array("B", data)
         self.caddr_t, self.length = self.buff.buffer_info()
-        self.packed_data = struct.pack(self.fmt, self.caddr_t, self.length, self.flags)
+        self.packed_data = STRUCT_IW_POINT.pack(self.caddr_t, self.length, self.flags)
 
     def update(self, packed_data):
         """ Updates the object attributes. """
         self.packed_data = packed_data
-        self.caddr_t, self.length, self.flags = struct.unpack(
-            self.fmt, self.packed_data
+        self.caddr_t, self.length, self.flags = STRUCT_IW_POINT.unpack_from(
+            self.packed_data
         )
 
 
 class Iwrange:
     """ Holds iwrange struct. """
 
-    def __init__(self, ifname):
-        self.fmt = (
-            "IIIHB6Ii4B4BB"
-            + wififlags.IW_MAX_BITRATES * "i"
-            + "2i2i2i2i3H"
-            + wififlags.IW_MAX_ENCODING_SIZES * "H"
-            + "2BBHB"
-            + wififlags.IW_MAX_TXPOWER * "i"
-            + "2B3H2i2iHB"
-            + wififlags.IW_MAX_FREQUENCIES * "ihBB"
-            + "IiiHiI"
-        )
+    def __init__(self, ifname, iwrequest=None):
+        self.fmt = STRUCT_IW_RANGE.format
 
         self.ifname = ifname
         self.errorflag = 0
@@ -1322,6 +2239,7 @@ class Iwrange:
         # frequency
         self.num_channels = self.num_frequency = 0
         self.frequencies = []
+        self.channel_index = Iwchannels()
 
         # capabilities and power management
         self.enc_capa = 0
@@ -1329,24 +2247,28 @@ class Iwrange:
         self.modul_capa = 0
         self.bitrate_capa = 0
 
-        self.update()
+        self.update(iwrequest)
 
-    def update(self):
+    def update(self, iwrequest=None):
         """Updates Iwrange object by a system call to the kernel
         and updates internal attributes.
 
+        'iwrequest' -- Iwrequest -- buffers to use for the call, a
+            temporary buffer is used if None.
+
         """
+        if iwrequest is not None:
+            self._parse(iwrequest.getPoint(wififlags.SIOCGIWRANGE, 640))
+            return
         iwstruct = Iwstruct()
         buff, s = iwstruct.pack_wrq(640)
         status, result = iwstruct.iw_get_ext(
             self.ifname, wififlags.SIOCGIWRANGE, data=s
         )
-        data = buff.tobytes()
-        self._parse(data)
+        self._parse(buff)
 
     def _parse(self, data):
-        iwstruct = Iwstruct()
-        result = iwstruct.parse_data(self.fmt, data)
+        result = STRUCT_IW_RANGE.unpack_from(data)
 
         # XXX there is maybe a much more elegant way to do this
         self.throughput, self.min_nwid, self.max_nwid = result[0:3]
@@ -1356,6 +2278,7 @@ class Iwrange:
         self.max_qual.setValues(result[12:16])
         self.avg_qual.setValues(result[16:20])
         self.num_bitrates = result[20]
+        self.bitrates = []
         raw_bitrates = result[21 : 21 + self.num_bitrates]
         for rate in raw_bitrates:
             if rate is not None:
@@ -1379,15 +2302,17 @@ class Iwrange:
         self.num_frequency = result[95]
 
         freq = result[96:224]
-        i = self.num_frequency
-        for x in range(0, len(freq), 4):
-            iwfreq = Iwfreq(freq[x : x + 4])
-            fq = iwfreq.getFrequency()
-            if fq is not None:
-                self.frequencies.append(fq)
-            i -= 1
-            if i <= 0:
-                break
+        self.frequencies = []
+        channels = []
+        num_frequency = min(self.num_frequency, wififlags.IW_MAX_FREQUENCIES)
+        for x in range(0, num_frequency * 4, 4):
+            # (i) mantissa, (h) exponent, (B) list index, (B) flags
+            m, e, index = freq[x : x + 3]
+            if e != 0:
+                m = m * 10 ** e
+            self.frequencies.append(m)
+            channels.append((index, m))
+        self.channel_index = Iwchannels(channels)
         self.enc_capa = result[224]
         self.min_pms = result[225]
         self.max_pms = result[226]
@@ -1396,31 +2321,597 @@ class Iwrange:
         self.bitrate_capa = result[229]
 
 
+class Iwchannels:
+    """Channel <-> frequency lookup tables built from an Iwrange.
+
+    Lookups are dictionary reads, so formatting a frequency or finding
+    its channel does not depend on the number of channels.  Frequencies
+    the driver did not list are looked up in the IEEE 802.11 2.4, 5 and
+    6 GHz channel plans.
+
+    """
+
+    def __init__(self, channels=()):
+        """ 'channels' -- iterable of (channel, frequency in Hz) pairs. """
+        self.frequencies = {}
+        self.channels = {}
+        formatted = []
+        for channel, frequency in channels:
+            self.frequencies[channel] = frequency
+            self.channels[frequency] = channel
+            formatted.append(formatFrequency(frequency) or frequency)
+        # formatted frequencies in the driver's order
+        self.formatted = tuple(formatted)
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def getFrequency(self, channel):
+        """ Returns the frequency of channel in Hz, or None. """
+        return self.frequencies.get(channel)
+
+    def getChannel(self, frequency):
+        """ Returns the channel of frequency (in Hz), or None. """
+        channel = self.channels.get(frequency)
+        if channel is None:
+            band, channel = ieee80211_frequencies.get(frequency, (None, None))
+        return channel
+
+    def getBand(self, frequency):
+        """ Returns the IEEE band name ('2.4GHz', '5GHz', '6GHz') or None. """
+        return ieee80211_frequencies.get(frequency, (None, None))[0]
+
+
+# channel lookups in the IEEE 802.11 channel plans only, for scans
+# without an Iwrange
+ieee80211_channels = Iwchannels()
+
+
+def getChannelIndex(iwrange=None):
+    """ Returns the Iwchannels of iwrange, or ieee80211_channels if None. """
+    if iwrange is not None:
+        return iwrange.channel_index
+    return ieee80211_channels
+
+
+class Iwrangecache:
+    """Shared Iwrange objects, one per interface.
+
+    SIOCGIWRANGE data does not change while an interface exists, so it
+    is read once and kept.  Entries are keyed by ifname and remember
+    the interface index, so an interface which was removed and
+    re-created (e.g. a USB dongle re-plugged) is read again.  Each
+    lookup first applies the pending link messages of wniccache, which
+    evicts the entries of removed interfaces, so a cached entry is
+    served with a single non-blocking read of the netlink socket.
+    Without netlink the interface index is checked with SIOCGIFINDEX
+    on every lookup instead.  Entries also expire after ttl seconds
+    (never if ttl is None) and can be dropped with invalidate().
+
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # ifname -> (ifindex, wniccache epoch, expiry time, Iwrange)
+        self._entries = {}
+
+    def get(self, ifname, iwrequest=None):
+        """Returns the Iwrange for ifname, reading it if needed.
+
+        Raises OSError if the interface does not exist or the range
+        can not be read; failures are not cached.
+
+        """
+        epoch = wniccache.poll()
+        now = time.monotonic()
+        entry = self._entries.get(ifname)
+        ifindex = None
+        if entry is not None and (entry[2] is None or entry[2] > now):
+            if epoch is not None and entry[1] == epoch:
+                return entry[3]
+            ifindex = getIfindex(ifname)
+            if entry[0] == ifindex:
+                return entry[3]
+        if ifindex is None:
+            ifindex = getIfindex(ifname)
+        iwrange = self._load(ifname, iwrequest)
+        expiry = None if self.ttl is None else now + self.ttl
+        with self._lock:
+            self._entries[ifname] = (ifindex, epoch, expiry, iwrange)
+        return iwrange
+
+    def _load(self, ifname, iwrequest):
+        """ Reads the range from the kernel. """
+        return Iwrange(ifname, iwrequest)
+
+    def invalidate(self, ifname=None):
+        """ Drops the entry for ifname, or all entries if ifname is None. """
+        with self._lock:
+            if ifname is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ifname, None)
+
+
+rangecache = Iwrangecache()
+
+
+class Iwscanbuffer:
+    """The SIOCGIWSCAN buffer and statistics of one interface.
+
+    The buffer size which last held a complete scan (plus headroom) is
+    remembered, so later scans start with a buffer which is large
+    enough instead of rediscovering it through E2BIG retries, and the
+    buffer itself is handed from one scan to the next.
+
+    """
+
+    def __init__(self, ifname, size=wififlags.IW_SCAN_MAX_DATA):
+        self.ifname = ifname
+        # size of the buffer offered on the first SIOCGIWSCAN attempt
+        self.size = size
+        self.scans = 0
+        self.e2big_retries = 0
+        self.eagain_retries = 0
+        # largest scan result seen, in bytes
+        self.max_result = 0
+        self._lock = threading.Lock()
+        self._spare = None
+
+    def take(self):
+        """Returns a buffer for a scan.
+
+        The spare buffer is reused if there is one, so concurrent scans
+        on the same interface each get their own buffer.
+
+        """
+        with self._lock:
+            buff, self._spare = self._spare, None
+        if buff is None or len(buff) < self.size:
+            buff = array.array("B", b"\0" * self.size)
+        return buff
+
+    def give(self, buff):
+        """ Keeps buff for reuse by the next scan. """
+        with self._lock:
+            if self._spare is None or len(buff) > len(self._spare):
+                self._spare = buff
+
+    def grow(self, buff, hint=0):
+        """Returns a larger buffer after buff was too small (E2BIG).
+
+        'hint' -- int -- size the driver asked for, if any.
+
+        """
+        with self._lock:
+            self.e2big_retries = self.e2big_retries + 1
+        if len(buff) >= SCAN_BUFFER_MAX:
+            raise OSError(errno.E2BIG, os.strerror(errno.E2BIG))
+        if hint > len(buff):
+            # the driver told us how big to make the buffer
+            size = hint
+        else:
+            # try doubling the buffer size
+            size = len(buff) * 2
+        return array.array("B", b"\0" * min(size, SCAN_BUFFER_MAX))
+
+    def waited(self):
+        """ Counts a SIOCGIWSCAN attempt made before the scan completed. """
+        with self._lock:
+            self.eagain_retries = self.eagain_retries + 1
+
+    def learn(self, length):
+        """Records a complete scan of length bytes.
+
+        Returns True if the remembered size grew.
+
+        """
+        with self._lock:
+            self.scans = self.scans + 1
+            self.max_result = max(self.max_result, length)
+            size = min(SCAN_BUFFER_MAX, int(length * SCAN_BUFFER_HEADROOM))
+            if size <= self.size:
+                return False
+            self.size = size
+            return True
+
+    def getStats(self):
+        """ Returns the counters as a dict. """
+        return makedict(
+            size=self.size,
+            scans=self.scans,
+            e2big_retries=self.e2big_retries,
+            eagain_retries=self.eagain_retries,
+            max_result=self.max_result,
+        )
+
+
+class Iwscanbuffers:
+    """Iwscanbuffer objects by interface name.
+
+    If path is set, the learned buffer sizes are loaded from that JSON
+    file and saved back whenever one grows, so they survive restarts.
+
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffers = {}
+        if path is not None:
+            self.load()
+
+    def get(self, ifname):
+        """ Returns the Iwscanbuffer of ifname, creating it if needed. """
+        scanbuffer = self._buffers.get(ifname)
+        if scanbuffer is None:
+            with self._lock:
+                scanbuffer = self._buffers.setdefault(ifname, Iwscanbuffer(ifname))
+        return scanbuffer
+
+    def forget(self, ifname=None):
+        """ Drops the state of ifname, or of all interfaces if None. """
+        with self._lock:
+            if ifname is None:
+                self._buffers.clear()
+            else:
+                self._buffers.pop(ifname, None)
+
+    def getStats(self):
+        """ Returns {ifname: counters} for all interfaces scanned. """
+        return dict(
+            (ifname, scanbuffer.getStats())
+            for ifname, scanbuffer in list(self._buffers.items())
+        )
+
+    def learned(self, scanbuffer):
+        """ Called when the size of scanbuffer grew. """
+        if self.path is not None:
+            try:
+                self.save()
+            except OSError:
+                # the sizes are only a hint, scanning goes on without them
+                pass
+
+    def load(self, path=None):
+        """ Loads learned sizes from a JSON file; a missing file is empty. """
+        path = path or self.path
+        try:
+            with open(path) as fp:
+                sizes = json.load(fp)
+        except FileNotFoundError:
+            return
+        for ifname, size in sizes.items():
+            scanbuffer = self.get(ifname)
+            scanbuffer.size = max(scanbuffer.size, min(int(size), SCAN_BUFFER_MAX))
+
+    def save(self, path=None):
+        """ Writes learned sizes to a JSON file, atomically. """
+        path = path or self.path
+        sizes = dict(
+            (ifname, scanbuffer.size)
+            for ifname, scanbuffer in list(self._buffers.items())
+        )
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "w") as fp:
+            json.dump(sizes, fp)
+        os.replace(tmp_path, path)
+
+
+scanbuffers = Iwscanbuffers()
+
+
+class Iwwniccache:
+    """The wireless interfaces, kept current by rtnetlink link messages.
+
+    The interfaces are discovered once with discoverWNICs(); after that
+    each lookup only reads the RTM_NEWLINK and RTM_DELLINK messages
+    which arrived since the previous one, and probes just the
+    interfaces they name.  When an interface disappears or is renamed,
+    its rangecache and scanbuffers entries are dropped and every
+    listener is called with its old name.  rangecache polls for those
+    messages on every lookup, so this happens even if nobody looks up
+    the interfaces.
+
+    Without netlink (e.g. in some containers) every lookup runs
+    discoverWNICs() again.  Like Iwsocketpool, a child process does
+    not share the parent's netlink socket after fork(), it subscribes
+    and discovers the interfaces again.
+
+    """
+
+    def __init__(self, sysfs=SYSFS_NET):
+        self.sysfs = sysfs
+        self.listeners = []
+        # reentrant, listeners may look up the interfaces again
+        self._lock = threading.RLock()
+        # ifindex -> Wnic, None until discovered
+        self._wnics = None
+        # ifindex -> ifname of the interfaces which are not wireless
+        self._others = {}
+        # Rtnetlink, False if netlink is not available
+        self._listener = None
+        # incremented by every full discovery, see poll()
+        self.epoch = 0
+        _resetAtFork(self)
+
+    def addListener(self, callback):
+        """ Calls callback(ifname) when a wireless interface goes away. """
+        self.listeners.append(callback)
+
+    def removeListener(self, callback):
+        """ Stops calling callback. """
+        self.listeners.remove(callback)
+
+    def get(self):
+        """ Returns the Wnic records, sorted by interface index. """
+        with self._lock:
+            wnics = self._update()
+        return sorted(wnics.values(), key=lambda wnic: wnic.ifindex)
+
+    def getWnic(self, ifname):
+        """ Returns the Wnic of ifname, or None if it is not wireless. """
+        for wnic in self.get():
+            if wnic.ifname == ifname:
+                return wnic
+        return None
+
+    def close(self):
+        """ Closes the netlink socket and forgets the interfaces. """
+        with self._lock:
+            if self._listener:
+                self._listener.close()
+            self._listener = None
+            self._wnics = None
+            self._others = {}
+
+    def _afterFork(self):
+        """Drops the netlink socket inherited from the parent, in the
+        child, so the processes do not read each other's messages.
+
+        """
+        # another thread of the parent may have held the lock
+        self._lock = threading.RLock()
+        if self._listener:
+            self._listener.close()
+        self._listener = None
+        self._wnics = None
+        self._others = {}
+
+    def poll(self):
+        """Applies the link messages which arrived since the last call.
+
+        Returns the current epoch, a number which changes whenever the
+        interfaces had to be discovered again (e.g. after messages were
+        lost), so state kept for an interface under the same epoch is
+        still valid unless it was evicted.  Returns None if netlink is
+        not available and changes are not tracked.
+
+        """
+        with self._lock:
+            if self._poll():
+                return self.epoch
+            return None
+
+    def _update(self):
+        if not self._poll():
+            self._rediscover()
+        return self._wnics
+
+    def _poll(self):
+        """Reads pending link messages; returns False without netlink."""
+        if self._listener is None:
+            # subscribe before discovering, so no change is missed
+            try:
+                self._listener = self._openListener()
+            except OSError:
+                self._listener = False
+        if not self._listener:
+            return False
+        messages = self._listener.read()
+        if self._wnics is None or self._listener.overrun:
+            self._listener.overrun = False
+            self._rediscover()
+            return True
+        for msg_type, ifindex, ifflags, attrs in messages:
+            ifname = rtnetlink.getIfname(attrs)
+            if msg_type == wififlags.RTM_DELLINK:
+                self._others.pop(ifindex, None)
+                wnic = self._wnics.pop(ifindex, None)
+                if wnic is not None:
+                    self._removed(wnic.ifname)
+                elif ifname is not None:
+                    # not known as wireless, but may have been used so
+                    self._evict(ifname)
+                continue
+            wnic = self._wnics.get(ifindex)
+            if wnic is not None:
+                known = wnic.ifname
+            else:
+                known = self._others.get(ifindex)
+            if ifname is None or ifname == known:
+                # e.g. a wireless event or a change of the link state
+                continue
+            if wnic is not None:
+                # renamed
+                del self._wnics[ifindex]
+                self._removed(wnic.ifname)
+            elif known is not None:
+                self._evict(known)
+            self._others.pop(ifindex, None)
+            # a new interface may reuse the name of a removed one
+            self._evict(ifname)
+            wnic = self._readWnic(ifname)
+            if wnic is not None and wnic.ifindex == ifindex:
+                self._wnics[ifindex] = wnic
+            else:
+                self._others[ifindex] = ifname
+        return True
+
+    def _openListener(self):
+        return rtnetlink.Rtnetlink()
+
+    def _readWnic(self, ifname):
+        """ Returns the Wnic of one interface, or None. """
+        if os.path.isdir(self.sysfs):
+            return _readWNIC(os.path.join(self.sysfs, ifname), ifname)
+        return _probeWNIC(ifname)
+
+    def _rediscover(self):
+        """ Discovers all interfaces and drops the state of vanished ones. """
+        old = self._wnics or {}
+        self._wnics = dict((wnic.ifindex, wnic) for wnic in discoverWNICs(self.sysfs))
+        # everything else is probed again if it shows up in a message
+        self._others = {}
+        self.epoch = self.epoch + 1
+        for ifindex, wnic in old.items():
+            if self._wnics.get(ifindex) != wnic:
+                self._removed(wnic.ifname)
+
+    def _removed(self, ifname):
+        """ Drops the state of a wireless interface and tells listeners. """
+        self._evict(ifname)
+        for callback in list(self.listeners):
+            callback(ifname)
+
+    def _evict(self, ifname):
+        rangecache.invalidate(ifname)
+        scanbuffers.forget(ifname)
+
+
+wniccache = Iwwniccache()
+
+scan_types = {
+    "active": wififlags.IW_SCAN_TYPE_ACTIVE,
+    "passive": wififlags.IW_SCAN_TYPE_PASSIVE,
+}
+
+
+class Iwscanreq:
+    """A targeted scan request (struct iw_scan_req).
+
+    'essid' -- str or bytes -- only probe for this network.
+    'channels' -- list -- only scan these channels, given as channel
+        numbers or frequencies in Hz.
+    'scan_type' -- str -- 'active' or 'passive', driver default if None.
+    'min_channel_time', 'max_channel_time' -- int -- dwell time per
+        channel in TU (1.024 ms), driver default if 0.
+
+    A request with none of these set asks for the driver's default
+    full scan.
+
+    """
+
+    def __init__(
+        self,
+        essid=None,
+        channels=None,
+        scan_type=None,
+        min_channel_time=0,
+        max_channel_time=0,
+    ):
+        if isinstance(essid, str):
+            essid = essid.encode("utf-8")
+        if essid is not None and len(essid) > wififlags.IW_ESSID_MAX_SIZE:
+            raise ValueError(
+                "ESSID is longer than %d bytes" % wififlags.IW_ESSID_MAX_SIZE
+            )
+        channels = list(channels or [])
+        if len(channels) > wififlags.IW_MAX_FREQUENCIES:
+            raise ValueError(
+                "At most %d channels can be scanned" % wififlags.IW_MAX_FREQUENCIES
+            )
+        if scan_type is not None and scan_type not in scan_types:
+            raise ValueError("Invalid scan type")
+        self.essid = essid
+        self.channels = channels
+        self.scan_type = scan_type
+        self.min_channel_time = min_channel_time
+        self.max_channel_time = max_channel_time
+
+    def isDefault(self):
+        """ Returns True if nothing restricts the scan. """
+        return (
+            self.essid is None
+            and not self.channels
+            and self.scan_type is None
+            and not self.min_channel_time
+            and not self.max_channel_time
+        )
+
+    def getFlags(self):
+        """ Returns the IW_SCAN_* flags describing the request. """
+        scan_flags = wififlags.IW_SCAN_DEFAULT
+        if self.essid is not None:
+            scan_flags = scan_flags | wififlags.IW_SCAN_THIS_ESSID
+        if self.channels:
+            scan_flags = scan_flags | wififlags.IW_SCAN_THIS_FREQ
+        return scan_flags
+
+    def pack(self):
+        """ Returns the packed struct iw_scan_req. """
+        channel_list = []
+        for channel in self.channels:
+            # channel numbers are passed as is, frequencies scaled down
+            # only until they fit, like iwlist's iw_float2freq(); the
+            # kernel rejects exponents above 6
+            m, e = int(channel), 0
+            while m > GIGA:
+                m, e = m // 10, e + 1
+            channel_list.extend((m, e, 0, 0))
+        padding = wififlags.IW_MAX_FREQUENCIES - len(self.channels)
+        channel_list.extend((0, 0, 0, 0) * padding)
+        essid = self.essid or b""
+        return STRUCT_IW_SCAN_REQ.pack(
+            scan_types.get(self.scan_type, wififlags.IW_SCAN_TYPE_ACTIVE),
+            len(essid),
+            len(self.channels),
+            0,
+            b"",
+            essid,
+            self.min_channel_time,
+            self.max_channel_time,
+            *channel_list
+        )
+
+
 class Iwscan:
     """ Class to handle AP scanning. """
 
-    def __init__(self, ifname, fullscan=True):
+    def __init__(
+        self, ifname, fullscan=True, request=None, read=True, iwrequest=None
+    ):
         """Completes a scan for available access points,
          and returns them in Iwscanresult format.
 
-        fullscan: If False, data is read from a cache of the last scan
+        fullscan: If False, data is read from a cache of the last scan,
+                  without waiting: OSError (EAGAIN) is raised while a
+                  scan is in progress
                   If True, a scan is conducted, and then the data is read
+        request: Iwscanreq restricting the scan, None for a full scan
+        read: If False, nothing is done until trigger() or getScan()
+        iwrequest: Iwrequest of ifname to issue SIOCGIWSCAN through
 
         """
         self.ifname = ifname
-        self.range = Iwrange(ifname)
+        self.request = request
+        self.iwrequest = iwrequest
+        self.range = rangecache.get(ifname)
         self.stream = None
         self.aplist = None
         self.index = -1
-
-        if fullscan:
-            # Triggers the scan
-            iwstruct = Iwstruct()
-            datastr = iwstruct.pack("Pii", 0, 0, 0)
-            status, result = iwstruct.iw_set_ext(
-                self.ifname, wififlags.SIOCSIWSCAN, datastr
-            )
-            self.getScan()
+        # rtnetlink socket waiting for the scan completion event
+        self.listener = None
+        # scan buffer taken from scanbuffers while reading
+        self.buffer = None
+
+        if read:
+            if fullscan:
+                self.trigger()
+                self.getScan()
+            else:
+                self.getScan(0)
 
     def __iter__(self):
         return self
@@ -1434,185 +2925,589 @@ class Iwscan:
             raise StopIteration
         return self.aplist[self.index]
 
-    def getScan(self):
+    def trigger(self):
+        """Triggers a scan.
+
+        An rtnetlink listener is opened first, so that readScan() can
+        wake up on the kernel's scan completion event.
+
+        """
+        self.closeListener()
+        try:
+            self.listener = rtnetlink.Rtnetlink()
+        except OSError:
+            # no netlink here, readScan() will poll
+            self.listener = None
+        try:
+            if self.request is None or self.request.isDefault():
+                iwstruct = Iwstruct()
+                datastr = iwstruct.pack("Pii", 0, 0, 0)
+                status, result = iwstruct.iw_set_ext(
+                    self.ifname, wififlags.SIOCSIWSCAN, datastr
+                )
+            else:
+                # the kernel reads the iw_scan_req from our buffer
+                buff = array.array("B", self.request.pack())
+                iwrequest = Iwrequest(self.ifname, payload_size=0)
+                iwrequest.getPointInto(
+                    wififlags.SIOCSIWSCAN, buff, self.request.getFlags()
+                )
+        except BaseException:
+            self.closeListener()
+            raise
+
+    def closeListener(self):
+        """ Closes the rtnetlink listener, if any. """
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+    def _waitScan(self, delay):
+        """Waits for the scan to complete for at most delay seconds.
+
+        Returns the delay to use for the next wait.
+
+        """
+        if self.listener is not None:
+            try:
+                if self.listener.waitScan(getIfindex(self.ifname), delay):
+                    return SCAN_WAIT_MIN
+            except OSError:
+                self.closeListener()
+            else:
+                return min(delay * 2, SCAN_WAIT_MAX_EVENT)
+        time.sleep(delay)
+        return min(delay * 2, SCAN_WAIT_MAX)
+
+    def getScan(self, timeout=None):
         """Retrieves results, stored from the most recent scan."""
-        iwstruct = Iwstruct()
-        bufflen = wififlags.IW_SCAN_MAX_DATA
+        try:
+            self.aplist = self._parse(self.readScan(timeout))
+        finally:
+            self.releaseBuffer()
+
+    def iterScan(self):
+        """Retrieves the most recent scan and yields its Iwscanresult
+        objects one at a time.
+
+        Each result is yielded as soon as the next cell starts, and is
+        not kept, so stopping early skips parsing the rest.
+
+        """
+        return self._iterScan(self.readScan())
+
+    def _iterScan(self, data):
+        try:
+            for scanresult in iterScanresults(data, self.range):
+                yield scanresult
+        finally:
+            self.releaseBuffer()
+
+    def releaseBuffer(self):
+        """Hands the scan buffer back for reuse by the next scan.
+
+        The data returned by readScan() is invalid afterwards.
+
+        """
+        if self.buffer is not None:
+            scanbuffers.get(self.ifname).give(self.buffer)
+            self.buffer = None
+
+    def readScan(self, timeout=None):
+        """Reads the most recent scan's event stream from the kernel.
+
+        Returns a memoryview of the filled part of the scan buffer;
+        call releaseBuffer() when done with it.
+
+        'timeout' -- float -- seconds to wait for the scan to complete,
+            forever if None; OSError (ETIMEDOUT) is raised when it
+            expires.  With a timeout of 0 the results are read once,
+            and OSError (EAGAIN) is raised if a scan is in progress.
+
+        """
+        if timeout == 0:
+            try:
+                data = self.tryReadScan()
+            finally:
+                self.closeListener()
+            if data is None:
+                raise OSError(errno.EAGAIN, os.strerror(errno.EAGAIN))
+            return data
+        delay = SCAN_WAIT_MIN
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        try:
+            while True:
+                data = self.tryReadScan()
+                if data is not None:
+                    return data
+                # Permission was NOT denied,
+                #   therefore we must WAIT to get results
+                if timeout is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OSError(errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT))
+                    delay = min(delay, remaining)
+                delay = self._waitScan(delay)
+        finally:
+            self.closeListener()
+
+    def tryReadScan(self):
+        """Reads the scan results if the scan has completed.
+
+        Returns a memoryview of the filled part of the buffer, or None
+        if the scan is still in progress (EAGAIN).  Does not block, so
+        it can be driven from an event loop.
+
+        """
+        scanbuffer = scanbuffers.get(self.ifname)
+        if self.buffer is None:
+            self.buffer = scanbuffer.take()
+        iwrequest = self.iwrequest
+        if iwrequest is None:
+            iwrequest = Iwrequest(self.ifname, payload_size=0)
 
         # Make repeated requests for scan with various recovery schemes
         while True:
-            buff, datastr = iwstruct.pack_wrq(bufflen)
             try:
-                status, result = iwstruct.iw_get_ext(
-                    self.ifname, wififlags.SIOCGIWSCAN, data=datastr
-                )
+                iwrequest.getPointInto(wififlags.SIOCGIWSCAN, self.buffer)
             except OSError as io_error:
                 if io_error.errno == errno.E2BIG:
                     # Keep resizing the buffer until it's
                     #   large enough to hold the scan
-                    pbuff, newlen = iwstruct.unpack("Pi", datastr)
-                    if bufflen < newlen:
-                        # the driver told us how big to make the buffer
-                        bufflen = newlen
-                    else:
-                        # try doubling the buffer size
-                        bufflen = bufflen * 2
+                    pbuff, newlen, flags = STRUCT_IW_POINT.unpack_from(
+                        iwrequest.data
+                    )
+                    self.buffer = scanbuffer.grow(self.buffer, newlen)
                 elif io_error.errno == errno.EAGAIN:
-                    # Permission was NOT denied,
-                    #   therefore we must WAIT to get results
-                    time.sleep(0.1)
+                    scanbuffer.waited()
+                    return None
                 else:
                     raise
-            except BaseException:
-                raise
             else:
                 break
 
-        # unpack the buffer pointer and length
-        pbuff, reslen = iwstruct.unpack("Pi", datastr)
-        if reslen > 0:
-            # Initialize the stream, and turn it into an enumerator
-            self.aplist = self._parse(buff.tobytes())
+        # the kernel reports how much of the buffer it filled
+        pbuff, reslen, flags = STRUCT_IW_POINT.unpack_from(iwrequest.data)
+        if scanbuffer.learn(reslen):
+            scanbuffers.learned(scanbuffer)
+        return memoryview(self.buffer)[:reslen]
 
     def _parse(self, data):
         """Parse the event stream, and return a list of Iwscanresult
         objects.
 
         """
-        iwstruct = Iwstruct()
-        scanresult = None
-        aplist = []
-
-        # Run through the stream until it is too short to contain a command
-        while len(data) >= wififlags.IW_EV_LCP_PK_LEN:
-            # Unpack the header
-            length, cmd = iwstruct.unpack("HH", data[: wififlags.IW_EV_LCP_PK_LEN])
-            # If the event length is too short to contain valid data,
-            # then break, because we're probably at the end of the cell's data
-            if length < wififlags.IW_EV_LCP_PK_LEN:
-                break
-            # Put the events into their respective result data
-            if cmd == wififlags.SIOCGIWAP:
-                if scanresult:
-                    aplist.append(scanresult)
-                scanresult = Iwscanresult(
-                    data[wififlags.IW_EV_LCP_PK_LEN : length], self.range
-                )
-            elif scanresult is None:
-                raise RuntimeError("Attempting to add an event without AP data.")
-            else:
-                scanresult.addEvent(cmd, data[wififlags.IW_EV_LCP_PK_LEN : length])
-            # We're finished with the previous event
-            data = data[length:]
-
-        # Don't forget the final result
-        if scanresult:
-            if scanresult.bssid != "00:00:00:00:00:00":
-                aplist.append(scanresult)
-            else:
-                raise RuntimeError("Attempting to add an AP without a bssid")
-        return aplist
+        return parseScan(data, self.range)
+
+
+class Iwmultiscan:
+    """The scans of several interfaces, merged by BSSID.
+
+    'scans' maps each interface which was scanned to its Iwscan, and
+    'errors' each interface which failed to the exception.  A BSS seen
+    by several radios is listed once in 'results', with the result of
+    the radio which heard it best, and 'levels' keeps the signal level
+    each radio measured.
+
+    """
+
+    def __init__(self, scans=None, errors=None):
+        self.scans = {}
+        self.errors = dict(errors or {})
+        # bssid -> (ifname, Iwscanresult) with the best signal
+        self.results = {}
+        # bssid -> {ifname: signal level}
+        self.levels = {}
+        for ifname, scan in (scans or {}).items():
+            try:
+                self.add(ifname, scan)
+            except Exception as error:
+                # e.g. a malformed event in this radio's results
+                self.errors[ifname] = error
+
+    def __iter__(self):
+        return iter([scanresult for ifname, scanresult in self.results.values()])
+
+    def __len__(self):
+        return len(self.results)
+
+    def add(self, ifname, scan):
+        """Merges the results of ifname's Iwscan.
+
+        The results are decoded before anything is merged, so if that
+        fails the exception is raised and nothing of the scan is kept.
+
+        """
+        decoded = [
+            (scanresult.bssid, scanresult.quality.siglevel, scanresult)
+            for scanresult in scan.aplist
+        ]
+        self.scans[ifname] = scan
+        for bssid, level, scanresult in decoded:
+            levels = self.levels.setdefault(bssid, {})
+            levels[ifname] = max(level, levels.get(ifname, level))
+            best = self.results.get(bssid)
+            if best is None or level > best[1].quality.siglevel:
+                self.results[bssid] = (ifname, scanresult)
+
+    def getBest(self, bssid):
+        """ Returns (ifname, Iwscanresult) of the radio hearing bssid best. """
+        return self.results[bssid]
+
+
+def scanAll(ifnames, timeout=None, **targets):
+    """Scans on several interfaces at once and returns an Iwmultiscan.
+
+    All scans are triggered first and their results are then waited
+    for concurrently, one thread per interface, so radios on different
+    bands sweep in parallel and the whole takes about as long as the
+    slowest of them.  An interface which fails is reported in the
+    errors of the result instead of failing the others.
+
+    'timeout' -- float -- seconds to wait for each scan, forever if None.
+
+    Other keyword arguments restrict the scans, see Iwscanreq.
+
+    """
+    scans = {}
+    errors = {}
+    for ifname in ifnames:
+        try:
+            scan = Iwscan(ifname, request=Iwscanreq(**targets), read=False)
+            scan.trigger()
+        except Exception as error:
+            errors[ifname] = error
+        else:
+            scans[ifname] = scan
+    if scans:
+        with concurrent.futures.ThreadPoolExecutor(len(scans)) as executor:
+            futures = dict(
+                (ifname, executor.submit(scan.getScan, timeout))
+                for ifname, scan in scans.items()
+            )
+            for ifname, future in futures.items():
+                try:
+                    future.result()
+                except Exception as error:
+                    # e.g. RuntimeError for a malformed event stream
+                    errors[ifname] = error
+                    del scans[ifname]
+    return Iwmultiscan(scans, errors)
+
+
+def parseScan(data, iwrange=None):
+    """Parses a SIOCGIWSCAN event stream into a list of Iwscanresult.
+
+    'data' -- bytes, array or memoryview -- the event stream.
+
+    """
+    return list(iterScanresults(data, iwrange))
+
+
+def iterScanresults(data, iwrange=None):
+    """Yields the Iwscanresult objects of a SIOCGIWSCAN event stream.
+
+    'data' -- bytes, array or memoryview -- the event stream.
+
+    The stream is walked with an offset over a memoryview, so each
+    event header is visited once; each cell's events are copied out in
+    one piece and decoded when the result's attributes are read.  A
+    result is yielded when the SIOCGIWAP event of the next cell is
+    reached, so only one cell is held at a time and the caller may stop
+    early, e.g.:
+
+    >>> for ap in iterScanresults(data):
+    ...     if ap.essid == b'romanofski':
+    ...         break
+
+    """
+    view = memoryview(data)
+    end = len(view)
+    lcp_len = wififlags.IW_EV_LCP_PK_LEN
+    unpack_header = STRUCT_IW_EVENT_HEADER.unpack_from
+    offset = 0
+    # the SIOCGIWAP event of the current cell, and where its other
+    # events start
+    ap_data = None
+    cell_start = 0
+
+    # Run through the stream until it is too short to contain a command
+    while end - offset >= lcp_len:
+        # Unpack the header
+        length, cmd = unpack_header(view, offset)
+        # If the event length is too short to contain valid data,
+        # then break, because we're probably at the end of the cell's data
+        if length < lcp_len:
+            break
+        # Split the stream into cells, their events are decoded later
+        if cmd == wififlags.SIOCGIWAP:
+            if ap_data is not None:
+                yield Iwscanresult(ap_data, iwrange, bytes(view[cell_start:offset]))
+            ap_data = view[offset + lcp_len : offset + length]
+            cell_start = offset + length
+        elif ap_data is None:
+            raise RuntimeError("Attempting to add an event without AP data.")
+        elif cmd not in scanresult_events:
+            # left in the cell, but nothing will decode it
+            skipped_scan_events[cmd] += 1
+        # We're finished with the previous event
+        offset = offset + length
+
+    # Don't forget the final result
+    if ap_data is not None:
+        scanresult = Iwscanresult(ap_data, iwrange, bytes(view[cell_start:offset]))
+        if scanresult.bssid != "00:00:00:00:00:00":
+            yield scanresult
+        else:
+            raise RuntimeError("Attempting to add an AP without a bssid")
+
+
+# Decoders of scan events: each takes the value decoded so far (from an
+# earlier event of the same kind, or the field's default) and the event
+# payload, and returns the new value.  Whatever is kept is copied out
+# of the payload, which may be a view into a reused buffer.
+
+
+def _scanFrequency(value, data):
+    return Iwfreq(data)
+
+
+def _scanMode(value, data):
+    return wififlags.modes[STRUCT_UINT.unpack_from(data)[0]]
+
+
+def _scanProtocol(value, data):
+    return bytes(data[: len(data) - 2])
+
+
+def _scanEssid(value, data):
+    return bytes(data[4:])
+
+
+def _scanEncode(value, data):
+    # (H) key length, (H) flags, then the key itself
+    length, flags = STRUCT_IW_POINT_PK.unpack_from(data)
+    return Iwpoint(data[4 : 4 + length], flags)
+
+
+def _scanRate(value, data):
+    freqsize = STRUCT_IW_FREQ.size
+    rates = []
+    for offset in range(0, len(data) - freqsize + 1, freqsize):
+        m, e, dummy, pad = STRUCT_IW_FREQ.unpack_from(data, offset)
+        if e == 0:
+            rates.append(m)
+        else:
+            rates.append(m * 10 ** e)
+    value.append(rates)
+    return value
+
+
+def _scanQuality(value, data):
+    value.parse(data)
+    return value
+
+
+def getWpaVersion(data, default=None):
+    """Returns the WPA version advertised by the payload of an
+    IWEVGENIE event: 2 for an RSN element, 1 for a WPA element, default
+    if there is neither.
+
+    'data' -- bytes or memoryview -- the event payload, starting with
+        its iw_point length and flags.
+
+    """
+    wpa1_oui = b"\x00\x50\xf2"
+    offset = 4  # skip the request code
+    while offset < len(data) - 2:
+        ielen = data[offset + 1]
+        if data[offset] == 0x30 and ielen > 4:
+            return 2
+        elif (
+            data[offset] == 0xDD
+            and ielen > 8
+            and data[offset + 2 : offset + 5] == wpa1_oui
+        ):
+            return 1
+        offset = offset + ielen + 2
+    return default
+
+
+def _scanWpa(value, data):
+    return getWpaVersion(data, value)
+
+
+def _scanIes(value, data):
+    # skip the request code, keep a copy the IEs can refer to
+    value.add(bytes(data[4:]))
+    return value
+
+
+def _scanCustom(value, data):
+    value.append(bytes(data[4:]))
+    return value
+
+
+class Iwscanfield:
+    """An Iwscanresult attribute decoded from the cell's events when it
+    is first read, and kept from then on.
+
+    'cmd' -- int -- the event carrying the attribute.
+    'decode' -- function -- (value, payload) -> value, for every such
+        event of the cell in stream order.
+    'default' -- callable -- returns the value if there is no event.
+    'name' -- str -- set from the attribute name in Iwscanresult.
+
+    """
+
+    def __init__(self, cmd, decode, default=None, name=None):
+        self.cmd = cmd
+        self.decode = decode
+        self.default = default
+        self.name = name
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = "_" + name
+
+    def __get__(self, scanresult, owner=None):
+        if scanresult is None:
+            return self
+        try:
+            return getattr(scanresult, self.slot)
+        except AttributeError:
+            pass
+        value = self.default() if self.default is not None else None
+        for cmd, data in scanresult.iterEvents(self.cmd):
+            value = self.decode(value, data)
+        setattr(scanresult, self.slot, value)
+        return value
+
+    def __set__(self, scanresult, value):
+        setattr(scanresult, self.slot, value)
+
+    def add(self, scanresult, data):
+        """ Decodes one more event into the attribute. """
+        self.__set__(scanresult, self.decode(self.__get__(scanresult), data))
 
 
 class Iwscanresult:
     """An object to contain all the events associated with a single
     scanned AP.
 
+    Only the BSSID is decoded up front.  The cell's other events are
+    kept as one bytes object and each attribute is decoded from it when
+    it is first read, so results which are only filtered by BSSID or
+    ESSID, or kept in a history, stay small.
+
     """
 
-    def __init__(self, data, iwrange):
-        """ Initialize the scan result with the access point data. """
+    __slots__ = (
+        "range",
+        "bssid",
+        "_events",
+        "_extra",
+        "_essid",
+        "_mode",
+        "_protocol",
+        "_frequency",
+        "_quality",
+        "_encode",
+        "_rate",
+        "_custom",
+        "_wpa",
+        "_ies",
+    )
+
+    essid = Iwscanfield(wififlags.SIOCGIWESSID, _scanEssid)
+    mode = Iwscanfield(wififlags.SIOCGIWMODE, _scanMode)
+    protocol = Iwscanfield(wififlags.SIOCGIWNAME, _scanProtocol)
+    frequency = Iwscanfield(wififlags.SIOCGIWFREQ, _scanFrequency)
+    quality = Iwscanfield(wififlags.IWEVQUAL, _scanQuality, Iwquality)
+    encode = Iwscanfield(wififlags.SIOCGIWENCODE, _scanEncode)
+    rate = Iwscanfield(wififlags.SIOCGIWRATE, _scanRate, list)
+    custom = Iwscanfield(wififlags.IWEVCUSTOM, _scanCustom, list)
+    wpa = Iwscanfield(wififlags.IWEVGENIE, _scanWpa)
+    ies = Iwscanfield(wififlags.IWEVGENIE, _scanIes, ie.IeList)
+
+    def __init__(self, data, iwrange, events=b""):
+        """Initialize the scan result with the access point data.
+
+        'events' -- bytes -- the cell's event stream following the
+            SIOCGIWAP event, decoded on demand.
+
+        """
         self.range = iwrange
         self.bssid = "%02X:%02X:%02X:%02X:%02X:%02X" % (
-            struct.unpack("BBBBBB", data[2:8])
+            STRUCT_SOCKADDR_HWADDR.unpack_from(data)
+        )
+        self._events = events
+
+    @property
+    def extra(self):
+        """Values of the events registered with registerScanEvent(), by
+        name, decoded on first access.
+
+        """
+        try:
+            return self._extra
+        except AttributeError:
+            pass
+        fields = dict(scanresult_extra)
+        extra = dict(
+            (field.name, field.default() if field.default is not None else None)
+            for field in fields.values()
         )
-        self.essid = None
-        self.mode = None
-        self.rate = []
-        self.quality = Iwquality()
-        self.frequency = None
-        self.encode = None
-        self.custom = []
-        self.protocol = None
+        for cmd, data in self.iterEvents():
+            field = fields.get(cmd)
+            if field is not None:
+                extra[field.name] = field.decode(extra[field.name], data)
+        self._extra = extra
+        return extra
+
+    def iterEvents(self, only=None):
+        """Yields (cmd, payload memoryview) of the kept events.
+
+        'only' -- int -- yield only the events of this command.
+
+        """
+        events = self._events
+        view = memoryview(events)
+        end = len(events)
+        lcp_len = wififlags.IW_EV_LCP_PK_LEN
+        unpack_header = STRUCT_IW_EVENT_HEADER.unpack_from
+        offset = 0
+        while end - offset >= lcp_len:
+            length, cmd = unpack_header(events, offset)
+            if length < lcp_len:
+                break
+            if only is None or cmd == only:
+                yield cmd, view[offset + lcp_len : offset + length]
+            offset = offset + length
 
     def addEvent(self, cmd, data):
-        """Attempts to add the data from an event to a scanresult.
-        Only certain data is accepted, in which case the result is True
-        If the event data is invalid, None is returned
-        If the data is valid but unused, False is returned
+        """Adds the data from an event to a scanresult.
+
+        The event is decoded by its Iwscanfield, or by a decoder
+        registered with registerScanEvent(); events without either are
+        counted in skipped_scan_events and otherwise ignored.
+
+        'data' may be a memoryview into the scan buffer; anything kept
+        from it is copied out, so the buffer can be reused afterwards.
 
         """
-        if (cmd in range(wififlags.SIOCIWFIRST, wififlags.SIOCIWLAST + 1)) or (
-            cmd in range(wififlags.IWEVFIRST, wififlags.IWEVLAST + 1)
-        ):
-            if cmd == wififlags.SIOCGIWNWID:
-                pass
-            elif cmd == wififlags.SIOCGIWFREQ:
-                self.frequency = Iwfreq(data)
-            elif cmd == wififlags.SIOCGIWMODE:
-                raw_mode = struct.unpack("I", data[:4])[0]
-                self.mode = wififlags.modes[raw_mode]
-            elif cmd == wififlags.SIOCGIWNAME:
-                self.protocol = data[: len(data) - 2]
-            elif cmd == wififlags.SIOCGIWESSID:
-                self.essid = data[4:]
-            elif cmd == wififlags.SIOCGIWENCODE:
-                data = struct.unpack("B" * len(data), data)
-                self.encode = Iwpoint([])
-                self.encode.update(
-                    struct.pack(
-                        "PHH",
-                        (int(data[0]) << 16) + int(data[1]),
-                        data[2] << 8,
-                        data[3] << 8,
-                    )
-                )
-                if self.encode.caddr_t is None:
-                    self.encode.flags = self.encode.flags | wififlags.IW_ENCODE_NOKEY
-            elif cmd == wififlags.SIOCGIWRATE:
-                freqsize = struct.calcsize("ihbb")
-                rates = []
-                while len(data) >= freqsize:
-                    m, e, dummy, pad = struct.unpack("ihbb", data[:freqsize])
-                    if e == 0:
-                        rates.append(m)
-                    else:
-                        rates.append(m * 10 ** e)
-                    data = data[freqsize:]
-                self.rate.append(rates)
-            elif cmd == wififlags.SIOCGIWMODUL:
-                pass
-            elif cmd == wififlags.IWEVQUAL:
-                self.quality.parse(data)
-            elif cmd == wififlags.IWEVGENIE:
-                wpa1_oui = b"\x00\x50\xf2"
-                offset = 4  # skip the request code
-                while offset < len(data) - 2:
-                    ielen = data[offset + 1]
-                    if data[offset] == 0x30 and ielen > 4:
-                        self.wpa = 2
-                        break
-                    elif (
-                        data[offset] == 0xDD
-                        and ielen > 8
-                        and data[offset + 2 : offset + 5] == wpa1_oui
-                    ):
-                        self.wpa = 1
-                        break
-                    offset = offset + ielen + 2
-            elif cmd == wififlags.IWEVCUSTOM:
-                self.custom.append(data[1:])
-            else:
-                raise ValueError(
-                    "Unknown IW event command received. This "
-                    + "command cannot be used to add information "
-                    + "to the WiFi cell's profile."
-                )
-        else:
-            raise ValueError(
-                "Invalid IW event command received.  \
-                              This command is not allowed."
-            )
+        fields = scanresult_fields.get(cmd)
+        if fields is not None:
+            for field in fields:
+                field.add(self, data)
+            return
+        field = scanresult_extra.get(cmd)
+        if field is not None:
+            extra = self.extra
+            extra[field.name] = field.decode(extra[field.name], data)
+        elif cmd not in scanresult_events:
+            skipped_scan_events[cmd] += 1
 
     def display(self):
         print("ESSID:", self.essid)
@@ -1629,3 +3524,45 @@ class Iwscanresult:
         for custom in self.custom:
             print("Custom:", custom)
         print("")
+
+
+# Iwscanfield objects of each event which sets Iwscanresult attributes
+scanresult_fields = {}
+for _field in vars(Iwscanresult).values():
+    if isinstance(_field, Iwscanfield):
+        scanresult_fields.setdefault(_field.cmd, []).append(_field)
+del _field
+# Iwscanfield of the events added by registerScanEvent(), kept in
+# Iwscanresult.extra
+scanresult_extra = {}
+# events which are expected in a cell but not decoded
+ignored_scan_events = frozenset((wififlags.SIOCGIWNWID, wififlags.SIOCGIWMODUL))
+# events which are expected in a cell, whether they are decoded or not
+scanresult_events = set(scanresult_fields) | ignored_scan_events
+# cmd -> number of events skipped because nothing decodes them
+skipped_scan_events = collections.Counter()
+
+
+def registerScanEvent(cmd, name, decode, default=None):
+    """Decodes further scan events into Iwscanresult.extra[name].
+
+    'decode' and 'default' are as for Iwscanfield: decode(value, data)
+    is called with the value so far and the payload of each cmd event
+    of the cell, and returns the new value.
+
+    >>> registerScanEvent(
+    ...     wififlags.SIOCGIWMODUL, 'modulations',
+    ...     lambda value, data: STRUCT_UINT.unpack_from(data, 4)[0])
+
+    """
+    if cmd in scanresult_fields:
+        raise ValueError("Event %#x is decoded by Iwscanresult" % cmd)
+    scanresult_extra[cmd] = Iwscanfield(cmd, decode, default, name)
+    scanresult_events.add(cmd)
+
+
+def unregisterScanEvent(cmd):
+    """ Removes the decoder added by registerScanEvent() for cmd. """
+    scanresult_extra.pop(cmd, None)
+    if cmd not in scanresult_fields and cmd not in ignored_scan_events:
+        scanresult_events.discard(cmd)
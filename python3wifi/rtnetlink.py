@@ -0,0 +1,201 @@
+# Python WiFi -- a library to access wireless card properties via Python
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public License
+#    as published by the Free Software Foundation; either version 2.1 of
+#    the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307
+#    USA
+
+"""Minimal rtnetlink listener for link messages and wireless events.
+
+The kernel sends wireless extension events (e.g. the SIOCGIWSCAN event
+when a scan completes) to user space as RTM_NEWLINK messages carrying
+an IFLA_WIRELESS attribute.
+
+"""
+
+import errno
+import select
+import socket
+import struct
+import time
+
+from . import flags as wififlags
+
+
+STRUCT_NLMSGHDR = struct.Struct("IHHII")  # len, type, flags, seq, pid
+STRUCT_IFINFOMSG = struct.Struct("BxHiII")  # family, type, index, flags, change
+STRUCT_RTATTR = struct.Struct("HH")  # len, type
+STRUCT_IW_EVENT_HEADER = struct.Struct("HH")  # len, cmd
+
+RECV_SIZE = 65536
+
+
+def _align(length):
+    """ Rounds length up to the netlink alignment of 4 bytes. """
+    return (length + 3) & ~3
+
+
+def parseLinkMessages(data):
+    """Yields (msg_type, ifindex, ifflags, attrs) for the link messages
+    in a buffer read from an rtnetlink socket.
+
+    attrs maps attribute type to a memoryview of its payload.  Messages
+    other than RTM_NEWLINK and RTM_DELLINK are skipped.
+
+    """
+    view = memoryview(data)
+    end = len(view)
+    offset = 0
+    while end - offset >= STRUCT_NLMSGHDR.size:
+        msg_len, msg_type, msg_flags, seq, pid = STRUCT_NLMSGHDR.unpack_from(
+            view, offset
+        )
+        if msg_len < STRUCT_NLMSGHDR.size or offset + msg_len > end:
+            break
+        if msg_type in (wififlags.RTM_NEWLINK, wififlags.RTM_DELLINK):
+            body = offset + STRUCT_NLMSGHDR.size
+            family, if_type, ifindex, ifflags, change = STRUCT_IFINFOMSG.unpack_from(
+                view, body
+            )
+            attrs = {}
+            attr = body + STRUCT_IFINFOMSG.size
+            msg_end = offset + msg_len
+            while msg_end - attr >= STRUCT_RTATTR.size:
+                rta_len, rta_type = STRUCT_RTATTR.unpack_from(view, attr)
+                if rta_len < STRUCT_RTATTR.size:
+                    break
+                attrs[rta_type] = view[attr + STRUCT_RTATTR.size : attr + rta_len]
+                attr = attr + _align(rta_len)
+            yield (msg_type, ifindex, ifflags, attrs)
+        offset = offset + _align(msg_len)
+
+
+def wirelessEventCommands(data):
+    """ Yields the command of each event in an IFLA_WIRELESS payload. """
+    end = len(data)
+    offset = 0
+    while end - offset >= STRUCT_IW_EVENT_HEADER.size:
+        length, cmd = STRUCT_IW_EVENT_HEADER.unpack_from(data, offset)
+        if length < STRUCT_IW_EVENT_HEADER.size:
+            break
+        yield cmd
+        offset = offset + length
+
+
+def isScanComplete(messages, ifindex):
+    """Returns True if messages hold the SIOCGIWSCAN event which tells
+    that a scan on ifindex completed.
+
+    """
+    for msg_type, index, ifflags, attrs in messages:
+        if msg_type != wififlags.RTM_NEWLINK or index != ifindex:
+            continue
+        wireless = attrs.get(wififlags.IFLA_WIRELESS)
+        if wireless is not None and (
+            wififlags.SIOCGIWSCAN in wirelessEventCommands(wireless)
+        ):
+            return True
+    return False
+
+
+def getIfname(attrs):
+    """ Returns the IFLA_IFNAME attribute as a str, or None. """
+    ifname = attrs.get(wififlags.IFLA_IFNAME)
+    if ifname is None:
+        return None
+    return ifname.tobytes().split(b"\0", 1)[0].decode("utf8")
+
+
+class Rtnetlink:
+    """A non-blocking rtnetlink socket subscribed to link messages.
+
+    Raises OSError if netlink is not available (e.g. in some
+    containers); callers are expected to fall back to polling.
+
+    """
+
+    def __init__(self, groups=wififlags.RTMGRP_LINK):
+        self.sockfd = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_RAW, wififlags.NETLINK_ROUTE
+        )
+        try:
+            self.sockfd.setblocking(False)
+            self.sockfd.bind((0, groups))
+        except OSError:
+            self.sockfd.close()
+            raise
+        # set when the kernel dropped messages because we were too slow
+        self.overrun = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fileno(self):
+        return self.sockfd.fileno()
+
+    def close(self):
+        self.sockfd.close()
+
+    def read(self):
+        """Returns the link messages waiting on the socket, without
+        blocking, as (msg_type, ifindex, ifflags, attrs) tuples.
+
+        """
+        messages = []
+        while True:
+            try:
+                data = self.sockfd.recv(RECV_SIZE)
+            except BlockingIOError:
+                return messages
+            except OSError as error:
+                if error.errno != errno.ENOBUFS:
+                    raise
+                # the socket buffer overflowed and messages were lost
+                self.overrun = True
+                continue
+            if not data:
+                return messages
+            messages.extend(parseLinkMessages(data))
+
+    def wait(self, timeout):
+        """Waits up to timeout seconds for messages.
+
+        Returns the messages read, an empty list on timeout.
+
+        """
+        ready, _, _ = select.select([self.sockfd], [], [], timeout)
+        if not ready:
+            return []
+        return self.read()
+
+    def waitScan(self, ifindex, timeout):
+        """Waits up to timeout seconds for the SIOCGIWSCAN event which
+        tells that a scan on ifindex completed.
+
+        Returns True if the event arrived, or if messages were lost so
+        it may have been missed; False on timeout.
+
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if isScanComplete(self.wait(remaining), ifindex):
+                return True
+            if self.overrun:
+                self.overrun = False
+                return True
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+"""Micro-benchmarks for the parts of iwlibs which do not need hardware.
+
+Run as:  python tests/benchmark.py [name ...]
+
+"""
+import os
+import struct
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import scandata
+from python3wifi import flags, iwlibs
+
+
+def report(name, before, after):
+    print(
+        "%-24s before %9.2f us   after %9.2f us   (x%.1f)"
+        % (name, before * 1e6, after * 1e6, before / after)
+    )
+
+
+def bench_decoding(number=200000):
+    """ Compare per-call struct format parsing to precompiled structs. """
+    range_data = bytes(iwlibs.STRUCT_IW_RANGE.size)
+    param_data = memoryview(bytes(16))
+
+    def legacy(fmt, data):
+        size = struct.calcsize(fmt)
+        return struct.unpack(fmt, data[0:size])
+
+    for name, fmt, compiled, data in (
+        ("iw_param", "ibbH", iwlibs.STRUCT_IW_PARAM, param_data),
+        ("iw_range", iwlibs.STRUCT_IW_RANGE.format, iwlibs.STRUCT_IW_RANGE, range_data),
+    ):
+        before = min(
+            timeit.repeat(lambda: legacy(fmt, data), number=number, repeat=3)
+        )
+        after = min(
+            timeit.repeat(lambda: compiled.unpack_from(data), number=number, repeat=3)
+        )
+        report(name, before / number, after / number)
+
+
+class LegacyIwscanresult:
+    """ Iwscanresult as it was, decoding every event eagerly. """
+
+    def __init__(self, data, iwrange):
+        """ Initialize the scan result with the access point data. """
+        self.range = iwrange
+        self.bssid = "%02X:%02X:%02X:%02X:%02X:%02X" % (
+            iwlibs.STRUCT_SOCKADDR_HWADDR.unpack_from(data)
+        )
+        self.essid = None
+        self.mode = None
+        self.rate = []
+        self.quality = iwlibs.Iwquality()
+        self.frequency = None
+        self.encode = None
+        self.custom = []
+        self.protocol = None
+        self.wpa = None
+
+    def addEvent(self, cmd, data):
+        if (cmd in range(flags.SIOCIWFIRST, flags.SIOCIWLAST + 1)) or (
+            cmd in range(flags.IWEVFIRST, flags.IWEVLAST + 1)
+        ):
+            if cmd == flags.SIOCGIWNWID:
+                pass
+            elif cmd == flags.SIOCGIWFREQ:
+                self.frequency = iwlibs.Iwfreq(data)
+            elif cmd == flags.SIOCGIWMODE:
+                raw_mode = iwlibs.STRUCT_UINT.unpack_from(data)[0]
+                self.mode = flags.modes[raw_mode]
+            elif cmd == flags.SIOCGIWNAME:
+                self.protocol = bytes(data[: len(data) - 2])
+            elif cmd == flags.SIOCGIWESSID:
+                self.essid = bytes(data[4:])
+            elif cmd == flags.SIOCGIWENCODE:
+                # (H) key length, (H) flags, then the key itself
+                length, encode_flags = iwlibs.STRUCT_IW_POINT_PK.unpack_from(data)
+                self.encode = iwlibs.Iwpoint(data[4 : 4 + length], encode_flags)
+            elif cmd == flags.SIOCGIWRATE:
+                freqsize = iwlibs.STRUCT_IW_FREQ.size
+                rates = []
+                for offset in range(0, len(data) - freqsize + 1, freqsize):
+                    m, e, dummy, pad = iwlibs.STRUCT_IW_FREQ.unpack_from(
+                        data, offset
+                    )
+                    if e == 0:
+                        rates.append(m)
+                    else:
+                        rates.append(m * 10 ** e)
+                self.rate.append(rates)
+            elif cmd == flags.SIOCGIWMODUL:
+                pass
+            elif cmd == flags.IWEVQUAL:
+                self.quality.parse(data)
+            elif cmd == flags.IWEVGENIE:
+                wpa1_oui = b"\x00\x50\xf2"
+                offset = 4  # skip the request code
+                while offset < len(data) - 2:
+                    ielen = data[offset + 1]
+                    if data[offset] == 0x30 and ielen > 4:
+                        self.wpa = 2
+                        break
+                    elif (
+                        data[offset] == 0xDD
+                        and ielen > 8
+                        and data[offset + 2 : offset + 5] == wpa1_oui
+                    ):
+                        self.wpa = 1
+                        break
+                    offset = offset + ielen + 2
+            elif cmd == flags.IWEVCUSTOM:
+                self.custom.append(bytes(data[4:]))
+            else:
+                raise ValueError(
+                    "Unknown IW event command received. This "
+                    + "command cannot be used to add information "
+                    + "to the WiFi cell's profile."
+                )
+        else:
+            raise ValueError(
+                "Invalid IW event command received.  \
+                              This command is not allowed."
+            )
+
+
+def legacyParseScan(data, iwrange=None):
+    """ The scan parser as it was, copying the remaining buffer per event. """
+    scanresult = None
+    aplist = []
+    while len(data) >= flags.IW_EV_LCP_PK_LEN:
+        length, cmd = struct.unpack("HH", data[: flags.IW_EV_LCP_PK_LEN])
+        if length < flags.IW_EV_LCP_PK_LEN:
+            break
+        if cmd == flags.SIOCGIWAP:
+            if scanresult:
+                aplist.append(scanresult)
+            scanresult = LegacyIwscanresult(
+                data[flags.IW_EV_LCP_PK_LEN : length], iwrange
+            )
+        else:
+            scanresult.addEvent(cmd, data[flags.IW_EV_LCP_PK_LEN : length])
+        data = data[length:]
+    if scanresult:
+        aplist.append(scanresult)
+    return aplist
+
+
+def bench_scan(cells=(30, 300, 1000)):
+    """ Compare the slicing scan parser to the memoryview one. """
+    for count in cells:
+        data = scandata.makeScan(count)
+        # the legacy loop hands bytes slices to addEvent
+        number = max(1, 3000 // count)
+        before = min(
+            timeit.repeat(lambda: legacyParseScan(data), number=number, repeat=3)
+        )
+        after = min(
+            timeit.repeat(lambda: iwlibs.parseScan(data), number=number, repeat=3)
+        )
+        report(
+            "scan %d cells %d KB" % (count, len(data) // 1024),
+            before / number,
+            after / number,
+        )
+
+
+def bench_ies(cells=300, number=20):
+    """ Time walking and decoding the IEs of every cell of a scan. """
+    data = b"".join(
+        scandata.makeCell(index, ies=scandata.FULL_IES) for index in range(cells)
+    )
+    aplists = [iwlibs.parseScan(data) for count in range(number)]
+
+    def walk():
+        for ap in aplists.pop():
+            len(ap.ies)
+
+    def decode():
+        for ap in aplists.pop():
+            ies = ap.ies
+            ies.rsn.akm_suites
+            ies.bss_load.channel_utilization
+            ies.ht_capabilities.spatial_streams
+            ies.vht_operation.channel_width
+            ies.mobility_domain.mdid
+
+    for name, function in (("walk", walk), ("walk and decode", decode)):
+        aplists[:] = [iwlibs.parseScan(data) for count in range(number)]
+        elapsed = timeit.timeit(function, number=number) / number
+        print("%-24s %d cells %9.2f ms" % (name, cells, elapsed * 1e3))
+
+
+def measure(function):
+    """ Returns the result of function() and the memory it holds. """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(cells=1000):
+    """ Compare the memory held per retained scan result. """
+    data = scandata.makeScan(cells)
+    for name, parser, read in (
+        ("eager", legacyParseScan, ()),
+        ("lazy", iwlibs.parseScan, ()),
+        ("lazy, essid read", iwlibs.parseScan, ("essid",)),
+        ("lazy, all read", iwlibs.parseScan, ("essid", "rate", "encode", "custom")),
+    ):
+
+        def parse():
+            aplist = parser(data)
+            for ap in aplist:
+                for attribute in read:
+                    getattr(ap, attribute)
+            return aplist
+
+        aplist, size = measure(parse)
+        print("%-24s %6d bytes per cell" % (name, size // len(aplist)))
+
+
+benchmarks = {
+    "decoding": bench_decoding,
+    "scan": bench_scan,
+    "memory": bench_memory,
+    "ies": bench_ies,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or benchmarks:
+        benchmarks[name]()
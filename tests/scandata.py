@@ -0,0 +1,111 @@
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+"""Builds synthetic SIOCGIWSCAN event streams for tests and benchmarks.
+
+The layout follows what the kernel writes to user space: a packed
+(length, cmd) header, then the event payload.
+
+"""
+import struct
+
+from python3wifi import flags
+
+# RSN IE: version 1, CCMP group cipher, one CCMP pairwise, one PSK AKM
+RSN_IE = bytes.fromhex("30140100000fac040100000fac040100000fac020000")
+
+
+
+def packIe(element_id, body):
+    """ Returns one information element. """
+    return bytes((element_id, len(body))) + body
+
+
+# what a current 802.11ax AP advertises: SSID, rates, DS, country, BSS
+# load, HT, RSN (SAE and PSK), mobility domain, VHT, HE and WMM
+FULL_IES = b"".join(
+    (
+        packIe(0, b"office"),
+        packIe(1, bytes((0x82, 0x84, 0x8B, 0x96, 0x0C, 0x12, 0x18, 0x24))),
+        packIe(3, bytes((36,))),
+        packIe(7, b"DE " + bytes((36, 4, 23, 100, 12, 30))),
+        packIe(11, struct.pack("<HBH", 12, 200, 0)),
+        packIe(45, struct.pack("<HB16s", 0x09EF, 0x17, bytes((0xFF, 0xFF)))),
+        packIe(
+            48,
+            bytes.fromhex("0100000fac040100000fac040200000fac08000fac02c000"),
+        ),
+        packIe(54, struct.pack("<HB", 0x1234, 0x01)),
+        packIe(61, bytes((36, 0x05)) + bytes(20)),
+        packIe(191, struct.pack("<IHHHH", 0x338B79B2, 0xFFFA, 0, 0xFFFA, 0)),
+        packIe(192, struct.pack("<BBBH", 1, 42, 0, 0xFFFC)),
+        packIe(255, bytes((35,)) + bytes(17) + struct.pack("<HH", 0xFFFA, 0xFFFA)),
+        packIe(
+            221, bytes.fromhex("0050f202010180000003a4000027a4000042435e0062322f00")
+        ),
+    )
+)
+
+
+def packEvent(cmd, payload):
+    """ Returns one event: header and payload. """
+    return struct.pack("HH", flags.IW_EV_LCP_PK_LEN + len(payload), cmd) + payload
+
+
+def packPoint(cmd, data, iwflags=0):
+    """ Returns an event carrying an iw_point (length, flags, data). """
+    return packEvent(cmd, struct.pack("HH", len(data), iwflags) + data)
+
+
+def bssidFor(index):
+    """ Returns the locally administered MAC address for cell index. """
+    return bytes((0x02, 0x00, 0x00, (index >> 16) & 0xFF, (index >> 8) & 0xFF, index & 0xFF))
+
+
+def makeCell(
+    index,
+    essid=None,
+    channel=1,
+    level=-60,
+    encode_flags=flags.IW_ENCODE_NOKEY | 1,
+    ies=RSN_IE,
+):
+    """ Returns the events describing one cell. """
+    if essid is None:
+        essid = b"net%04d" % index
+    frequency = (2407 + 5 * channel) if channel < 14 else (5000 + 5 * channel)
+    rates = (1000000, 2000000, 5500000, 11000000, 54000000)
+    return b"".join(
+        (
+            packEvent(flags.SIOCGIWAP, struct.pack("H6s8x", 1, bssidFor(index))),
+            packPoint(flags.SIOCGIWESSID, essid, 1),
+            packEvent(flags.SIOCGIWMODE, struct.pack("I", flags.IW_MODE_MASTER)),
+            packEvent(flags.SIOCGIWFREQ, struct.pack("ihBB", frequency, 6, 0, 0)),
+            packEvent(flags.IWEVQUAL, struct.pack("BbbB", 50, level, -95, 0x0F)),
+            packPoint(flags.SIOCGIWENCODE, b"", encode_flags),
+            packEvent(
+                flags.SIOCGIWRATE,
+                b"".join(struct.pack("ibbH", rate, 0, 0, 0) for rate in rates),
+            ),
+            packPoint(flags.IWEVGENIE, ies),
+            packPoint(flags.IWEVCUSTOM, b"tsf=0000000000000000"),
+        )
+    )
+
+
+def makeScan(cells):
+    """ Returns an event stream with cells synthetic cells. """
+    return b"".join(makeCell(index) for index in range(cells))
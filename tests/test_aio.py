@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests do not need wireless hardware.
+#
+import asyncio
+import unittest
+from unittest import mock
+
+from python3wifi import aio
+
+
+class SlowScan:
+    """ Stands in for an Iwscan whose results are ready after a while. """
+
+    def __init__(self, polls):
+        self.ifname = "wlan0"
+        self.listener = None
+        self.polls = polls
+
+    def tryReadScan(self):
+        self.polls = self.polls - 1
+        if self.polls > 0:
+            return None
+        return memoryview(b"results")
+
+
+class TestAio(unittest.TestCase):
+    def test_readScanPolls(self):
+        scan = SlowScan(3)
+        data = asyncio.run(aio.readScan(scan))
+        self.assertEqual(data.tobytes(), b"results")
+        self.assertEqual(scan.polls, 0)
+
+    def test_concurrentScans(self):
+        async def both():
+            return await asyncio.gather(
+                aio.readScan(SlowScan(4)), aio.readScan(SlowScan(4))
+            )
+
+        self.assertEqual(len(asyncio.run(both())), 2)
+
+    def test_getterErrors(self):
+        async def essid():
+            async with aio.AsyncWireless("lo") as wifi:
+                return await wifi.getEssid()
+
+        self.assertRaises(OSError, asyncio.run, essid())
+
+    def test_scanAllErrors(self):
+        multiscan = asyncio.run(aio.scanAll(["lo", "nonexistent0"], timeout=1))
+        self.assertEqual(len(multiscan), 0)
+        self.assertEqual(sorted(multiscan.errors), ["lo", "nonexistent0"])
+
+    def test_scanAllMalformed(self):
+        async def scan(ifname, timeout=None, **targets):
+            raise RuntimeError("Attempting to add an event without AP data.")
+
+        with mock.patch.object(aio, "scan", scan):
+            multiscan = asyncio.run(aio.scanAll(["wlan0"]))
+        self.assertIsInstance(multiscan.errors["wlan0"], RuntimeError)
+
+    def test_getterNames(self):
+        self.assertEqual(aio.AsyncWireless.getEssid.__name__, "getEssid")
+        self.assertTrue(asyncio.iscoroutinefunction(aio.AsyncWireless.snapshot))
+
+
+if __name__ == "__main__":
+    unittest.main()
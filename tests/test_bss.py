@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests parse synthetic scan buffers and do not need hardware.
+#
+import unittest
+
+import scandata
+from python3wifi import flags
+from python3wifi.bss import BssDiff, BssTable, diffScans
+from python3wifi.iwlibs import parseScan
+
+
+def scan(*cells):
+    """ Returns the Iwscanresult objects of the given cells. """
+    return parseScan(b"".join(scandata.makeCell(*cell) for cell in cells))
+
+
+class TestBssTable(unittest.TestCase):
+    def test_merge(self):
+        table = BssTable()
+        changes = table.update(scan((0, b"home", 1), (1, b"home", 6)), now=0)
+        self.assertEqual(len(changes), 2)
+        entry = table.get("02:00:00:00:00:00")
+        self.assertEqual(entry.channel, 1)
+        self.assertEqual(entry.frequency, 2412000000)
+        self.assertEqual(entry.level, -60)
+        self.assertEqual(entry.max_rate, 54000000)
+        self.assertTrue(entry.encrypted)
+        self.assertEqual(entry.wpa, 2)
+
+        # only what changed is reported
+        changes = table.update(scan((0, b"home", 1, -70), (1, b"home", 6)), now=5)
+        self.assertEqual(
+            [(e.bssid, c) for e, c in changes], [(entry.bssid, ("level",))]
+        )
+        self.assertEqual((entry.first_seen, entry.last_seen, entry.seen), (0, 5, 2))
+
+    def test_indexes(self):
+        table = BssTable()
+        table.update(scan((0, b"home", 1), (1, b"home", 6), (2, b"cafe", 6)), now=0)
+        self.assertEqual(len(table.getByEssid(b"home")), 2)
+        self.assertEqual(len(table.getByChannel(6)), 2)
+        # the AP moved to another channel and was renamed
+        table.update(scan((1, b"cafe", 11)), now=1)
+        self.assertEqual(
+            [e.bssid for e in table.getByEssid(b"home")], ["02:00:00:00:00:00"]
+        )
+        self.assertEqual(len(table.getByEssid(b"cafe")), 2)
+        self.assertEqual(
+            [e.bssid for e in table.getByChannel(11)], ["02:00:00:00:00:01"]
+        )
+        self.assertEqual(len(table.getByChannel(6)), 1)
+
+    def test_expire(self):
+        table = BssTable(max_age=10)
+        table.update(scan((0, b"home", 1), (1, b"cafe", 6)), now=0)
+        table.update(scan((1, b"cafe", 6)), now=8)
+        table.update(scan((1, b"cafe", 6)), now=11)
+        self.assertNotIn("02:00:00:00:00:00", table)
+        self.assertEqual(table.getByEssid(b"home"), [])
+        self.assertEqual(table.by_channel, {6: {"02:00:00:00:00:01"}})
+
+    def test_maxEntries(self):
+        table = BssTable(max_age=None, max_entries=2)
+        table.update(scan((0,), (1,), (2,)), now=0)
+        self.assertEqual(
+            [e.bssid for e in table], ["02:00:00:00:00:01", "02:00:00:00:00:02"]
+        )
+
+    def test_unencrypted(self):
+        table = BssTable()
+        table.update(scan((0, b"open", 1, -60, flags.IW_ENCODE_DISABLED, b"")), now=0)
+        entry = table.get("02:00:00:00:00:00")
+        self.assertFalse(entry.encrypted)
+        self.assertIsNone(entry.wpa)
+
+
+class TestBssDiff(unittest.TestCase):
+    def test_events(self):
+        events = diffScans(
+            scan((0, b"home", 1, -60), (1, b"home", 6, -60), (2, b"cafe", 6)),
+            scan((0, b"home", 1, -63), (1, b"home", 11, -70), (3, b"rogue", 1)),
+        )
+        self.assertEqual(
+            [(event.kind, event.bssid) for event in events],
+            [
+                ("changed", "02:00:00:00:00:01"),
+                ("added", "02:00:00:00:00:03"),
+                ("removed", "02:00:00:00:00:02"),
+            ],
+        )
+        changed, added, removed = events
+        self.assertEqual(
+            changed.old, {"frequency": 2437000000, "channel": 6, "level": -60}
+        )
+        self.assertEqual(changed.new["level"], -70)
+        self.assertEqual(added.new["essid"], b"rogue")
+        self.assertEqual(removed.old["essid"], b"cafe")
+
+    def test_encryption(self):
+        events = diffScans(
+            scan((0, b"home", 1)),
+            scan((0, b"home", 1, -60, flags.IW_ENCODE_DISABLED, b"")),
+        )
+        self.assertEqual(events[0].new, {"encrypted": False, "wpa": None})
+
+    def test_listener(self):
+        diff = BssDiff()
+        received = []
+        diff.addListener(received.append)
+        diff.update(scan((0,), (1,)))
+        self.assertEqual(diff.update(scan((0,), (1,))), [])
+        self.assertEqual([event.kind for event in received], ["added", "added"])
+
+    def test_failedUpdate(self):
+        diff = BssDiff()
+        cells = [(index,) for index in range(5)]
+        diff.update(scan(*cells))
+
+        def failing():
+            for result in scan(*cells)[:3]:
+                yield result
+            raise RuntimeError("Attempting to add an event without AP data.")
+
+        with self.assertRaises(RuntimeError):
+            diff.update(failing())
+        # the failed update left the previous scan in place
+        self.assertEqual(diff.update(scan(*cells)), [])
+
+    def test_duplicate(self):
+        diff = BssDiff()
+        diff.update(scan((0, b"home", 1)))
+        events = diff.update(scan((0, b"home", 1), (0, b"home", 6)))
+        self.assertEqual(events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests parse synthetic scan buffers and do not need hardware.
+#
+import time
+import unittest
+
+import scandata
+from python3wifi import bss, columns, flags
+from python3wifi.iwlibs import parseScan
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def makeScan():
+    return b"".join(
+        (
+            scandata.makeCell(0, channel=1, level=-50),
+            scandata.makeCell(1, channel=6, level=-70),
+            scandata.makeCell(
+                2, channel=36, level=-80, encode_flags=flags.IW_ENCODE_DISABLED, ies=b""
+            ),
+        )
+    )
+
+
+class TestColumns(unittest.TestCase):
+    def test_scanColumns(self):
+        cols = columns.scanColumns(makeScan(), timestamp=100.0)
+        self.assertEqual(
+            list(cols["bssid"]), [0x020000000000, 0x020000000001, 0x020000000002]
+        )
+        self.assertEqual(list(cols["channel"]), [1, 6, 36])
+        self.assertEqual(cols["frequency"][2], 5180000000)
+        self.assertEqual(list(cols["level"]), [-50, -70, -80])
+        self.assertEqual(list(cols["noise"]), [-95, -95, -95])
+        self.assertEqual(list(cols["mode"]), [flags.modes.index("Master")] * 3)
+        self.assertEqual(list(cols["wpa"]), [2, 2, 0])
+        self.assertTrue(cols["encryption"][2] & flags.IW_ENCODE_DISABLED)
+        self.assertEqual(list(cols["timestamp"]), [100.0] * 3)
+
+    def test_append(self):
+        cols = columns.scanColumns(makeScan(), timestamp=1.0)
+        columns.scanColumns(makeScan(), timestamp=2.0, columns=cols)
+        self.assertEqual(len(cols["bssid"]), 6)
+
+    def test_resultColumns(self):
+        data = makeScan()
+        self.assertEqual(
+            columns.resultColumns(parseScan(data), timestamp=1.0),
+            columns.scanColumns(data, timestamp=1.0),
+        )
+
+    def test_bssColumns(self):
+        table = bss.BssTable()
+        table.update(parseScan(makeScan()), now=5.0)
+        cols = columns.bssColumns(table, clock_offset=100.0)
+        self.assertEqual(list(cols["channel"]), [1, 6, 36])
+        self.assertEqual(list(cols["wpa"]), [2, 2, 0])
+        self.assertEqual(list(cols["timestamp"]), [105.0] * 3)
+        # the same encryption flags as a scan of the same cells, the
+        # table does not keep the key index
+        scan_cols = columns.scanColumns(makeScan())
+        self.assertEqual(
+            list(cols["encryption"]),
+            [value & flags.IW_ENCODE_FLAGS for value in scan_cols["encryption"]],
+        )
+
+    def test_bssColumnsClock(self):
+        # default table times are monotonic, exported as wall-clock time
+        table = bss.BssTable()
+        table.update(parseScan(makeScan()))
+        entry = next(iter(table))
+        entry.encrypted = None
+        timestamp = columns.bssColumns(table)["timestamp"][0]
+        self.assertAlmostEqual(timestamp, time.time(), delta=1.0)
+        self.assertEqual(columns.bssColumns(table)["encryption"][0], 0)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_arrays(self):
+        records = columns.scanArray(makeScan(), timestamp=1.0)
+        self.assertEqual(records["level"][records["channel"] == 6].tolist(), [-70])
+        arrays = columns.toNumpyColumns(columns.makeColumns())
+        self.assertEqual(len(arrays["bssid"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests do not need wireless hardware.
+#
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from python3wifi import flags, iwlibs
+from python3wifi.iwlibs import Iwwniccache, Wnic, discoverWNICs
+
+
+def makeInterface(sysfs, ifname, ifindex, phy=None, wext=False, driver=None):
+    """ Adds the sysfs entries of an interface to a fake sysfs tree. """
+    path = os.path.join(sysfs, ifname)
+    os.mkdir(path)
+    with open(os.path.join(path, "ifindex"), "w") as fp:
+        fp.write("%d\n" % ifindex)
+    if phy is not None:
+        os.symlink("../../ieee80211/" + phy, os.path.join(path, "phy80211"))
+    if wext:
+        os.mkdir(os.path.join(path, "wireless"))
+    if driver is not None:
+        os.mkdir(os.path.join(path, "device"))
+        os.symlink(
+            "../../../bus/pci/drivers/" + driver,
+            os.path.join(path, "device", "driver"),
+        )
+
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sysfs = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_sysfs(self):
+        makeInterface(self.sysfs, "lo", 1)
+        makeInterface(self.sysfs, "eth0", 2, driver="e1000e")
+        makeInterface(self.sysfs, "wlan1", 7, phy="phy1", wext=True)
+        makeInterface(self.sysfs, "wlan0", 3, phy="phy0", wext=True, driver="iwlwifi")
+        makeInterface(self.sysfs, "eth1", 4, wext=True, driver="ipw2200")
+        self.assertEqual(
+            discoverWNICs(self.sysfs),
+            [
+                Wnic("wlan0", 3, "phy0", "iwlwifi"),
+                Wnic("eth1", 4, None, "ipw2200"),
+                Wnic("wlan1", 7, "phy1", None),
+            ],
+        )
+
+    def test_removed(self):
+        # an interface which vanished while the directory was listed
+        makeInterface(self.sysfs, "wlan0", 3, phy="phy0")
+        os.remove(os.path.join(self.sysfs, "wlan0", "ifindex"))
+        self.assertEqual(discoverWNICs(self.sysfs), [])
+
+    def test_fallback(self):
+        # without sysfs, the interfaces are probed with ioctls
+        missing = os.path.join(self.sysfs, "missing")
+        for wnic in discoverWNICs(missing):
+            self.assertIsInstance(wnic.ifindex, int)
+            self.assertIsNone(wnic.phy)
+
+
+class TestIfconf(unittest.TestCase):
+    def test_loopback(self):
+        nics = iwlibs.getConfiguredNICs()
+        self.assertIn(iwlibs.Nic("lo", 1, "127.0.0.1"), nics)
+
+    def test_grow(self):
+        # a buffer for a single ifreq is doubled until all of them fit
+        nics = iwlibs.getConfiguredNICs()
+        with mock.patch.object(iwlibs, "IFCONF_BUFFER_SIZE", iwlibs.IFREQ_SIZE):
+            self.assertEqual(iwlibs.getConfiguredNICs(), nics)
+
+    def test_wireless(self):
+        # the loopback interface has no wireless extensions
+        self.assertNotIn("lo", iwlibs.getConfiguredWNICnames())
+
+
+class FakeListener:
+    """ Stands in for an Rtnetlink socket, returning queued messages. """
+
+    def __init__(self):
+        self.messages = []
+        self.overrun = False
+
+    def read(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+    def close(self):
+        pass
+
+    def add(self, msg_type, ifindex, ifname):
+        attrs = {flags.IFLA_IFNAME: memoryview(ifname.encode() + b"\0")}
+        self.messages.append((msg_type, ifindex, 0, attrs))
+
+
+class FakeWniccache(Iwwniccache):
+    def __init__(self, sysfs):
+        Iwwniccache.__init__(self, sysfs)
+        self.fake_listener = FakeListener()
+        self.removed = []
+        self.addListener(self.removed.append)
+
+    def _openListener(self):
+        return self.fake_listener
+
+
+class TestWniccache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sysfs = self.tmpdir.name
+        makeInterface(self.sysfs, "eth0", 2, driver="e1000e")
+        makeInterface(self.sysfs, "wlan0", 3, phy="phy0")
+        self.cache = FakeWniccache(self.sysfs)
+        self.listener = self.cache.fake_listener
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def getNames(self):
+        return [wnic.ifname for wnic in self.cache.get()]
+
+    def test_added(self):
+        self.assertEqual(self.getNames(), ["wlan0"])
+        makeInterface(self.sysfs, "wlan1", 5, phy="phy1")
+        self.listener.add(flags.RTM_NEWLINK, 5, "wlan1")
+        makeInterface(self.sysfs, "veth0", 6)
+        self.listener.add(flags.RTM_NEWLINK, 6, "veth0")
+        self.assertEqual(self.getNames(), ["wlan0", "wlan1"])
+        self.assertEqual(self.cache.getWnic("wlan1"), Wnic("wlan1", 5, "phy1", None))
+
+    def test_removed(self):
+        self.assertEqual(self.getNames(), ["wlan0"])
+        iwlibs.scanbuffers.get("wlan0")
+        self.listener.add(flags.RTM_DELLINK, 2, "eth0")
+        self.listener.add(flags.RTM_DELLINK, 3, "wlan0")
+        with mock.patch.object(iwlibs.rangecache, "invalidate") as invalidate:
+            # polling alone applies the messages
+            self.assertEqual(self.cache.poll(), 1)
+        self.assertEqual(
+            invalidate.call_args_list, [mock.call("eth0"), mock.call("wlan0")]
+        )
+        self.assertEqual(self.getNames(), [])
+        self.assertEqual(self.cache.removed, ["wlan0"])
+        self.assertNotIn("wlan0", iwlibs.scanbuffers.getStats())
+
+    def test_renamed(self):
+        self.assertEqual(self.getNames(), ["wlan0"])
+        os.rename(
+            os.path.join(self.sysfs, "wlan0"), os.path.join(self.sysfs, "wlp2s0")
+        )
+        self.listener.add(flags.RTM_NEWLINK, 3, "wlp2s0")
+        self.assertEqual(self.getNames(), ["wlp2s0"])
+        self.assertEqual(self.cache.removed, ["wlan0"])
+
+    def test_overrun(self):
+        self.assertEqual(self.getNames(), ["wlan0"])
+        makeInterface(self.sysfs, "wlan1", 5, phy="phy1")
+        self.listener.overrun = True
+        self.assertEqual(self.getNames(), ["wlan0", "wlan1"])
+
+    def test_fork(self):
+        self.assertEqual(self.getNames(), ["wlan0"])
+        inherited = self.listener
+        inherited.close = mock.Mock()
+        # as seen from a child process
+        self.cache._afterFork()
+        self.cache.fake_listener = FakeListener()
+        makeInterface(self.sysfs, "wlan1", 5, phy="phy1")
+        self.assertEqual(self.getNames(), ["wlan0", "wlan1"])
+        inherited.close.assert_called_once_with()
+        self.assertIs(self.cache._listener, self.cache.fake_listener)
+
+    def test_noNetlink(self):
+        cache = Iwwniccache(self.sysfs)
+        cache._openListener = mock.Mock(side_effect=OSError)
+        self.assertEqual([wnic.ifname for wnic in cache.get()], ["wlan0"])
+        makeInterface(self.sysfs, "wlan1", 5, phy="phy1")
+        self.assertEqual([wnic.ifname for wnic in cache.get()], ["wlan0", "wlan1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
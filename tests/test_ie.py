@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests parse synthetic information elements and do not need hardware.
+#
+import unittest
+
+import scandata
+from python3wifi import ie
+from python3wifi.iwlibs import parseScan
+
+
+class TestIes(unittest.TestCase):
+    def setUp(self):
+        self.ies = ie.IeList(scandata.FULL_IES)
+
+    def test_walk(self):
+        self.assertEqual(
+            [element.id for element in self.ies],
+            [0, 1, 3, 7, 11, 45, 48, 54, 61, 191, 192, 255, 221],
+        )
+        self.assertEqual(self.ies.ssid.ssid, b"office")
+        self.assertEqual(type(self.ies[-1]), ie.VendorIe)
+        self.assertEqual(self.ies[-1].vendor_type, 2)
+
+    def test_rsn(self):
+        rsn = self.ies.rsn
+        self.assertEqual(rsn.version, 1)
+        self.assertEqual(rsn.group_cipher, ie.CIPHER_CCMP)
+        self.assertEqual(rsn.pairwise_ciphers, [ie.CIPHER_CCMP])
+        self.assertEqual(rsn.akm_suites, [ie.AKM_SAE, ie.AKM_PSK])
+        self.assertEqual(rsn.capabilities, 0xC0)
+        self.assertIsNone(self.ies.wpa)
+
+    def test_capabilities(self):
+        self.assertEqual(self.ies.ht_capabilities.spatial_streams, 2)
+        self.assertTrue(self.ies.ht_operation.channel_width_40)
+        self.assertEqual(self.ies.vht_capabilities.spatial_streams, 2)
+        self.assertEqual(self.ies.vht_operation.center_segment0, 42)
+        self.assertEqual(self.ies.he_capabilities.spatial_streams, 2)
+
+    def test_management(self):
+        load = self.ies.bss_load
+        self.assertEqual((load.station_count, load.channel_utilization), (12, 200))
+        self.assertEqual(self.ies.country.country, "DE")
+        self.assertEqual(self.ies.country.channels, [(36, 4, 23), (100, 12, 30)])
+        self.assertEqual(self.ies.mobility_domain.mdid, 0x1234)
+        self.assertEqual(self.ies[1].basic_rates, [1000000, 2000000, 5500000, 11000000])
+
+    def test_truncated(self):
+        # RSN without capabilities, then an element cut short
+        data = scandata.packIe(48, bytes.fromhex("0100000fac04")) + b"\x0b\x05\x01"
+        ies = ie.IeList(data)
+        self.assertEqual(len(ies), 1)
+        self.assertEqual(ies.rsn.group_cipher, ie.CIPHER_CCMP)
+        self.assertIsNone(ies.rsn.akm_suites)
+
+    def test_wpa1(self):
+        data = scandata.packIe(
+            221, bytes.fromhex("0050f20101000050f20201000050f20201000050f202")
+        )
+        wpa = ie.IeList(data).wpa
+        self.assertEqual(wpa.pairwise_ciphers, [0x0050F202])
+        self.assertEqual(ie.akm_suites[wpa.akm_suites[0]], "PSK")
+
+    def test_scanresult(self):
+        ap = parseScan(scandata.makeCell(0, ies=scandata.FULL_IES))[0]
+        self.assertEqual(ap.ies.bss_load.station_count, 12)
+        self.assertEqual(ap.wpa, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
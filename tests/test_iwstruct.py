@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests do not need wireless hardware.
+#
+import errno
+import os
+import struct
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from python3wifi import flags, iwlibs
+from python3wifi.iwlibs import (
+    Iwchannels,
+    Iwquality,
+    Iwrangecache,
+    Iwrequest,
+    Iwsocketpool,
+    Iwstatsfile,
+    Iwstruct,
+    Wireless,
+    Wstats,
+    formatFrequency,
+    getIfindex,
+    probeMany,
+    snapshot_fields,
+)
+
+
+class TestSocketPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = Iwsocketpool()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_sharedSocket(self):
+        first = Iwstruct(self.pool)
+        second = Iwstruct(self.pool)
+        self.assertIs(first.sockfd, second.sockfd)
+
+    def test_closeReopens(self):
+        sockfd = self.pool.get()
+        self.pool.close()
+        self.assertEqual(sockfd.fileno(), -1)
+        self.assertNotEqual(self.pool.get().fileno(), -1)
+
+    def test_closedIwstruct(self):
+        with Iwstruct(self.pool) as iwstruct:
+            iwstruct.sockfd
+        with self.assertRaises(OSError) as context:
+            iwstruct.sockfd
+        self.assertEqual(context.exception.errno, errno.EBADF)
+
+    def test_reopenAfterFork(self):
+        inherited = self.pool.get()
+        parent_fd = inherited.fileno()
+        pid = os.fork()
+        if pid == 0:
+            # the child must not keep using the inherited socket
+            reopened = self.pool.get() is not inherited
+            os._exit(0 if reopened and inherited.fileno() == -1 else 1)
+        pid, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIs(self.pool.get(), inherited)
+        self.assertEqual(inherited.fileno(), parent_fd)
+
+    def test_noPidCheck(self):
+        # the fast path makes no system call, not even getpid()
+        self.pool.get()
+        with mock.patch("os.getpid", side_effect=AssertionError):
+            self.pool.get()
+
+
+class TestDecoding(unittest.TestCase):
+    def setUp(self):
+        self.data = struct.pack("ibbH", 54000000, 1, 0, 7) + struct.pack(
+            "BbbB", 70, -40, -95, 15
+        )
+
+    def test_decode(self):
+        view = memoryview(self.data)
+        self.assertEqual(Iwstruct.decode("iw_param", view), (54000000, 1, 0, 7))
+        self.assertEqual(Iwstruct.decode("BbbB", view, 8), (70, -40, -95, 15))
+
+    def test_parseDataCursor(self):
+        iwstruct = Iwstruct()
+        self.assertEqual(iwstruct.parse_data("ibbH", self.data), (54000000, 1, 0, 7))
+        self.assertEqual(iwstruct.parse_data("B", self.data), 70)
+
+    def test_qualityOffset(self):
+        qual = Iwquality()
+        qual.parse(self.data, 8)
+        self.assertEqual(
+            (qual.quality, qual.siglevel, qual.nlevel, qual.updated), (70, -40, -95, 15)
+        )
+
+
+class TestIwrequest(unittest.TestCase):
+    def test_ifreqLayout(self):
+        iwrequest = Iwrequest("wlan0", payload_size=64)
+        self.assertEqual(len(iwrequest.ifreq), flags.IWREQ_SIZE)
+        self.assertEqual(iwrequest.ifreq.tobytes()[:6], b"wlan0\0")
+        self.assertEqual(len(iwrequest.data), flags.IWREQ_SIZE - flags.IFNAMSIZE)
+
+    def test_nameTooLong(self):
+        with self.assertRaises(OSError) as context:
+            Iwrequest("x" * flags.IFNAMSIZE)
+        self.assertEqual(context.exception.errno, errno.ENODEV)
+
+    def test_pointIntoPayload(self):
+        iwrequest = Iwrequest("lo", payload_size=64)
+        # lo has no wireless extensions, but the request is still built
+        with self.assertRaises(OSError):
+            iwrequest.getPoint(flags.SIOCGIWESSID, 32)
+        pointer, length, iwflags = struct.unpack_from("PHH", iwrequest.data)
+        self.assertEqual(pointer, iwrequest.payload.buffer_info()[0])
+        self.assertEqual((length, iwflags), (32, 0))
+        with self.assertRaises(ValueError):
+            iwrequest.getPoint(flags.SIOCGIWESSID, 65)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        # lo has no wireless extensions, so every field fails
+        self.wifi = Wireless("lo")
+
+    def tearDown(self):
+        self.wifi.close()
+
+    def test_errorsCaptured(self):
+        snap = self.wifi.snapshot(("name", "essid", "stats"))
+        self.assertEqual(snap.ifname, "lo")
+        self.assertEqual(sorted(snap.errors), ["essid", "name", "stats"])
+        self.assertIsNone(snap.name)
+        self.assertIsNone(snap.range)
+
+    def test_allFields(self):
+        snap = self.wifi.snapshot()
+        self.assertEqual(set(snap.errors), set(snapshot_fields))
+
+    def test_readOnly(self):
+        snap = self.wifi.snapshot(())
+        with self.assertRaises(AttributeError):
+            snap.essid = "Joost"
+
+    def test_unknownField(self):
+        with self.assertRaises(ValueError):
+            self.wifi.snapshot(("nickname",))
+
+    def test_rawEssid(self):
+        # ESSIDs are arbitrary bytes, not necessarily UTF-8
+        essid = b"caf\xe9\xff"
+        iwrequest = mock.Mock()
+        iwrequest.getPoint.return_value = memoryview(
+            essid + b"\0" * (flags.IW_ESSID_MAX_SIZE - len(essid))
+        )
+        request, decoder = snapshot_fields["essid"]
+        self.assertEqual(decoder(iwrequest, request), essid)
+
+
+class TestProbeMany(unittest.TestCase):
+    def test_errorsCaptured(self):
+        results = list(probeMany(["lo", "lo"], ("name", "essid")))
+        self.assertEqual(len(results), 1)
+        ifname, snap, error = results[0]
+        self.assertEqual(ifname, "lo")
+        self.assertIsNone(error)
+        self.assertEqual(sorted(snap.errors), ["essid", "name"])
+
+    def test_failed(self):
+        failure = OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+        with mock.patch.object(Wireless, "snapshot", side_effect=failure):
+            results = list(probeMany(["lo"]))
+        self.assertEqual(results, [("lo", None, failure)])
+
+    def test_otherErrors(self):
+        def snapshot(wifi, fields):
+            if wifi.ifname == "bad0":
+                raise UnicodeDecodeError("utf8", b"\xff", 0, 1, "invalid")
+            return wifi.ifname
+
+        with mock.patch.object(Wireless, "snapshot", snapshot):
+            results = dict(
+                (ifname, (snap, error))
+                for ifname, snap, error in probeMany(["bad0", "lo"])
+            )
+        self.assertEqual(results["lo"], ("lo", None))
+        self.assertIsNone(results["bad0"][0])
+        self.assertIsInstance(results["bad0"][1], UnicodeDecodeError)
+
+    def test_timeout(self):
+        def snapshot(wifi, fields):
+            if wifi.ifname == "slow0":
+                time.sleep(0.5)
+            return wifi.ifname
+
+        start = time.monotonic()
+        with mock.patch.object(Wireless, "snapshot", snapshot):
+            results = list(probeMany(["slow0", "lo"], timeout=0.05))
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(results[0], ("lo", "lo", None))
+        ifname, snap, error = results[1]
+        self.assertEqual((ifname, snap), ("slow0", None))
+        self.assertEqual(error.errno, errno.ETIMEDOUT)
+
+    def test_unknownField(self):
+        with self.assertRaises(ValueError):
+            list(probeMany(["lo"], ("nickname",)))
+
+
+PROC_NET_WIRELESS = b"""\
+Inter-| sta-|   Quality        |   Discarded packets               | Missed | WE
+ face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22
+ wlan0: 0000   54.  -56.  -256        0      0      0      3      7        0
+  eth1: 0001   70   -40.   -95.       1      2      4      5      6       12
+"""
+
+
+class TestStatsfile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "wireless")
+        with open(self.path, "wb") as fp:
+            fp.write(PROC_NET_WIRELESS)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        with Iwstatsfile(self.path) as statsfile:
+            stats = statsfile.read()
+        self.assertEqual(sorted(stats), ["eth1", "wlan0"])
+        self.assertEqual(
+            stats["wlan0"],
+            Wstats("wlan0", 0, 54, -56, -256, 3, 0, 0, 0, 3, 7, 0),
+        )
+        self.assertEqual(
+            stats["eth1"],
+            Wstats("eth1", 1, 70, -40, -95, 6, 1, 2, 4, 5, 6, 12),
+        )
+
+    def test_reread(self):
+        # the buffer is doubled until the file fits, and reused
+        statsfile = Iwstatsfile(self.path, size=16)
+        self.assertEqual(len(statsfile.read()), 2)
+        with open(self.path, "wb") as fp:
+            fp.write(PROC_NET_WIRELESS.rsplit(b"\n", 2)[0] + b"\n")
+        self.assertEqual(list(statsfile.read()), ["wlan0"])
+        statsfile.close()
+        statsfile.close()
+
+    def test_shortReads(self):
+        # like /proc files, which return about a page per read
+        preadv = os.preadv
+
+        def short_preadv(fd, buffers, offset):
+            return preadv(fd, [memoryview(buffers[0])[:50]], offset)
+
+        with Iwstatsfile(self.path, size=64) as statsfile:
+            with mock.patch("os.preadv", short_preadv):
+                stats = statsfile.read()
+        self.assertEqual(sorted(stats), ["eth1", "wlan0"])
+        self.assertEqual(stats["eth1"].beacon, 12)
+
+
+class CountingRangecache(Iwrangecache):
+    """ Hands out plain objects instead of reading SIOCGIWRANGE. """
+
+    def __init__(self, ttl=300.0):
+        Iwrangecache.__init__(self, ttl)
+        self.loads = 0
+
+    def _load(self, ifname, iwrequest):
+        self.loads = self.loads + 1
+        return object()
+
+
+class TestRangecache(unittest.TestCase):
+    def setUp(self):
+        # link changes are tracked, in the first epoch
+        patcher = mock.patch.object(iwlibs, "wniccache")
+        self.wniccache = patcher.start()
+        self.wniccache.poll.return_value = 1
+        self.addCleanup(patcher.stop)
+
+    def test_cached(self):
+        cache = CountingRangecache()
+        first = cache.get("lo")
+        # hits make no ioctl
+        with mock.patch.object(Iwstruct, "_fcntl", side_effect=AssertionError):
+            self.assertIs(cache.get("lo"), first)
+        self.assertEqual(cache.loads, 1)
+
+    def test_noNetlink(self):
+        # without link messages the interface index is checked instead
+        self.wniccache.poll.return_value = None
+        cache = CountingRangecache()
+        first = cache.get("lo")
+        self.assertIs(cache.get("lo"), first)
+        with mock.patch.object(iwlibs, "getIfindex", return_value=99):
+            self.assertIsNot(cache.get("lo"), first)
+        self.assertEqual(cache.loads, 2)
+
+    def test_epoch(self):
+        # after a new discovery, entries are checked against the index
+        cache = CountingRangecache()
+        first = cache.get("lo")
+        self.wniccache.poll.return_value = 2
+        self.assertIs(cache.get("lo"), first)
+        with mock.patch.object(iwlibs, "getIfindex", return_value=99):
+            self.assertIsNot(cache.get("lo"), first)
+
+    def test_invalidate(self):
+        cache = CountingRangecache()
+        first = cache.get("lo")
+        cache.invalidate("lo")
+        self.assertIsNot(cache.get("lo"), first)
+        cache.invalidate()
+        cache.get("lo")
+        self.assertEqual(cache.loads, 3)
+
+    def test_expiry(self):
+        cache = CountingRangecache(ttl=0)
+        cache.get("lo")
+        cache.get("lo")
+        self.assertEqual(cache.loads, 2)
+
+    def test_noDevice(self):
+        cache = CountingRangecache()
+        with self.assertRaises(OSError) as context:
+            cache.get("nosuchwlan0")
+        self.assertEqual(context.exception.errno, errno.ENODEV)
+        self.assertEqual(cache.loads, 0)
+
+    def test_ifindex(self):
+        self.assertEqual(getIfindex("lo"), 1)
+
+
+class TestChannels(unittest.TestCase):
+    def setUp(self):
+        self.index = Iwchannels([(1, 2412000000), (6, 2437000000), (36, 5180000000)])
+
+    def test_lookups(self):
+        self.assertEqual(self.index.getFrequency(6), 2437000000)
+        self.assertEqual(self.index.getChannel(5180000000), 36)
+        self.assertIsNone(self.index.getFrequency(11))
+        self.assertEqual(
+            self.index.formatted, ("2.412 GHz", "2.437 GHz", "5.180 GHz")
+        )
+
+    def test_ieeeFallback(self):
+        self.assertEqual(self.index.getChannel(2484000000), 14)
+        self.assertEqual(self.index.getChannel(5955000000), 1)
+        self.assertEqual(self.index.getBand(5955000000), "6GHz")
+        self.assertEqual(self.index.getBand(2412000000), "2.4GHz")
+        self.assertIsNone(self.index.getChannel(2413000000))
+
+    def test_formatFrequency(self):
+        self.assertEqual(formatFrequency(2417000000), "2.417 GHz")
+        self.assertEqual(formatFrequency(900000000), "900.000 MHZ")
+        self.assertIsNone(formatFrequency(11))
+
+
+if __name__ == "__main__":
+    unittest.main()
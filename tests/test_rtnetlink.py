@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests parse synthetic netlink messages and do not need hardware.
+#
+import struct
+import time
+import unittest
+
+from python3wifi import flags, rtnetlink
+
+
+def packAttr(rta_type, payload):
+    """ Returns an rtattr, padded to 4 bytes. """
+    attr = struct.pack("HH", 4 + len(payload), rta_type) + payload
+    return attr + b"\0" * (-len(attr) % 4)
+
+
+def packLink(msg_type, ifindex, ifname=None, events=()):
+    """ Returns a link message, with wireless events (cmd, payload). """
+    attrs = b""
+    if ifname is not None:
+        attrs = attrs + packAttr(flags.IFLA_IFNAME, ifname.encode() + b"\0")
+    if events:
+        wireless = b"".join(
+            struct.pack("HH", 4 + len(payload), cmd) + payload
+            for cmd, payload in events
+        )
+        attrs = attrs + packAttr(flags.IFLA_WIRELESS, wireless)
+    body = struct.pack("BxHiII", 0, 1, ifindex, 0, 0) + attrs
+    return struct.pack("IHHII", 16 + len(body), msg_type, 0, 0, 0) + body
+
+
+class TestLinkMessages(unittest.TestCase):
+    def test_scanEvent(self):
+        data = packLink(
+            flags.RTM_NEWLINK,
+            3,
+            "wlan0",
+            [(flags.SIOCGIWSCAN, b"\0" * 4), (flags.IWEVCUSTOM, b"\0" * 8)],
+        )
+        messages = list(rtnetlink.parseLinkMessages(data))
+        self.assertEqual(len(messages), 1)
+        msg_type, ifindex, ifflags, attrs = messages[0]
+        self.assertEqual((msg_type, ifindex), (flags.RTM_NEWLINK, 3))
+        self.assertEqual(rtnetlink.getIfname(attrs), "wlan0")
+        self.assertEqual(
+            list(rtnetlink.wirelessEventCommands(attrs[flags.IFLA_WIRELESS])),
+            [flags.SIOCGIWSCAN, flags.IWEVCUSTOM],
+        )
+
+    def test_severalMessages(self):
+        data = (
+            packLink(flags.RTM_NEWLINK, 3, "wlan0")
+            + struct.pack("IHHII", 16, flags.NLMSG_DONE, 0, 0, 0)
+            + packLink(flags.RTM_DELLINK, 4, "wlan1")
+        )
+        messages = list(rtnetlink.parseLinkMessages(data))
+        self.assertEqual(
+            [(m[0], m[1]) for m in messages],
+            [(flags.RTM_NEWLINK, 3), (flags.RTM_DELLINK, 4)],
+        )
+
+    def test_waitTimeout(self):
+        with rtnetlink.Rtnetlink() as listener:
+            start = time.monotonic()
+            self.assertFalse(listener.waitScan(1, 0.05))
+            self.assertLess(time.monotonic() - start, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
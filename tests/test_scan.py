@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# this file is part of the python-wifi package - a python wifi library
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# These tests parse synthetic scan buffers and do not need hardware.
+#
+import errno
+import os
+import struct
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import scandata
+from python3wifi import flags, iwlibs
+from python3wifi.iwlibs import (
+    SCAN_BUFFER_MAX,
+    Iwscan,
+    Iwscanbuffer,
+    Iwscanbuffers,
+    Iwscanresult,
+    Iwscanreq,
+    STRUCT_IW_SCAN_REQ,
+    Wireless,
+    iterScanresults,
+    parseScan,
+)
+
+
+class TestParseScan(unittest.TestCase):
+    def test_cells(self):
+        aplist = parseScan(scandata.makeScan(3))
+        self.assertEqual(len(aplist), 3)
+        ap = aplist[2]
+        self.assertEqual(ap.bssid, "02:00:00:00:00:02")
+        self.assertEqual(ap.essid, b"net0002")
+        self.assertEqual(ap.mode, "Master")
+        self.assertEqual(ap.frequency.getFrequency(), 2412000000)
+        self.assertEqual(ap.quality.siglevel, -60)
+        self.assertEqual(ap.rate[0][-1], 54000000)
+        self.assertEqual(ap.wpa, 2)
+        self.assertEqual(ap.custom, [b"tsf=0000000000000000"])
+
+    def test_encode(self):
+        aplist = parseScan(scandata.makeCell(0, encode_flags=flags.IW_ENCODE_DISABLED))
+        self.assertTrue(aplist[0].encode.flags & flags.IW_ENCODE_DISABLED)
+        self.assertEqual(aplist[0].encode.length, 0)
+
+    def test_resultsOutliveBuffer(self):
+        buff = bytearray(scandata.makeScan(2))
+        aplist = parseScan(buff)
+        buff[:] = bytes(len(buff))
+        self.assertEqual(aplist[1].essid, b"net0001")
+
+    def test_trailingPadding(self):
+        data = scandata.makeScan(2) + bytes(64)
+        self.assertEqual(len(parseScan(data)), 2)
+
+    def test_lazyDecoding(self):
+        ap = parseScan(scandata.makeCell(0))[0]
+        self.assertFalse(hasattr(ap, "__dict__"))
+        self.assertRaises(AttributeError, getattr, ap, "_essid")
+        self.assertIs(ap.rate, ap.rate)
+        ap.essid = b"renamed"
+        self.assertEqual(ap.essid, b"renamed")
+
+    def test_addEvent(self):
+        ap = Iwscanresult(struct.pack("H6s8x", 1, scandata.bssidFor(1)), None)
+        self.assertIsNone(ap.essid)
+        ap.addEvent(flags.IWEVCUSTOM, b"\0\0\0\0one")
+        ap.addEvent(flags.IWEVCUSTOM, b"\0\0\0\0two")
+        self.assertEqual(ap.custom, [b"one", b"two"])
+
+    def test_unknownEvents(self):
+        skipped = iwlibs.skipped_scan_events[flags.IWEVPMKIDCAND]
+        data = scandata.makeCell(0) + scandata.packPoint(flags.IWEVPMKIDCAND, b"x")
+        data = data + scandata.makeCell(1)
+        aplist = parseScan(data)
+        self.assertEqual([ap.essid for ap in aplist], [b"net0000", b"net0001"])
+        self.assertEqual(iwlibs.skipped_scan_events[flags.IWEVPMKIDCAND], skipped + 1)
+
+    def test_registerScanEvent(self):
+        iwlibs.registerScanEvent(
+            flags.IWEVPMKIDCAND, "pmkid", lambda value, data: bytes(data[4:])
+        )
+        self.addCleanup(iwlibs.unregisterScanEvent, flags.IWEVPMKIDCAND)
+        data = scandata.makeCell(0) + scandata.packPoint(flags.IWEVPMKIDCAND, b"x")
+        ap = parseScan(data + scandata.makeCell(1))[0]
+        self.assertEqual(ap.extra, {"pmkid": b"x"})
+        self.assertRaises(
+            ValueError, iwlibs.registerScanEvent, flags.IWEVQUAL, "q", None
+        )
+
+    def test_eventWithoutAP(self):
+        data = scandata.packPoint(flags.SIOCGIWESSID, b"orphan")
+        self.assertRaises(RuntimeError, parseScan, data)
+
+
+class TestIterScan(unittest.TestCase):
+    def test_lazy(self):
+        # the last cell is invalid, but only found once it is reached
+        data = scandata.makeScan(2) + scandata.packEvent(
+            flags.SIOCGIWAP, struct.pack("H6s8x", 1, bytes(6))
+        )
+        results = iterScanresults(data)
+        self.assertEqual(next(results).essid, b"net0000")
+        self.assertEqual(next(results).essid, b"net0001")
+        self.assertRaises(RuntimeError, next, results)
+
+    def test_earlyStop(self):
+        for ap in iterScanresults(scandata.makeScan(50)):
+            if ap.essid == b"net0007":
+                break
+        self.assertEqual(ap.bssid, "02:00:00:00:00:07")
+
+
+class TestScanbuffer(unittest.TestCase):
+    def test_reuse(self):
+        scanbuffer = Iwscanbuffer("wlan0")
+        buff = scanbuffer.take()
+        self.assertEqual(len(buff), flags.IW_SCAN_MAX_DATA)
+        # a second concurrent scan gets its own buffer
+        self.assertIsNot(scanbuffer.take(), buff)
+        scanbuffer.give(buff)
+        self.assertIs(scanbuffer.take(), buff)
+
+    def test_grow(self):
+        scanbuffer = Iwscanbuffer("wlan0", size=1024)
+        buff = scanbuffer.take()
+        self.assertEqual(len(scanbuffer.grow(buff)), 2048)
+        self.assertEqual(len(scanbuffer.grow(buff, 3000)), 3000)
+        self.assertEqual(len(scanbuffer.grow(buff, 100000)), SCAN_BUFFER_MAX)
+        self.assertEqual(scanbuffer.e2big_retries, 3)
+        with self.assertRaises(OSError) as cm:
+            scanbuffer.grow(scanbuffer.grow(buff, 100000))
+        self.assertEqual(cm.exception.errno, errno.E2BIG)
+
+    def test_learn(self):
+        scanbuffer = Iwscanbuffer("wlan0")
+        self.assertFalse(scanbuffer.learn(1000))
+        self.assertTrue(scanbuffer.learn(8000))
+        self.assertEqual(scanbuffer.size, 10000)
+        # a small spare buffer is not handed out once the size grew
+        scanbuffer.give(bytearray(16))
+        self.assertEqual(len(scanbuffer.take()), 10000)
+        self.assertEqual(scanbuffer.getStats()["max_result"], 8000)
+
+    def test_persist(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "scanbuffers.json")
+            scanbuffers = Iwscanbuffers(path)
+            scanbuffer = scanbuffers.get("wlan0")
+            if scanbuffer.learn(20000):
+                scanbuffers.learned(scanbuffer)
+            self.assertEqual(Iwscanbuffers(path).get("wlan0").size, 25000)
+
+
+class TestScanRequest(unittest.TestCase):
+    def test_default(self):
+        self.assertTrue(Iwscanreq().isDefault())
+        self.assertEqual(Iwscanreq().getFlags(), flags.IW_SCAN_DEFAULT)
+
+    def test_pack(self):
+        request = Iwscanreq(
+            essid="office",
+            channels=[1, 2437000000, 5180000000, 5200000000],
+            scan_type="passive",
+            max_channel_time=20,
+        )
+        self.assertFalse(request.isDefault())
+        self.assertEqual(
+            request.getFlags(), flags.IW_SCAN_THIS_ESSID | flags.IW_SCAN_THIS_FREQ
+        )
+        fields = STRUCT_IW_SCAN_REQ.unpack(request.pack())
+        scan_type, essid_len, num_channels = fields[:3]
+        self.assertEqual((scan_type, essid_len, num_channels), (1, 6, 4))
+        self.assertEqual(fields[5][:essid_len], b"office")
+        self.assertEqual(fields[6:8], (0, 20))
+        self.assertEqual(
+            fields[8:24],
+            (1, 0, 0, 0, 243700000, 1, 0, 0, 518000000, 1, 0, 0, 520000000, 1, 0, 0),
+        )
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Iwscanreq, essid="x" * 33)
+        self.assertRaises(ValueError, Iwscanreq, channels=range(33))
+        self.assertRaises(ValueError, Iwscanreq, scan_type="loud")
+
+
+class CachedScan(Iwscan):
+    """ An Iwscan reading a synthetic kernel scan cache. """
+
+    def trigger(self):
+        raise AssertionError("a cached scan must not trigger")
+
+    def tryReadScan(self):
+        return memoryview(scandata.makeScan(3))
+
+
+class TestCachedScan(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(iwlibs.rangecache, "_load", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(iwlibs.rangecache.invalidate, "lo")
+
+    def test_readsCache(self):
+        scan = CachedScan("lo", fullscan=False)
+        self.assertEqual(len(scan), 3)
+        self.assertEqual([ap.essid for ap in scan][-1], b"net0002")
+
+    def test_deferred(self):
+        scan = CachedScan("lo", read=False)
+        self.assertIsNone(scan.aplist)
+
+    def test_timeout(self):
+        class PendingScan(CachedScan):
+            def tryReadScan(self):
+                return None
+
+        scan = PendingScan("lo", read=False)
+        with self.assertRaises(OSError) as cm:
+            scan.getScan(timeout=0.05)
+        self.assertEqual(cm.exception.errno, errno.ETIMEDOUT)
+
+    def test_cachedScanBusy(self):
+        # while any scan runs the kernel answers EAGAIN, which a cached
+        # read reports instead of waiting for
+        busy = OSError(errno.EAGAIN, os.strerror(errno.EAGAIN))
+        with mock.patch.object(
+            iwlibs.Iwrequest, "getPointInto", side_effect=busy
+        ) as getPointInto:
+            with Wireless("lo") as wifi:
+                start = time.monotonic()
+                with self.assertRaises(OSError) as cm:
+                    wifi.cachedScan()
+                self.assertLess(time.monotonic() - start, 0.1)
+                self.assertEqual(cm.exception.errno, errno.EAGAIN)
+                self.assertEqual(getPointInto.call_count, 1)
+                with self.assertRaises(OSError) as cm:
+                    wifi.cachedScan(timeout=0.05)
+                self.assertEqual(cm.exception.errno, errno.ETIMEDOUT)
+            with self.assertRaises(OSError) as cm:
+                Iwscan("lo", fullscan=False)
+            self.assertEqual(cm.exception.errno, errno.EAGAIN)
+
+
+class RadioScan:
+    """ Stands in for an Iwscan of one radio, taking a while to complete. """
+
+    def __init__(self, ifname, request=None, read=True):
+        self.ifname = ifname
+        self.aplist = None
+
+    def trigger(self):
+        if self.ifname == "broken0":
+            raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+
+    def getScan(self, timeout=None):
+        time.sleep(0.2)
+        if self.ifname == "garbled0":
+            raise RuntimeError("Attempting to add an event without AP data.")
+        # every radio hears cells 0 and 1, at a level set by the radio
+        level = -40 - 10 * int(self.ifname[-1])
+        cells = (scandata.makeCell(0, level=level), scandata.makeCell(1, level=-80))
+        self.aplist = parseScan(b"".join(cells))
+
+
+class TestScanAll(unittest.TestCase):
+    def test_merge(self):
+        with mock.patch.object(iwlibs, "Iwscan", RadioScan):
+            start = time.monotonic()
+            multiscan = iwlibs.scanAll(
+                ["wlan2", "wlan0", "wlan1", "broken0", "garbled0"]
+            )
+            elapsed = time.monotonic() - start
+        # the radios were waited for in parallel
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(sorted(multiscan.scans), ["wlan0", "wlan1", "wlan2"])
+        self.assertEqual(sorted(multiscan.errors), ["broken0", "garbled0"])
+        self.assertIsInstance(multiscan.errors["garbled0"], RuntimeError)
+        self.assertEqual(len(multiscan), 2)
+        ifname, best = multiscan.getBest("02:00:00:00:00:00")
+        self.assertEqual((ifname, best.quality.siglevel), ("wlan0", -40))
+        self.assertEqual(
+            multiscan.levels["02:00:00:00:00:00"],
+            {"wlan0": -40, "wlan1": -50, "wlan2": -60},
+        )
+
+    def test_malformedResults(self):
+        # a result which can not be decoded drops only that radio's scan
+        scan = RadioScan("wlan0")
+        scan.getScan()
+        broken = RadioScan("wlan1")
+        broken.aplist = [mock.Mock(bssid="02:00:00:00:00:09", quality=None)]
+        multiscan = iwlibs.Iwmultiscan({"wlan0": scan, "wlan1": broken})
+        self.assertEqual(list(multiscan.scans), ["wlan0"])
+        self.assertIsInstance(multiscan.errors["wlan1"], AttributeError)
+        self.assertEqual(len(multiscan), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()